@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Throughput and latency of cliform.server.FormServer, with N concurrent clients.
+
+Usage: python -m benchmarks.server --clients 500 --sessions 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import typing as T
+
+import cliform
+import cliform.interact
+import cliform.server
+
+QUESTIONS = 10
+
+
+class BenchPrompter(cliform.Prompter):
+    def interact(self) -> cliform.interact.InteractLoop:
+        answers = {}
+        for rank in range(QUESTIONS):
+            answers[rank] = yield cliform.interact.TextInput("Question %d" % rank)
+        yield cliform.interact.Summary({"Question %d" % rank: answer for rank, answer in answers.items()})
+
+
+def percentile(values: T.Sequence[float], ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+async def client(
+        connect: T.Callable[[], T.Awaitable[T.Tuple[asyncio.StreamReader, asyncio.StreamWriter]]],
+        sessions: int, latencies: T.List[float]) -> None:
+    for _session in range(sessions):
+        reader, writer = await connect()
+        await reader.readuntil(b'?\n')
+        for rank in range(QUESTIONS):
+            start = time.perf_counter()
+            writer.write(b"answer %d\n" % rank)
+            if rank + 1 < QUESTIONS:
+                # Wait for the next prompt
+                await reader.readuntil(b'?\n')
+            else:
+                # Wait for the summary, and the end of the session
+                await reader.read()
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+
+
+async def bench(clients: int, sessions: int, unix: bool) -> T.Dict[T.Text, float]:
+    server = cliform.server.FormServer(BenchPrompter, max_sessions=clients)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if unix:
+            path = os.path.join(tmpdir, 'bench.sock')
+            await server.start_unix(path)
+
+            def connect() -> T.Awaitable[T.Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+                return asyncio.open_unix_connection(path)
+        else:
+            tcp = await server.start_tcp('127.0.0.1', 0)
+            port = tcp.sockets[0].getsockname()[1]
+
+            def connect() -> T.Awaitable[T.Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+                return asyncio.open_connection('127.0.0.1', port)
+
+        latencies: T.List[float] = []
+        start = time.perf_counter()
+        await asyncio.gather(*[client(connect, sessions, latencies) for _i in range(clients)])
+        duration = time.perf_counter() - start
+        await server.drain()
+
+    return {
+        'sessions_per_second': clients * sessions / duration,
+        'latency_p50_ms': percentile(latencies, 0.50) * 1000,
+        'latency_p95_ms': percentile(latencies, 0.95) * 1000,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'latency_mean_ms': statistics.mean(latencies) * 1000,
+    }
+
+
+def main(argv: T.Optional[T.Sequence[T.Text]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=100, help="Concurrent clients")
+    parser.add_argument('--sessions', type=int, default=5, help="Sessions per client")
+    parser.add_argument('--unix', action='store_true', help="Use a Unix socket instead of TCP")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(bench(args.clients, args.sessions, args.unix))
+    for name, value in results.items():
+        print("{:<24}{:.2f}".format(name + ':', value))
+
+
+if __name__ == '__main__':
+    main()
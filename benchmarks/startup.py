@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Time to first prompt, from process start: FormPrompter vs. a precompiled spec.
+
+Usage: python -m benchmarks.startup --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing as T
+
+from django import forms
+
+import cliform.django
+
+
+class StartupForm(forms.Form):
+    name = forms.CharField(label="Name")
+    email = forms.EmailField(label="Email")
+    is_staff = forms.BooleanField(label="Is Staff")
+    country = forms.ChoiceField(choices=[('c%03d' % i, "Country %03d" % i) for i in range(200)])
+
+
+class StartupPrompter(cliform.django.FormPrompter):
+    form_class = StartupForm
+
+    def on_submit(self, data: T.Mapping[T.Text, T.Any]) -> None:
+        pass
+
+
+# Each script prints the first prompt line, then exits at once.
+SCRIPTS = {
+    'django': (
+        "import os, django; django.setup()\n"
+        "from benchmarks.startup import StartupPrompter\n"
+        "print(next(StartupPrompter().loop()), flush=True); os._exit(0)\n"
+    ),
+    'spec': (
+        "import os, sys, cliform.spec\n"
+        "prompter = cliform.spec.SpecPrompter(cliform.spec.FormSpec.load(sys.argv[1]))\n"
+        "print(next(prompter.loop()), flush=True); os._exit(0)\n"
+    ),
+}
+
+
+def first_prompt(script: T.Text, spec_path: T.Text) -> float:
+    """Seconds from process start to the first prompt line."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', script, spec_path], stdout=subprocess.PIPE)
+    assert process.stdout is not None
+    process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    process.wait()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'demo.settings')
+    import django
+    django.setup()
+
+    import cliform.spec
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spec_path = os.path.join(tmpdir, 'startup.spec.json')
+        cliform.spec.export_spec(StartupPrompter).save(spec_path)
+        for name, script in SCRIPTS.items():
+            timings = [first_prompt(script, spec_path) for _run in range(args.runs)]
+            print("{:<8} median {:7.1f}ms  min {:7.1f}ms".format(
+                name, statistics.median(timings) * 1000, min(timings) * 1000,
+            ))
+
+
+if __name__ == '__main__':
+    main()
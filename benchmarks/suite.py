@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Benchmarks for the interaction engine, checked against recorded baselines.
+
+Usage:
+    python -m benchmarks.suite                  # Run, and compare to the baseline
+    python -m benchmarks.suite --save           # Record a new baseline
+    python -m benchmarks.suite expand_summary   # Only run matching benchmarks
+
+Runs offline, with the in-repo ``demo`` settings.
+"""
+
+import argparse
+import functools
+import io
+import json
+import os
+import sys
+import timeit
+import typing as T
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'demo.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django import forms  # noqa: E402
+
+import cliform  # noqa: E402
+import cliform.batch  # noqa: E402
+import cliform.django  # noqa: E402
+import cliform.interact  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# A benchmark returns a callable running one iteration, and the number of items it processes.
+Benchmark = T.Callable[[], T.Tuple[T.Callable[[], None], int]]
+
+BENCHMARKS: T.Dict[T.Text, Benchmark] = {}
+
+
+def register(name: T.Text, sizes: T.Iterable[int] = ()) -> T.Callable[[T.Callable[..., T.Any]], T.Callable[..., T.Any]]:
+    def decorator(setup: T.Callable[..., T.Any]) -> T.Callable[..., T.Any]:
+        if sizes:
+            for size in sizes:
+                BENCHMARKS['%s[%d]' % (name, size)] = functools.partial(setup, size)
+        else:
+            BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+class NullInteracter(cliform.interact.BaseInteracter):
+    def __init__(self, replies: T.Sequence[T.Text]):
+        self.replies = replies
+        self.position = 0
+
+    def display(self, message: T.Text) -> None:
+        pass
+
+    def get_input(self) -> T.Text:
+        reply = self.replies[self.position % len(self.replies)]
+        self.position += 1
+        return reply
+
+
+class SimpleForm(forms.Form):
+    name = forms.CharField(label="Name")
+    email = forms.EmailField(label="Email")
+
+
+class ComplexForm(forms.Form):
+    name = forms.CharField(label="Name")
+    email = forms.EmailField(label="Email")
+    is_staff = forms.BooleanField(label="Is Staff")
+    is_superuser = forms.BooleanField(required=False)
+    profile = forms.ChoiceField(choices=[
+        ('intern', "Intern"),
+        ('fulltime', "Full-Time"),
+        ('contractor', "Contractor"),
+    ], required=False)
+
+
+class BenchFormPrompter(cliform.django.FormPrompter):
+    def on_submit(self, data: T.Mapping[T.Text, T.Any]) -> None:
+        pass
+
+
+def make_options(count: int) -> T.List[T.Tuple[cliform.interact.OptionKey, T.Text]]:
+    return [(cliform.interact.OptionKey(rank), "Option %06d" % rank) for rank in range(count)]
+
+
+@register('loop_throughput')
+def bench_loop() -> T.Tuple[T.Callable[[], None], int]:
+    count = 1000
+
+    class Prompter(cliform.Prompter):
+        def interact(self) -> cliform.interact.InteractLoop:
+            for rank in range(count):
+                yield cliform.interact.Info("Line %d" % rank)
+                yield cliform.interact.TextInput("Question %d" % rank)
+
+    def run() -> None:
+        NullInteracter(["answer"]).run(Prompter())
+
+    return run, count
+
+
+@register('expand_summary', sizes=(10, 100, 1000, 10000))
+def bench_expand_summary(size: int) -> T.Tuple[T.Callable[[], None], int]:
+    prompter = cliform.Prompter()
+    summary = cliform.interact.Summary({"Field %d" % rank: "Value %d" % rank for rank in range(size)})
+
+    def run() -> None:
+        for _line in prompter.expand(summary):
+            pass
+
+    return run, size
+
+
+@register('choice_from_texts', sizes=(10, 1000, 100000))
+def bench_choice_from_texts(size: int) -> T.Tuple[T.Callable[[], None], int]:
+    options = make_options(size)
+
+    def run() -> None:
+        cliform.interact.ChoiceInput.from_texts(title="Choice", options=options, default_first=True)
+
+    return run, size
+
+
+@register('choice_convert', sizes=(10, 1000, 100000))
+def bench_choice_convert(size: int) -> T.Tuple[T.Callable[[], None], int]:
+    prompt = cliform.interact.ChoiceInput.from_texts(title="Choice", options=make_options(size), default_first=True)
+    replies = ['', 'o', '0', 'nope'] * 250
+
+    def run() -> None:
+        for reply in replies:
+            prompt.convert(reply)
+
+    return run, len(replies)
+
+
+@register('indexed_choice_from_texts', sizes=(10, 1000, 100000))
+def bench_indexed_from_texts(size: int) -> T.Tuple[T.Callable[[], None], int]:
+    options = make_options(size)
+
+    def run() -> None:
+        cliform.interact.IndexedChoiceInput.from_texts(title="Choice", options=options, default_first=True)
+
+    return run, size
+
+
+@register('indexed_choice_convert', sizes=(10, 1000, 100000))
+def bench_indexed_convert(size: int) -> T.Tuple[T.Callable[[], None], int]:
+    prompt = cliform.interact.IndexedChoiceInput.from_texts(
+        title="Choice", options=make_options(size), default_first=True,
+    )
+    replies = ['', '3', 'option 00000', '/12', '>'] * 20
+
+    def run() -> None:
+        for reply in replies:
+            prompt.convert(reply)
+
+    return run, len(replies)
+
+
+def form_session(form_class: T.Type[forms.Form], replies: T.Sequence[T.Text]) -> T.Tuple[T.Callable[[], None], int]:
+    prompter_class = type('Prompter', (BenchFormPrompter,), {'form_class': form_class})
+    sessions = 100
+
+    def run() -> None:
+        for _session in range(sessions):
+            NullInteracter(replies).run(prompter_class())
+
+    return run, sessions
+
+
+@register('session_simple_form')
+def bench_session_simple() -> T.Tuple[T.Callable[[], None], int]:
+    return form_session(SimpleForm, ["John Doe", "john.doe@example.com", ""])
+
+
+@register('session_complex_form')
+def bench_session_complex() -> T.Tuple[T.Callable[[], None], int]:
+    return form_session(ComplexForm, ["John Doe", "john.doe@example.com", "", "", "f", ""])
+
+
+@register('batch_validation')
+def bench_batch() -> T.Tuple[T.Callable[[], None], int]:
+    count = 2000
+    lines = [
+        json.dumps({'name': "User %d" % rank, 'email': "user%d@example.com" % rank if rank % 10 else "invalid"})
+        for rank in range(count)
+    ]
+    prompter_class = type('Prompter', (BenchFormPrompter,), {'form_class': SimpleForm})
+
+    def run() -> None:
+        cliform.batch.BatchRunner(prompter_class()).run(io.StringIO('\n'.join(lines)), io.StringIO())
+
+    return run, count
+
+
+def low_cardinality_batch(count: int, columnar: bool) -> T.Tuple[T.Callable[[], None], int]:
+    """Records whose columns hold few distinct values."""
+    lines = [
+        json.dumps({
+            'name': "User %d" % (rank % 50),
+            'email': "user%d@example.com" % (rank % 50),
+            'is_staff': rank % 2 == 0,
+            'profile': ['intern', 'fulltime', 'contractor'][rank % 3],
+        })
+        for rank in range(count)
+    ]
+    prompter_class = type('Prompter', (BenchFormPrompter,), {'form_class': ComplexForm})
+
+    def run() -> None:
+        runner = cliform.batch.BatchRunner(prompter_class(), columnar=columnar)
+        runner.run(io.StringIO('\n'.join(lines)), io.StringIO())
+
+    return run, count
+
+
+@register('batch_rowwise', sizes=(100, 2000))
+def bench_batch_rowwise(count: int) -> T.Tuple[T.Callable[[], None], int]:
+    """Low-cardinality columns, cleaned row by row."""
+    return low_cardinality_batch(count, columnar=False)
+
+
+@register('batch_columnar', sizes=(100, 2000))
+def bench_batch_columnar(count: int) -> T.Tuple[T.Callable[[], None], int]:
+    """Low-cardinality columns, cleaned column by column."""
+    return low_cardinality_batch(count, columnar=True)
+
+
+def measure(benchmark: Benchmark, repeat: int) -> T.Dict[T.Text, float]:
+    """Best of ``repeat`` runs; fast benchmarks are looped until a run lasts at least 0.2s."""
+    run, items = benchmark()
+    timer = timeit.Timer(run)
+    loops, _duration = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=loops)) / loops
+    return {'seconds': best, 'items_per_second': items / best if best else float('inf')}
+
+
+def main(argv: T.Optional[T.Sequence[T.Text]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('patterns', nargs='*', help="Only run benchmarks whose name contains one of these")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per benchmark; the best one is kept")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument('--save', action='store_true', help="Record results as the new baseline")
+    parser.add_argument(
+        '--threshold', type=float, default=2.0,
+        help="Fail when a benchmark is this many times slower than its baseline",
+    )
+    args = parser.parse_args(argv)
+
+    baseline: T.Dict[T.Text, T.Dict[T.Text, float]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for name, benchmark in BENCHMARKS.items():
+        if args.patterns and not any(pattern in name for pattern in args.patterns):
+            continue
+        result = results[name] = measure(benchmark, args.repeat)
+        line = "{:<36}{:>12.6f}s{:>16.0f}/s".format(name, result['seconds'], result['items_per_second'])
+        if name in baseline:
+            ratio = result['seconds'] / baseline[name]['seconds']
+            line += "{:>10.2f}x".format(ratio)
+            if ratio > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        return 0
+
+    if regressions:
+        print("Regressions (over {}x baseline): {}".format(args.threshold, ', '.join(regressions)), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
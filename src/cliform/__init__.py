@@ -6,9 +6,10 @@ __version__ = '0.1.0'
 __author__ = 'Raphaël Barrois <raphael.barrois+cliform@polytechnique.org>'
 
 
-from .interact import Prompter, StdioInteracter
+from .interact import BufferedStdioInteracter, Prompter, StdioInteracter
 
 __all__ = (
+    'BufferedStdioInteracter',
     'Prompter',
     'StdioInteracter',
 )
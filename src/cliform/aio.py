@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Run prompters from an asyncio event loop.
+
+Prompters are unchanged: their (synchronous) ``loop()`` is driven by an
+interacter whose display and input methods are awaitable, so that a single
+event loop can serve many sessions at once.
+"""
+
+import asyncio
+import typing as T
+from concurrent import futures
+
+from . import interact
+
+
+def send(loop: interact.BaseLoop, reply: T.Optional[interact.Input]) -> T.Optional[interact.BaseOutput]:
+    """Advance the loop; None once it is finished.
+
+    StopIteration can't cross an executor's future, hence this wrapper.
+    """
+    try:
+        return loop.send(reply)
+    except StopIteration:
+        return None
+
+
+class AsyncBaseInteracter:
+    # Advance the prompter in an executor thread; required when the prompter
+    # blocks, e.g when Django forms validate against the database.
+    advance_in_thread: bool = False
+    executor: T.Optional[futures.Executor] = None
+
+    async def display(self, message: T.Text) -> None:
+        raise NotImplementedError()
+
+    async def get_input(self) -> T.Text:
+        raise NotImplementedError()
+
+    async def display_block(self, lines: T.Sequence[T.Text]) -> None:
+        for line in lines:
+            await self.display(line)
+
+    async def _advance(
+            self, loop: interact.BaseLoop, reply: T.Optional[interact.Input]) -> T.Optional[interact.BaseOutput]:
+        if self.advance_in_thread:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, send, loop, reply)
+        return send(loop, reply)
+
+    async def run(self, prompter: interact.Prompter) -> None:
+        loop = prompter.loop(blocks=True)
+        reply = None
+        while True:
+            value = await self._advance(loop, reply)
+            if value is None:
+                return
+            reply = None
+            if isinstance(value, interact.DisplayBlock):
+                await self.display_block(value)
+            elif isinstance(value, interact.Display):
+                await self.display(value)
+            elif isinstance(value, interact.Query):
+                reply = interact.Input(await self.get_input())
+
+
+class StreamInteracter(AsyncBaseInteracter):
+    """Interact through asyncio streams, e.g from asyncio.start_server().
+
+    With an ``idle_timeout``, waiting longer than that many seconds for a reply
+    raises asyncio.TimeoutError.
+    """
+
+    def __init__(
+            self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+            encoding: T.Text = 'utf-8', idle_timeout: T.Optional[float] = None):
+        self.reader = reader
+        self.writer = writer
+        self.encoding = encoding
+        self.idle_timeout = idle_timeout
+
+    async def display(self, message: T.Text) -> None:
+        self.writer.write((message + '\n').encode(self.encoding))
+
+    async def display_block(self, lines: T.Sequence[T.Text]) -> None:
+        self.writer.write(''.join(line + '\n' for line in lines).encode(self.encoding))
+
+    async def get_input(self) -> T.Text:
+        await self.writer.drain()
+        line = await asyncio.wait_for(self.reader.readline(), self.idle_timeout)
+        if not line:
+            raise EOFError()
+        return line.decode(self.encoding).rstrip('\r\n')
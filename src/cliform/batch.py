@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Non-interactive, streaming validation of many records.
+
+Input is read as JSON Lines: one JSON object per line, each one holding
+the raw data for a single form.
+Output is JSON Lines as well: one result per input record, in input order.
+"""
+
+import collections
+import itertools
+import json
+import typing as T
+from concurrent import futures
+from dataclasses import dataclass, field
+
+import django
+from django import forms
+from django.core import exceptions
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections, router, transaction
+from django.forms import models as model_forms
+
+from . import cache
+from . import columnar as cliform_columnar
+from . import django as cliform_django
+from . import formset as cliform_formset
+from . import prefetch as cliform_prefetch
+from . import report as cliform_report
+
+Record = T.Mapping[T.Text, T.Any]
+# A line number, and the line's text or an already parsed record
+Line = T.Tuple[int, T.Union[T.Text, Record]]
+
+
+class ResultEncoder(DjangoJSONEncoder):
+    """Encode cleaned data; unknown objects (e.g model instances) use their text form."""
+
+    def default(self, o: T.Any) -> T.Any:
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+
+@dataclass
+class Result:
+    """The outcome of validating a single record."""
+    line: int
+    data: T.Optional[Record] = None
+    errors: T.List[T.Text] = field(default_factory=list)
+    # The first errors, in detail; see error_details().
+    details: T.List[cliform_django.ErrorDetail] = field(default_factory=list)
+
+    @classmethod
+    def from_error(cls, line: int, error: forms.ValidationError) -> 'Result':
+        result = cls(line=line)
+        result.add_error(error)
+        return result
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+    def add_error(self, error: forms.ValidationError) -> None:
+        details = list(cliform_django.walk_error_details(error))
+        if len(self.details) == len(self.errors):
+            self.details.extend(details)
+        self.errors.extend(detail.text for detail in details)
+
+    def error_details(self) -> T.List[cliform_django.ErrorDetail]:
+        """All errors, in detail; those added without details are only known by their text."""
+        return self.details + [
+            cliform_django.ErrorDetail(field=None, code=None, template=text, message=text)
+            for text in self.errors[len(self.details):]
+        ]
+
+    def as_dict(self) -> T.Dict[T.Text, T.Any]:
+        if self.valid:
+            return {'line': self.line, 'data': self.data}
+        return {'line': self.line, 'errors': self.errors}
+
+    def as_json(self) -> T.Text:
+        return json.dumps(self.as_dict(), cls=ResultEncoder, sort_keys=True)
+
+
+def form_errors(form: forms.BaseForm) -> T.List[T.Text]:
+    return list(cliform_django.walk_errors(forms.ValidationError(form.errors.as_data())))
+
+
+@dataclass
+class Validator:
+    """Validate records against a form; picklable, to be shipped to worker processes.
+
+    With ``prefetch``, each chunk's foreign keys and unique checks are answered
+    from a few bulk queries, through a cliform_prefetch.LookupIndex.
+    """
+    form_class: T.Type[forms.BaseForm]
+    validation_cache: T.Optional[cache.ValidationCache] = None
+    cached_fields: T.Collection[T.Text] = ()
+    prefetch: bool = False
+    columnar: bool = False
+
+    @classmethod
+    def for_prompter(
+            cls, prompter: cliform_django.FormPrompter, prefetch: bool = False, columnar: bool = False) -> 'Validator':
+        return cls(
+            form_class=prompter.form_class,
+            validation_cache=prompter.validation_cache,
+            cached_fields=tuple(prompter.cached_fields),
+            prefetch=prefetch,
+            columnar=columnar,
+        )
+
+    def _parse(self, line: int, text: T.Union[T.Text, Record]) -> T.Union[Result, Record]:
+        """The record held by a line of input, or the Result reporting why there is none.
+
+        Input from other formats than JSON Lines (see tabular.TabularReader) comes as records already.
+        """
+        if isinstance(text, str):
+            try:
+                record = json.loads(text)
+            except ValueError as e:
+                return Result.from_error(line, forms.ValidationError(
+                    "Invalid JSON: %(error)s", code='invalid_json', params={'error': e},
+                ))
+        else:
+            record = text
+        if not isinstance(record, dict):
+            return self._not_a_record(line, record)
+        return record
+
+    def _not_a_record(self, line: int, record: T.Any) -> Result:
+        return Result.from_error(line, forms.ValidationError(
+            "Expected a JSON object, got %(type)s", code='not_an_object', params={'type': type(record).__name__},
+        ))
+
+    def _clean(self, form: forms.BaseForm, cleaned: T.Optional[T.Mapping[T.Text, T.Any]] = None) -> None:
+        if self.validation_cache is not None and self.cached_fields:
+            cliform_django.clean_form_cached(form, self.validation_cache, self.cached_fields, cleaned)
+        else:
+            cliform_django.clean_form(form, cleaned or {})
+
+    def _result(self, line: int, form: forms.BaseForm) -> Result:
+        if form.is_valid():
+            return Result(line=line, data=form.cleaned_data)
+        return Result.from_error(line, forms.ValidationError(form.errors.as_data()))
+
+    def record(self, line: int, record: T.Any) -> Result:
+        if not isinstance(record, dict):
+            return self._not_a_record(line, record)
+        form = self.form_class(data=record)
+        self._clean(form)
+        return self._result(line, form)
+
+    def line(self, line: int, text: T.Union[T.Text, Record]) -> Result:
+        """Parse and validate one line of input."""
+        record = self._parse(line, text)
+        if isinstance(record, Result):
+            return record
+        return self.record(line, record)
+
+    def chunk(self, chunk: T.Sequence[Line]) -> T.List[Result]:
+        if not (self.prefetch or self.columnar):
+            return [self.line(lineno, text) for lineno, text in chunk]
+
+        parsed = [(lineno, self._parse(lineno, text)) for lineno, text in chunk]
+        records = [record for _lineno, record in parsed if not isinstance(record, Result)]
+        cleaner = None
+        if self.columnar:
+            cleaner = cliform_columnar.ColumnCleaner(self.form_class, self.validation_cache, self.cached_fields)
+            if cleaner.standalone:
+                columns = iter(cleaner.clean(records))
+                return [
+                    record if isinstance(record, Result) else self._values_result(lineno, next(columns))
+                    for lineno, record in parsed
+                ]
+
+        bound_forms = [self.form_class(data=record) for record in records]
+        cleaned: T.List[T.Dict[T.Text, T.Any]] = [{} for _form in bound_forms]
+        index = None
+        if self.prefetch:
+            index = cliform_prefetch.LookupIndex(self.form_class)
+            index.prefetch(records)
+            for form, values in zip(bound_forms, cleaned):
+                index.defer_unique(form)
+                values.update(index.clean_choices(form))
+        if cleaner is not None:
+            cleaned = cleaner.clean(records, cleaned)
+
+        for form, values in zip(bound_forms, cleaned):
+            self._clean(form, values)
+        if index is not None:
+            index.validate_unique()
+        outcomes = iter(bound_forms)
+        return [
+            record if isinstance(record, Result) else self._result(lineno, next(outcomes))
+            for lineno, record in parsed
+        ]
+
+    def _values_result(self, line: int, values: T.Dict[T.Text, T.Any]) -> Result:
+        """The Result of a record whose cleaned values are all there is to its validation."""
+        errors = {
+            name: value.error_list for name, value in values.items() if isinstance(value, forms.ValidationError)
+        }
+        if errors:
+            return Result.from_error(line, forms.ValidationError(errors))
+        return Result(line=line, data=values)
+
+
+def validate_record(form_class: T.Type[forms.BaseForm], line: int, record: T.Any) -> Result:
+    return Validator(form_class).record(line, record)
+
+
+def validate_line(form_class: T.Type[forms.BaseForm], line: int, text: T.Text) -> Result:
+    return Validator(form_class).line(line, text)
+
+
+def setup_worker() -> None:
+    """Prepare a worker process; required when workers are spawned instead of forked."""
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def close_connections() -> None:
+    """Close the database connections, before forking workers: they would share their sockets otherwise.
+
+    Connections in an atomic block are kept, lest the caller's transaction is lost;
+    use the "spawn" start method when forking from within a transaction.
+    """
+    for connection in connections.all():
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def chunked(items: T.Iterable[T.Any], size: int) -> T.Iterator[T.List[T.Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_lines(stream: T.Iterable[T.Text]) -> T.Iterator[T.Tuple[int, T.Text]]:
+    """Yield (line number, text) for each non-blank line; line numbers start at 1."""
+    for lineno, text in enumerate(stream, start=1):
+        text = text.strip()
+        if text:
+            yield lineno, text
+
+
+class BulkSaver:
+    """Save the records of a ModelForm with ``bulk_create()``, one transaction per batch.
+
+    If a batch fails, it is rolled back, then saved again one record at a time:
+    only the faulty records are reported as errors.
+
+    Many-to-many fields require the primary keys of inserted rows; they are only supported
+    on databases returning them from bulk inserts.
+    """
+
+    def __init__(self, form_class: T.Type[forms.ModelForm]):
+        if not issubclass(form_class, forms.ModelForm):
+            raise exceptions.ImproperlyConfigured("Bulk saving requires a ModelForm, got %s" % form_class.__name__)
+        self.form_class = form_class
+        self.model = form_class._meta.model
+        self.using = router.db_for_write(self.model)
+        self.m2m_fields = [
+            model_field for model_field in self.model._meta.many_to_many
+            if model_field.name in form_class.base_fields
+        ]
+        if self.m2m_fields and not connections[self.using].features.can_return_rows_from_bulk_insert:
+            raise exceptions.ImproperlyConfigured(
+                "%s has many-to-many fields; the %r database can't bulk-save them." % (form_class.__name__, self.using)
+            )
+
+    def instance(self, data: Record) -> T.Any:
+        """Build an unsaved instance from cleaned data, as ModelForm.save(commit=False) would."""
+        form = self.form_class()
+        form.cleaned_data = data
+        return model_forms.construct_instance(
+            form, self.model(), fields=self.form_class._meta.fields, exclude=self.form_class._meta.exclude,
+        )
+
+    def _save_m2m(self, instance: T.Any, data: Record) -> None:
+        for model_field in self.m2m_fields:
+            if model_field.name in data:
+                model_field.save_form_data(instance, data[model_field.name])
+
+    def save(self, results: T.List[Result]) -> T.List[Result]:
+        """Save the valid results; those failing to save are turned into errors."""
+        valid = [result for result in results if result.valid]
+        if not valid:
+            return results
+        rows = [result.data for result in valid if result.data is not None]
+        try:
+            with transaction.atomic(using=self.using):
+                instances = [self.instance(data) for data in rows]
+                self.model._default_manager.db_manager(self.using).bulk_create(instances)
+                for instance, data in zip(instances, rows):
+                    self._save_m2m(instance, data)
+        except DatabaseError:
+            self._save_rows(valid)
+        return results
+
+    def _save_rows(self, results: T.List[Result]) -> None:
+        for result in results:
+            assert result.data is not None
+            try:
+                with transaction.atomic(using=self.using):
+                    instance = self.instance(result.data)
+                    instance.save(using=self.using)
+                    self._save_m2m(instance, result.data)
+            except DatabaseError as e:
+                result.data = None
+                result.add_error(forms.ValidationError(
+                    "Could not save: %(error)s", code='save_failed', params={'error': e},
+                ))
+
+
+class BatchRunner:
+    """Run a FormPrompter's form over a stream of records, without prompting.
+
+    Every step is a generator: a single record is held in memory at a time.
+
+    With ``jobs > 1``, records are validated by a pool of worker processes,
+    in chunks of ``chunk_size`` records; results are still yielded in input order,
+    and at most ``2 * jobs`` chunks are in flight at any time.
+    Database connections are closed before the workers start; see close_connections().
+
+    With ``prefetch``, foreign keys and unique checks are looked up for ``chunk_size`` records
+    at a time, through bulk queries; with ``columnar``, each distinct value of a chunk's column
+    is cleaned once. Either way, input is then read one chunk ahead.
+
+    With ``bulk_size``, valid records of a ModelForm are saved through a BulkSaver,
+    in batches of ``bulk_size`` results, instead of calling ``prompter.on_submit()``;
+    results are held back until their batch is saved.
+
+    With a formset.FormsetPrompter, records are the formset's rows: they are checked
+    against each other as they come, and submitted by chunks of ``prompter.flush_size``
+    through ``prompter.on_submit_rows()``; formset-wide errors found once all rows
+    are read (e.g too few rows) are reported on line 0.
+    """
+    DEFAULT_CHUNK_SIZE = 500
+
+    def __init__(
+            self, prompter: cliform_django.FormPrompter, submit: bool = False,
+            jobs: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, bulk_size: T.Optional[int] = None,
+            prefetch: bool = False, columnar: bool = False):
+        self.prompter = prompter
+        self.submit = submit
+        self.jobs = jobs
+        self.chunk_size = chunk_size
+        self.bulk_size = bulk_size
+        self.prefetch = prefetch
+        self.columnar = columnar
+
+    def validate(self, lines: T.Iterable[Line]) -> T.Iterator[Result]:
+        if self.jobs > 1:
+            yield from self._validate_parallel(lines)
+            return
+        validator = Validator.for_prompter(self.prompter, prefetch=self.prefetch, columnar=self.columnar)
+        if self.prefetch or self.columnar:
+            for chunk in chunked(lines, self.chunk_size):
+                yield from validator.chunk(chunk)
+            return
+        for lineno, text in lines:
+            yield validator.line(lineno, text)
+
+    def _validate_parallel(self, lines: T.Iterable[Line]) -> T.Iterator[Result]:
+        validator = Validator.for_prompter(self.prompter, prefetch=self.prefetch, columnar=self.columnar)
+        pending: T.Deque['futures.Future[T.List[Result]]'] = collections.deque()
+        close_connections()
+        with futures.ProcessPoolExecutor(max_workers=self.jobs, initializer=setup_worker) as executor:
+            for chunk in chunked(lines, self.chunk_size):
+                pending.append(executor.submit(validator.chunk, chunk))
+                if len(pending) >= 2 * self.jobs:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def _bulk_submit(self, results: T.Iterable[Result]) -> T.Iterator[Result]:
+        assert self.bulk_size
+        saver = BulkSaver(self.prompter.form_class)
+        pending: T.List[Result] = []
+        for result in results:
+            pending.append(result)
+            # Invalid results count as well: at most bulk_size results are held back.
+            if len(pending) >= self.bulk_size:
+                yield from saver.save(pending)
+                pending = []
+        if pending:
+            yield from saver.save(pending)
+
+    def _formset_rows(self, results: T.Iterable[Result]) -> T.Iterator[Result]:
+        """Run formset-wide validation over results; submit valid rows by chunks, unless bulk saving."""
+        prompter = T.cast(cliform_formset.FormsetPrompter, self.prompter)
+        cleaner = cliform_formset.FormsetCleaner(prompter.formset_class)
+        for chunk in chunked(results, prompter.flush_size):
+            valid = []
+            for result in chunk:
+                if not result.valid:
+                    continue
+                assert result.data is not None
+                errors = cleaner.row(result.data)
+                if errors:
+                    result.data = None
+                    result.errors.extend(errors)
+                else:
+                    cleaner.hold(result.data)
+                    valid.append(result)
+            rows = [result.data for result in valid if result.data is not None]
+            errors = cleaner.chunk(rows)
+            if errors:
+                cleaner.reject()
+                for result in valid:
+                    result.data = None
+                    result.errors.extend(errors)
+            else:
+                cleaner.accept()
+                if self.submit and rows and not self.bulk_size:
+                    prompter.submit_rows(rows)
+            yield from chunk
+        errors = cleaner.finish()
+        if errors:
+            yield Result(line=0, errors=errors)
+
+    def results(self, stream: T.Iterable[T.Text]) -> T.Iterator[Result]:
+        return self.process(read_lines(stream))
+
+    def process(self, lines: T.Iterable[Line]) -> T.Iterator[Result]:
+        """Validate, and maybe submit, (line number, text) pairs, as from read_lines().
+
+        The text may also be an already parsed record, as from tabular.TabularReader.records().
+        """
+        results = self.validate(lines)
+        rows = isinstance(self.prompter, cliform_formset.FormsetPrompter)
+        if rows:
+            results = self._formset_rows(results)
+        if self.submit and self.bulk_size:
+            yield from self._bulk_submit(results)
+            return
+        for result in results:
+            if self.submit and result.valid and not rows:
+                assert result.data is not None
+                self.prompter.on_submit(result.data)
+            yield result
+
+    def run(self, stdin: T.TextIO, stdout: T.TextIO, report: T.Optional[cliform_report.ErrorReport] = None) -> int:
+        """Process all of stdin; return the number of invalid records.
+
+        With a ``report``, errors are aggregated there instead of written to stdout.
+        """
+        failures = 0
+        for result in self.results(stdin):
+            if not result.valid:
+                failures += 1
+            if report is not None:
+                report.add(result.line, result.error_details())
+                if not result.valid:
+                    continue
+            stdout.write(result.as_json() + '\n')
+        if report is not None:
+            report.finish()
+        return failures
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Memoize field validation results.
+
+Only use this for fields whose validation is deterministic: the same raw value
+must always clean to the same result.
+"""
+
+import collections
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+import typing as T
+import weakref
+
+from django import forms
+from django.core import exceptions
+from django.utils.functional import Promise
+
+_MISSING = object()
+
+_fingerprints: 'weakref.WeakKeyDictionary[forms.Field, T.Text]' = weakref.WeakKeyDictionary()
+
+
+def _stable(value: T.Any) -> T.Any:
+    """value, with lazy strings resolved: its repr() doesn't change between processes."""
+    if isinstance(value, Promise):
+        return str(value)
+    elif isinstance(value, (list, tuple)):
+        return [_stable(item) for item in value]
+    elif isinstance(value, dict):
+        return sorted((key, _stable(item)) for key, item in value.items())
+    return value
+
+
+def _validator_signature(validator: T.Any) -> T.Any:
+    if hasattr(validator, 'deconstruct'):
+        return _stable(validator.deconstruct())
+    return '%s.%s' % (validator.__module__, getattr(validator, '__qualname__', type(validator).__qualname__))
+
+
+def field_fingerprint(field: forms.Field) -> T.Text:
+    """A hash of what decides how a field cleans values: its class, validators and choices."""
+    fingerprint = _fingerprints.get(field)
+    if fingerprint is None:
+        parts: T.List[T.Any] = [
+            type(field).__module__, type(field).__qualname__, field.required,
+            [_validator_signature(validator) for validator in field.validators],
+        ]
+        if isinstance(field, forms.ModelChoiceField):
+            # Don't run the queryset
+            parts.append(field.queryset.model._meta.label)
+        elif isinstance(field, forms.ChoiceField):
+            keys: T.List[T.Any] = []
+            for key, value in field.choices:
+                if isinstance(value, (list, tuple)):
+                    keys.extend(option for option, _label in value)
+                else:
+                    keys.append(key)
+            parts.append(_stable(keys))
+        fingerprint = _fingerprints[field] = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+    return fingerprint
+
+
+class ValidationCache:
+    """Field cleaning results, keyed by (form class, field name, field fingerprint, raw value).
+
+    The fingerprint (see field_fingerprint()) tells apart fields changed at runtime,
+    e.g their choices or validators set in the form's ``__init__()``.
+
+    - An in-memory LRU holds up to ``maxsize`` results;
+    - With a ``path``, results are also stored in an SQLite database, shared between
+      processes and runs, holding up to ``max_disk_entries`` results (oldest are evicted first);
+    - Results older than ``ttl`` seconds are ignored.
+
+    Validation errors are cached as well.
+    """
+    # Check the size of the database every that many insertions.
+    EVICTION_INTERVAL = 1000
+
+    def __init__(
+            self, maxsize: int = 10000, ttl: T.Optional[float] = None,
+            path: T.Optional[T.Text] = None, max_disk_entries: int = 1000000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: 'collections.OrderedDict[T.Text, T.Tuple[float, T.Any]]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db: T.Optional[sqlite3.Connection] = None
+        self._inserts = 0
+
+    def __getstate__(self) -> T.Dict[T.Text, T.Any]:
+        # Worker processes get their own memory tier and database connection.
+        return {
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'path': self.path,
+            'max_disk_entries': self.max_disk_entries,
+        }
+
+    def __setstate__(self, state: T.Dict[T.Text, T.Any]) -> None:
+        self.__init__(**state)  # type: ignore
+
+    @staticmethod
+    def key(form_class: type, field_name: T.Text, raw: T.Any, fingerprint: T.Text = '') -> T.Text:
+        return '%s.%s:%s:%s:%r' % (form_class.__module__, form_class.__qualname__, field_name, fingerprint, raw)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            assert self.path is not None
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, created REAL NOT NULL, value BLOB NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS results_created ON results (created)')
+        return self._db
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and created + self.ttl < time.time()
+
+    def get(self, key: T.Text) -> T.Any:
+        """The cached outcome for key, or _MISSING."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                return entry[1]
+            if self.path is None:
+                return _MISSING
+            row = self._connect().execute('SELECT created, value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None or self._expired(row[0]):
+            return _MISSING
+        outcome = pickle.loads(row[1])
+        self._remember(key, row[0], outcome)
+        return outcome
+
+    def _remember(self, key: T.Text, created: float, outcome: T.Any) -> None:
+        with self._lock:
+            self._memory[key] = (created, outcome)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def set(self, key: T.Text, outcome: T.Any) -> None:
+        created = time.time()
+        self._remember(key, created, outcome)
+        if self.path is None:
+            return
+        try:
+            value = pickle.dumps(outcome, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Keep unpicklable results in memory only.
+            return
+        with self._lock:
+            db = self._connect()
+            db.execute('INSERT OR REPLACE INTO results (key, created, value) VALUES (?, ?, ?)', (key, created, value))
+            self._inserts += 1
+            if self._inserts % self.EVICTION_INTERVAL == 0:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        if self.ttl is not None:
+            db.execute('DELETE FROM results WHERE created < ?', (time.time() - self.ttl,))
+        count, = db.execute('SELECT COUNT(*) FROM results').fetchone()
+        if count > self.max_disk_entries:
+            db.execute(
+                'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created LIMIT ?)',
+                (count - self.max_disk_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self.path is not None:
+                self._connect().execute('DELETE FROM results')
+
+    def clean(self, form_class: type, field_name: T.Text, raw: T.Any, clean: T.Callable[[T.Any], T.Any]) -> T.Any:
+        """Return clean(raw), or its cached result; raise ValidationError for invalid values.
+
+        When clean is a field's clean() method, the key includes the field's fingerprint.
+        """
+        field = getattr(clean, '__self__', None)
+        fingerprint = field_fingerprint(field) if isinstance(field, forms.Field) else ''
+        key = self.key(form_class, field_name, raw, fingerprint)
+        outcome = self.get(key)
+        if outcome is _MISSING:
+            self.misses += 1
+            try:
+                outcome = clean(raw)
+            except exceptions.ValidationError as e:
+                # Keep the messages only, not the traceback.
+                outcome = exceptions.ValidationError(e.error_list)
+            self.set(key, outcome)
+        else:
+            self.hits += 1
+        if isinstance(outcome, exceptions.ValidationError):
+            raise exceptions.ValidationError(outcome.error_list)
+        return outcome
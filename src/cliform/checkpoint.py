@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Resumable batch runs over files.
+
+A CheckpointedRun writes the results of a BatchRunner to an output file, and regularly
+records how far it went in a checkpoint file: the last input line done, the size of
+the output at that point, and the number of failures so far.
+
+When restarted after a crash, it truncates the output back to the checkpoint, and
+resumes at the next input line, found through a LineIndex: the output file ends up
+exactly as if the run had never stopped.
+Records submitted after the last checkpoint (with ``submit=True``) are submitted again.
+"""
+
+import array
+import dataclasses
+import json
+import mmap
+import os
+import struct
+import typing as T
+from dataclasses import dataclass
+
+from . import batch
+
+
+class LineIndex:
+    """Byte offsets of the start of each line of a file.
+
+    The offsets are stored in an index file, memory-mapped when reused:
+    opening the index of a large file doesn't read it.
+    The index file is rebuilt whenever the input file changes.
+    """
+    MAGIC = b'clfidx01'
+    # Magic, input size, input mtime (ns)
+    HEADER = struct.Struct('<8sQQ')
+
+    def __init__(self, offsets: T.Sequence[int], size: int, keep: T.Any = None):
+        self._offsets = offsets
+        self.size = size
+        # Keeps the mapped index file alive
+        self._keep = keep
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def offset(self, line: int) -> int:
+        """Byte offset of the start of line (1-based); the input size past the last line."""
+        if line > len(self._offsets):
+            return self.size
+        return self._offsets[line - 1]
+
+    @staticmethod
+    def scan(data: T.Union[bytes, mmap.mmap]) -> 'array.array[int]':
+        offsets = array.array('Q')
+        position = 0
+        size = len(data)
+        while position < size:
+            offsets.append(position)
+            position = data.find(b'\n', position)
+            if position == -1:
+                break
+            position += 1
+        return offsets
+
+    @classmethod
+    def open(cls, path: T.Text, index_path: T.Text) -> 'LineIndex':
+        stat = os.stat(path)
+        header = cls.HEADER.pack(cls.MAGIC, stat.st_size, stat.st_mtime_ns)
+        if os.path.exists(index_path) and os.path.getsize(index_path) >= cls.HEADER.size:
+            with open(index_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:cls.HEADER.size] == header:
+                offsets: T.Sequence[int] = memoryview(mapped)[cls.HEADER.size:].cast('Q')
+                return cls(offsets, stat.st_size, keep=mapped)
+            mapped.close()
+
+        with open(path, 'rb') as f:
+            if stat.st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    scanned = cls.scan(data)
+            else:
+                scanned = array.array('Q')
+        temp_path = index_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            scanned.tofile(f)
+        os.replace(temp_path, index_path)
+        return cls(scanned, stat.st_size)
+
+    def read(self, path: T.Text, start: int = 1) -> T.Iterator[T.Tuple[int, T.Text]]:
+        """Yield (line number, text) for the non-blank lines of path, from line start on."""
+        if start > len(self):
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for line in range(start, len(self) + 1):
+                text = data[self.offset(line):self.offset(line + 1)].decode('utf-8').strip()
+                if text:
+                    yield line, text
+
+
+@dataclass
+class Checkpoint:
+    """Progress of a run, as of its last checkpoint."""
+    input_size: int
+    input_mtime_ns: int
+    # Last input line done
+    line: int = 0
+    # Size of the output file for those lines
+    output_offset: int = 0
+    failures: int = 0
+    complete: bool = False
+
+    def save(self, path: T.Text) -> None:
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(dataclasses.asdict(self), f, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: T.Text) -> T.Optional['Checkpoint']:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+
+class CheckpointedRun:
+    """Run a BatchRunner over input_path, writing results to output_path; resumable.
+
+    A checkpoint is taken every ``interval`` records, once their results are on disk.
+    The checkpoint and index files default to ``<output_path>.checkpoint`` and ``<output_path>.index``.
+    """
+    DEFAULT_INTERVAL = 10000
+
+    def __init__(
+            self, runner: batch.BatchRunner, input_path: T.Text, output_path: T.Text,
+            checkpoint_path: T.Optional[T.Text] = None, index_path: T.Optional[T.Text] = None,
+            interval: int = DEFAULT_INTERVAL):
+        self.runner = runner
+        self.input_path = input_path
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+        self.index_path = index_path or output_path + '.index'
+        self.interval = interval
+
+    def _checkpoint(self, state: Checkpoint, output: T.IO[bytes]) -> None:
+        output.flush()
+        os.fsync(output.fileno())
+        state.output_offset = output.tell()
+        state.save(self.checkpoint_path)
+
+    def run(self) -> int:
+        """Process the input from the last checkpoint on; return the number of invalid records overall."""
+        stat = os.stat(self.input_path)
+        state = Checkpoint.load(self.checkpoint_path)
+        if state is None:
+            state = Checkpoint(input_size=stat.st_size, input_mtime_ns=stat.st_mtime_ns)
+        elif (state.input_size, state.input_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            raise ValueError("%s changed since the last checkpoint, in %s" % (self.input_path, self.checkpoint_path))
+        if state.complete:
+            return state.failures
+
+        if state.output_offset and not os.path.exists(self.output_path):
+            raise ValueError("%s is missing; remove %s to start over" % (self.output_path, self.checkpoint_path))
+
+        index = LineIndex.open(self.input_path, self.index_path)
+        mode = 'r+b' if state.output_offset else 'wb'
+        with open(self.output_path, mode) as output:
+            # Drop results written after the checkpoint
+            output.truncate(state.output_offset)
+            output.seek(state.output_offset)
+            pending = 0
+            for result in self.runner.process(index.read(self.input_path, start=state.line + 1)):
+                output.write(result.as_json().encode('utf-8') + b'\n')
+                state.line = result.line
+                state.failures += not result.valid
+                pending += 1
+                if pending >= self.interval:
+                    self._checkpoint(state, output)
+                    pending = 0
+            state.line = len(index)
+            state.complete = True
+            self._checkpoint(state, output)
+        return state.failures
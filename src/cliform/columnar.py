@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Clean a chunk of records column by column, each distinct value once.
+
+For each field, the raw values of all records are deduplicated; each distinct value
+is cleaned once, then its result is handed back to every record holding it,
+before the form-wide validation (see django.clean_form()).
+
+Common built-in fields are cleaned through a fast path: a check compiled once per
+column, which only accepts values that field.clean() would accept unchanged.
+Anything else goes through field.clean(), so errors are exactly the same.
+"""
+
+import datetime
+import decimal
+import typing as T
+import uuid
+
+from django import forms
+from django.core import validators
+
+from . import cache
+
+# Results which can safely be shared among records.
+IMMUTABLE_TYPES = (
+    type(None), bool, int, float, str, bytes, decimal.Decimal,
+    datetime.date, datetime.time, datetime.timedelta, uuid.UUID,
+)
+
+# Returned by a fast path for values it can't vouch for.
+SLOW = object()
+
+FastPath = T.Callable[[T.Any], T.Any]
+Check = T.Callable[[T.Any], bool]
+
+
+def _email_check(validator: validators.EmailValidator) -> T.Optional[Check]:
+    # Named domain_whitelist before Django 3.2
+    allowlist = getattr(validator, 'domain_allowlist', None)
+    if allowlist is None:
+        allowlist = getattr(validator, 'domain_whitelist', None)
+    if allowlist is None:
+        return None
+
+    def check(value: T.Any) -> bool:
+        if not value or '@' not in value or len(value) > 320:
+            return False
+        user_part, domain_part = value.rsplit('@', 1)
+        return bool(validator.user_regex.match(user_part)) and (
+            domain_part in allowlist or bool(validator.domain_regex.match(domain_part))
+        )
+    return check
+
+
+def _validator_check(validator: T.Any) -> T.Optional[Check]:
+    """A check accepting values that validator accepts; None if validator has no fast path."""
+    kind = type(validator)
+    if kind in (validators.MaxLengthValidator, validators.MinLengthValidator,
+                validators.MaxValueValidator, validators.MinValueValidator):
+        if callable(validator.limit_value):
+            return None
+        limit = validator.limit_value
+        return {
+            validators.MaxLengthValidator: lambda value: len(value) <= limit,
+            validators.MinLengthValidator: lambda value: len(value) >= limit,
+            validators.MaxValueValidator: lambda value: value <= limit,
+            validators.MinValueValidator: lambda value: value >= limit,
+        }[kind]
+    elif kind is validators.ProhibitNullCharactersValidator:
+        return lambda value: '\x00' not in str(value)
+    elif kind is validators.RegexValidator:
+        return lambda value: bool(validator.regex.search(str(value))) != validator.inverse_match
+    elif kind is validators.EmailValidator:
+        return _email_check(validator)
+    return None
+
+
+def _choice_texts(field: forms.ChoiceField) -> T.Set[T.Text]:
+    texts: T.Set[T.Text] = set()
+    for key, value in field.choices:
+        if isinstance(value, (list, tuple)):
+            texts.update(str(subkey) for subkey, _label in value)
+        else:
+            texts.add(str(key))
+    texts.discard('')
+    return texts
+
+
+def fast_path(field: forms.Field) -> T.Optional[FastPath]:
+    """A replacement for field.clean(), returning SLOW for values it can't vouch for; None if unsupported."""
+    checks: T.List[Check] = []
+    for validator in field.validators:
+        check = _validator_check(validator)
+        if check is None:
+            return None
+        checks.append(check)
+    kind = type(field)
+
+    if kind in (forms.CharField, forms.EmailField, forms.RegexField):
+        strip = field.strip
+
+        def to_python(value: T.Any) -> T.Any:
+            if type(value) is not str:
+                return SLOW
+            value = value.strip() if strip else value
+            return value or SLOW
+    elif kind is forms.IntegerField and not field.localize:
+        def to_python(value: T.Any) -> T.Any:
+            if type(value) is int:
+                return value
+            elif type(value) is str and value.isascii() and value.isdigit():
+                return int(value)
+            return SLOW
+    elif kind is forms.ChoiceField:
+        texts = _choice_texts(field)
+
+        def to_python(value: T.Any) -> T.Any:
+            if type(value) not in (str, int):
+                return SLOW
+            value = str(value)
+            return value if value in texts else SLOW
+    else:
+        return None
+
+    def clean(value: T.Any) -> T.Any:
+        cleaned = to_python(value)
+        if cleaned is SLOW or not all(check(cleaned) for check in checks):
+            return SLOW
+        return cleaned
+    return clean
+
+
+def _is_standalone(form_class: T.Type[forms.BaseForm], fields: T.Mapping[T.Text, forms.Field]) -> bool:
+    """Whether form_class' validation is nothing more than the clean() of each of its fields."""
+    return (
+        issubclass(form_class, forms.Form)
+        and form_class.__init__ is forms.BaseForm.__init__
+        and all(
+            getattr(form_class, method) is getattr(forms.BaseForm, method)
+            for method in ('full_clean', '_clean_fields', '_clean_form', '_post_clean', 'clean')
+        )
+        and not any(hasattr(form_class, 'clean_%s' % name) for name in fields)
+        and not any(_skipped(field) for field in fields.values())
+    )
+
+
+def _skipped(field: forms.Field) -> bool:
+    return field.disabled or isinstance(field, (forms.FileField, forms.ModelChoiceField))
+
+
+class ColumnCleaner:
+    """Clean the fields of many records for the same form class, column by column.
+
+    Fields are read from an unbound form, as for prefetch.LookupIndex.
+    Fields listed in ``cached_fields`` go through ``validation_cache`` instead of the fast paths.
+    Disabled fields, file fields and model choice fields are left to the form.
+
+    When the form does nothing more than cleaning each of its fields, ``standalone``
+    is true: the cleaned values of a record are all there is to its validation,
+    and no form needs to be built.
+    """
+
+    def __init__(
+            self, form_class: T.Type[forms.BaseForm],
+            validation_cache: T.Optional[cache.ValidationCache] = None, cached_fields: T.Collection[T.Text] = ()):
+        self.form_class = form_class
+        self.validation_cache = validation_cache
+        self.cached_fields = cached_fields
+        self._probe = form_class()
+        self.fields = self._probe.fields
+        self.standalone = _is_standalone(form_class, self.fields)
+
+    def _slow_clean(self, name: T.Text, field: forms.Field, raw: T.Any) -> T.Any:
+        """field.clean(raw), or the ValidationError it raised."""
+        try:
+            if self.validation_cache is not None and name in self.cached_fields:
+                return self.validation_cache.clean(self.form_class, name, raw, field.clean)
+            return field.clean(raw)
+        except forms.ValidationError as e:
+            return e
+
+    def clean(
+            self, records: T.Sequence[T.Mapping[T.Text, T.Any]],
+            cleaned: T.Optional[T.Sequence[T.Mapping[T.Text, T.Any]]] = None) -> T.List[T.Dict[T.Text, T.Any]]:
+        """The cleaned values of each record, as expected by clean_form(), in field order.
+
+        ``cleaned`` holds values already cleaned for each record; they are kept as is.
+        """
+        results: T.List[T.Dict[T.Text, T.Any]] = [{} for _record in records]
+        for name, field in self.fields.items():
+            if _skipped(field):
+                continue
+            fast = None if name in self.cached_fields else fast_path(field)
+            prefixed_name = self._probe.add_prefix(name)
+            # (type, raw value) => cleaned value, or ValidationError
+            column: T.Dict[T.Tuple[type, T.Any], T.Any] = {}
+            for rank, (record, values) in enumerate(zip(records, results)):
+                if cleaned and name in cleaned[rank]:
+                    values[name] = cleaned[rank][name]
+                    continue
+                raw = field.widget.value_from_datadict(record, {}, prefixed_name)
+                try:
+                    key = (type(raw), raw)
+                    outcome = column.get(key, SLOW)
+                except TypeError:
+                    # Unhashable; no sharing
+                    values[name] = self._slow_clean(name, field, raw)
+                    continue
+
+                if outcome is SLOW:
+                    outcome = fast(raw) if fast is not None else SLOW
+                    if outcome is SLOW:
+                        outcome = self._slow_clean(name, field, raw)
+                    if isinstance(outcome, (forms.ValidationError,) + IMMUTABLE_TYPES):
+                        column[key] = outcome
+                if isinstance(outcome, forms.ValidationError):
+                    # Each record gets its own error
+                    outcome = forms.ValidationError(outcome.error_list)
+                values[name] = outcome
+        if cleaned:
+            for values, known in zip(results, cleaned):
+                values.update((name, value) for name, value in known.items() if name not in values)
+        return results
@@ -3,11 +3,20 @@
 # This code is distributed under the two-clause BSD License.
 
 import collections
+import dataclasses
+import threading
+import time
 import typing as T
+from concurrent import futures
+from dataclasses import dataclass
 
 from django import forms
+from django.core import exceptions
+from django.db import models
 
-from . import interact
+from . import cache, interact
+from . import session as cliform_session
+from . import spec, trace
 
 
 def walk_errors(error: forms.ValidationError) -> T.Iterable[T.Text]:
@@ -20,26 +29,396 @@ def walk_errors(error: forms.ValidationError) -> T.Iterable[T.Text]:
             yield message
 
 
+class ErrorDetail(T.NamedTuple):
+    """A single validation error, with what identifies its kind: its field, code and message template."""
+    field: T.Optional[T.Text]
+    code: T.Optional[T.Text]
+    template: T.Text
+    message: T.Text
+
+    @property
+    def text(self) -> T.Text:
+        """The error, as formatted by walk_errors()."""
+        return "%s: %s" % (self.field, self.message) if self.field else self.message
+
+
+def walk_error_details(error: forms.ValidationError, field: T.Optional[T.Text] = None) -> T.Iterable[ErrorDetail]:
+    """As walk_errors(), keeping the code and message template of each error."""
+    if hasattr(error, 'error_dict'):
+        for name, errors in error.error_dict.items():
+            for item in errors:
+                yield from walk_error_details(item, name)
+        return
+    for item in error.error_list:
+        message = item.message % item.params if item.params else item.message
+        yield ErrorDetail(field=field, code=item.code, template=str(item.message), message=str(message))
+
+
+def _clean_fields(form: forms.BaseForm, cleaned: T.Mapping[T.Text, T.Any]) -> None:
+    """Replacement for BaseForm._clean_fields(), using already cleaned values when available."""
+    for name, field in form.fields.items():
+        try:
+            if name in cleaned and not field.disabled:
+                value = cleaned[name]
+                if isinstance(value, forms.ValidationError):
+                    raise value
+            else:
+                if field.disabled:
+                    value = form.get_initial_for_field(field, name)
+                else:
+                    value = field.widget.value_from_datadict(form.data, form.files, form.add_prefix(name))
+                if isinstance(field, forms.FileField):
+                    value = field.clean(value, form.get_initial_for_field(field, name))
+                else:
+                    value = field.clean(value)
+            form.cleaned_data[name] = value
+            if hasattr(form, 'clean_%s' % name):
+                form.cleaned_data[name] = getattr(form, 'clean_%s' % name)()
+        except forms.ValidationError as e:
+            form.add_error(name, e)
+
+
+def clean_form(form: forms.BaseForm, cleaned: T.Mapping[T.Text, T.Any]) -> bool:
+    """Validate a bound form, like form.is_valid(), without cleaning again the fields in ``cleaned``.
+
+    ``cleaned`` maps field names to the result of field.clean() on the form's data for them,
+    or the ValidationError it raised; the rest of the validation (``clean_<field>()``, ``clean()``,
+    model validation) runs as usual.
+    """
+    form._clean_fields = lambda: _clean_fields(form, cleaned)
+    try:
+        form.full_clean()
+    finally:
+        del form._clean_fields
+    return form.is_bound and not form.errors
+
+
+def clean_form_cached(
+        form: forms.BaseForm, validation_cache: cache.ValidationCache, cached_fields: T.Iterable[T.Text],
+        cleaned: T.Optional[T.Mapping[T.Text, T.Any]] = None) -> bool:
+    """Validate a bound form, like form.is_valid(); cached_fields are cleaned through validation_cache.
+
+    ``cleaned`` holds values already cleaned, as for clean_form(); they are not looked up in the cache.
+    """
+    cleaned = dict(cleaned or {})
+    for name in cached_fields:
+        field = form.fields[name]
+        if field.disabled or isinstance(field, forms.FileField) or name in cleaned:
+            continue
+        raw = field.widget.value_from_datadict(form.data, form.files, form.add_prefix(name))
+        try:
+            cleaned[name] = validation_cache.clean(type(form), name, raw, field.clean)
+        except forms.ValidationError as e:
+            cleaned[name] = e
+    return clean_form(form, cleaned)
+
+
+class FieldValue(T.NamedTuple):
+    """A reply to a field's prompt, and the field's clean() result for it."""
+    raw: T.Any
+    cleaned: T.Any
+
+
+def choice_options(field: forms.ChoiceField) -> T.List[T.Tuple[interact.OptionKey, T.Text]]:
+    """The options of a choice field, with option groups flattened."""
+    options = []
+    for key, value in field.choices:
+        if isinstance(value, str):
+            options.append((interact.OptionKey(key), value))
+        else:
+            options.extend([
+                (interact.OptionKey(subkey), subvalue)
+                for subkey, subvalue in value
+            ])
+    return options
+
+
+FieldLoop = T.Generator[interact.Output, interact.Input, FieldValue]
+
+
+@dataclass
+class QuerysetChoiceInput(interact.PagedChoiceInput):
+    """A choice among the rows of a ModelChoiceField's queryset, fetched one page at a time.
+
+    Pages are fetched by increasing primary key (keyset pagination), so that
+    neither the first page nor any later one requires scanning the whole table.
+
+    Replies:
+    - A number selects the matching row on the displayed page;
+    - ``>`` / ``<`` move to the next / previous page;
+    - ``=value`` selects the row whose key (``to_field_name`` or pk) is ``value``;
+    - With a ``search_lookup``, other text lists rows whose lookup starts with it;
+      otherwise, it is used as a key.
+
+    For a ModelMultipleChoiceField, several replies may be separated with commas.
+    A single choice keeps the row it selected: FormPrompter cleans it without querying it again.
+    """
+    field: forms.ModelChoiceField
+    search_lookup: T.Optional[T.Text] = None
+    multiple: bool = False
+    default_first: bool = False
+    page_size: int = 20
+    # The pk of the last row of each previous page
+    cursor: T.Tuple[T.Any, ...] = ()
+    query: T.Text = ''
+    notice: T.Text = ''
+    _rows: T.Optional[T.List[models.Model]] = dataclasses.field(default=None, init=False, repr=False, compare=False)
+    # Rows selected by convert(), by value; shared with the pages and searches derived from this prompt
+    _selected: T.Dict[T.Text, models.Model] = dataclasses.field(
+        default_factory=dict, init=False, repr=False, compare=False,
+    )
+
+    def _replace(self, **changes: T.Any) -> 'QuerysetChoiceInput':
+        prompt = dataclasses.replace(self, **changes)
+        prompt._selected = self._selected
+        return prompt
+
+    def _queryset(self) -> 'models.QuerySet[T.Any]':
+        queryset = self.field.queryset
+        if self.query and self.search_lookup:
+            queryset = queryset.filter(**{'%s__istartswith' % self.search_lookup: self.query})
+        return queryset.order_by('pk')
+
+    def _fetch(self) -> T.List[models.Model]:
+        if self._rows is None:
+            queryset = self._queryset()
+            if self.cursor:
+                queryset = queryset.filter(pk__gt=self.cursor[-1])
+            # One extra row tells whether a next page exists.
+            self._rows = list(queryset[:self.page_size + 1])
+        return self._rows
+
+    def rows(self) -> T.List[models.Model]:
+        return self._fetch()[:self.page_size]
+
+    @property
+    def has_next(self) -> bool:
+        return len(self._fetch()) > self.page_size
+
+    def page_items(self) -> T.List[T.Tuple[int, T.Text]]:
+        start = len(self.cursor) * self.page_size
+        return [
+            (start + rank + 1, self.field.label_from_instance(row))
+            for rank, row in enumerate(self.rows())
+        ]
+
+    def header(self) -> T.List[T.Text]:
+        items = self.page_items()
+        parts = ["{}-{}".format(items[0][0], items[-1][0]) if items else "no options"]
+        if self.query:
+            parts.append("matching {!r}".format(self.query))
+        if self.default_first and not self.cursor and not self.query and items:
+            parts.append("default: {}".format(items[0][1]))
+        if self.has_next:
+            parts.append("'>' for more")
+        return parts
+
+    def _value(self, row: models.Model) -> T.Any:
+        return self.field.prepare_value(row)
+
+    def _select(self, row: models.Model) -> T.Any:
+        value = self._value(row)
+        if not self.multiple:
+            self._selected[str(value)] = row
+        return value
+
+    def selected(self, value: T.Any) -> T.Optional[models.Model]:
+        """The row of a single choice, as converted from a reply; None if it wasn't fetched."""
+        return self._selected.get(str(value))
+
+    def _lookup(self, keys: T.Sequence[T.Text]) -> T.Dict[T.Text, models.Model]:
+        """Fetch the rows with the given keys, in a single query."""
+        key_name = self.field.to_field_name or 'pk'
+        try:
+            rows = list(self.field.queryset.filter(**{'%s__in' % key_name: keys}))
+        except (ValueError, TypeError, exceptions.ValidationError):
+            return {}
+        return {str(self._value(row)): row for row in rows}
+
+    def _resolve(self, tokens: T.Sequence[T.Text]) -> T.Optional[T.List[models.Model]]:
+        start = len(self.cursor) * self.page_size
+        rows = self.rows()
+        found: T.Dict[int, models.Model] = {}
+        keys = {}
+        for rank, token in enumerate(tokens):
+            if token.isdigit() and start < int(token) <= start + len(rows):
+                found[rank] = rows[int(token) - start - 1]
+            else:
+                keys[rank] = token[1:] if token.startswith('=') else token
+        if keys:
+            by_key = self._lookup(list(keys.values()))
+            for rank, key in keys.items():
+                if key not in by_key:
+                    return None
+                found[rank] = by_key[key]
+        return [found[rank] for rank in range(len(tokens))]
+
+    def convert(self, reply: T.Text) -> T.Any:
+        reply = reply.strip()
+        if not reply:
+            if self.multiple:
+                return []
+            if self.default_first:
+                first = dataclasses.replace(self, cursor=(), query='').rows()
+                if first:
+                    return self._select(first[0])
+            return reply
+        elif reply == '>':
+            if not self.has_next:
+                return self._replace(notice="No more options")
+            return self._replace(cursor=self.cursor + (self.rows()[-1].pk,), notice='')
+        elif reply == '<':
+            return self._replace(cursor=self.cursor[:-1], notice='')
+
+        tokens = [token.strip() for token in reply.split(',')] if self.multiple else [reply]
+        rows = self._resolve([token for token in tokens if token])
+        if rows is not None:
+            values = [self._select(row) for row in rows]
+            return values if self.multiple else values[0]
+        elif self.search_lookup and not reply.startswith('=') and not self.multiple:
+            narrowed = self._replace(cursor=(), query=reply, notice='')
+            if not narrowed.rows():
+                return self._replace(notice="No option matches %r" % reply)
+            elif len(narrowed.rows()) == 1:
+                return self._select(narrowed.rows()[0])
+            return narrowed
+        return self._replace(notice="No option matches %r" % reply)
+
+
+@dataclass
+class FieldPlan:
+    """How to prompt for a single field."""
+    name: T.Text
+    label: T.Text
+    field: forms.Field
+    prompt: interact.Prompt
+
+
+@dataclass
+class PromptPlan:
+    """Everything needed to prompt for a form, computed once per form class."""
+    fields: T.Dict[T.Text, FieldPlan]
+    confirm: interact.Prompt
+    # Rendered lines for the prompts above, by id() of the prompt;
+    # the plan holds a reference to each prompt, so those ids can't be reused.
+    rendered: T.Dict[int, T.Tuple[T.Text, ...]]
+    # See FormPrompter.form_version(); computed on first use.
+    version: T.Optional[T.Text] = None
+
+
+PlanKey = T.Tuple[type, type]
+
+
+class PlanCache:
+    """A process-wide, bounded LRU of PromptPlan, keyed by (prompter class, form class)."""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._plans: 'collections.OrderedDict[PlanKey, PromptPlan]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: PlanKey) -> T.Optional[PromptPlan]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+            return plan
+
+    def set(self, key: PlanKey, plan: PromptPlan) -> None:
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+    def invalidate(self, form_class: T.Optional[type] = None) -> None:
+        """Drop cached plans for form_class, or all of them."""
+        with self._lock:
+            if form_class is None:
+                self._plans.clear()
+                return
+            for key in [key for key in self._plans if key[1] is form_class]:
+                del self._plans[key]
+
+
+plan_cache = PlanCache()
+
+
+_executor: T.Optional[futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def default_validation_executor() -> futures.ThreadPoolExecutor:
+    """The thread pool shared by prompters using background validation."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = futures.ThreadPoolExecutor(thread_name_prefix='cliform-validation')
+        return _executor
+
+
 class FormPrompter(interact.Prompter):
     form_class: T.Type[forms.Form]
 
+    # Choice fields with more options use a paginated, searchable prompt.
+    INDEXED_CHOICES_THRESHOLD = 26
+
+    # For ModelChoiceField prompts: the lookup used to search rows of a model, e.g {User: 'username'}
+    choice_search_fields: T.Mapping[T.Type[models.Model], T.Text] = {}
+
+    # Set to False for forms whose fields or choices change between instances;
+    # or call invalidate_plan() whenever they change.
+    cache_plan: bool = True
+
+    # Validate replies in a thread pool while the next fields are prompted;
+    # errors are reported once known, and the failing field is asked again.
+    background_validation: bool = False
+    # Fields still validated before moving on, e.g when later prompts depend on their value.
+    sync_fields: T.Collection[T.Text] = ()
+    # Defaults to default_validation_executor()
+    validation_executor: T.Optional[futures.Executor] = None
+
+    # Memoize the validation of cached_fields; only list fields with deterministic validation.
+    validation_cache: T.Optional[cache.ValidationCache] = None
+    cached_fields: T.Collection[T.Text] = ()
+
+    # Known values for some fields, e.g from prefill.collect(); only missing or invalid fields are prompted.
+    prefilled: T.Mapping[T.Text, T.Any] = {}
+    # Set to False to submit without confirmation when no field had to be prompted.
+    confirm_prefilled: bool = True
+
+    # The answers so far, kept up to date by interact(); see restore().
+    state: T.Optional[cliform_session.SessionState] = None
+    # Set by restore(), for the next interact() to resume from
+    _restored: T.Optional[cliform_session.SessionState] = None
+
+    _plan: T.Optional[PromptPlan] = None
+    # The prompts of the current session, by field name; see _clean_field()
+    _prompts: T.Optional[T.Dict[T.Text, interact.Prompt]] = None
+
     def _input_for_field(self, label, field: forms.Field) -> interact.Prompt:
         if isinstance(field, forms.BooleanField):
             return interact.BoolInput(
                 title=label,
                 default=True if field.required else None,
             )
+        elif isinstance(field, forms.ModelChoiceField):
+            multiple = isinstance(field, forms.ModelMultipleChoiceField)
+            return QuerysetChoiceInput(
+                title=label,
+                field=field,
+                search_lookup=self.choice_search_fields.get(field.queryset.model),
+                multiple=multiple,
+                default_first=field.required and not multiple,
+            )
         elif isinstance(field, forms.ChoiceField):
-            options = []
-            for key, value in field.choices:
-                if isinstance(value, str):
-                    options.append((interact.OptionKey(key), value))
-                else:
-                    options.extend([
-                        (interact.OptionKey(subkey), subvalue)
-                        for subkey, subvalue in value
-                    ])
-
+            options = choice_options(field)
+            if len(options) > self.INDEXED_CHOICES_THRESHOLD:
+                return interact.IndexedChoiceInput.from_texts(
+                    title=label,
+                    options=options,
+                    default_first=field.required,
+                )
             return interact.ChoiceInput.from_texts(
                 title=label,
                 options=options,
@@ -53,40 +432,264 @@ class FormPrompter(interact.Prompter):
             return label
         return field_name.replace('_', ' ').capitalize()
 
-    def _get_field(self, field_name: T.Text, field: forms.Field) -> interact.PromptLoop:
-        label = self._make_label(field_name, field.label)
+    def compile_plan(self) -> PromptPlan:
+        base_form = self.form_class()
+        fields = collections.OrderedDict()
+        for field_name, field in base_form.fields.items():
+            label = self._make_label(field_name, field.label)
+            fields[field_name] = FieldPlan(
+                name=field_name,
+                label=label,
+                field=field,
+                prompt=self._input_for_field(label, field),
+            )
+        confirm = interact.BoolInput(title="Confirm", default=True)
+        prompts = [field_plan.prompt for field_plan in fields.values()] + [confirm]
+        # Querysets must be read at each prompt, not once per process; see session_prompt().
+        prompts = [prompt for prompt in prompts if not isinstance(prompt, QuerysetChoiceInput)]
+        return PromptPlan(
+            fields=fields,
+            confirm=confirm,
+            rendered={id(prompt): tuple(super(FormPrompter, self).expand(prompt)) for prompt in prompts},
+        )
+
+    def get_plan(self) -> PromptPlan:
+        if not self.cache_plan:
+            return self.compile_plan()
+        key = (type(self), self.form_class)
+        plan = plan_cache.get(key)
+        if plan is None:
+            plan = self.compile_plan()
+            plan_cache.set(key, plan)
+        return plan
+
+    @classmethod
+    def invalidate_plan(cls) -> None:
+        plan_cache.invalidate(cls.form_class)
+
+    def expand(self, output: interact.Output) -> T.Iterable[T.Text]:
+        if self._plan is not None:
+            lines = self._plan.rendered.get(id(output))
+            if lines is not None:
+                return lines
+        return super().expand(output)
+
+    def _clean_field(self, field_plan: FieldPlan, value: T.Any) -> T.Any:
+        """Clean a reply as the form would: through the field's widget, then the field."""
+        name = field_plan.name
+        field = field_plan.field
+        self.trace(trace.CLEAN_START, field=name)
+        try:
+            raw = field.widget.value_from_datadict({name: value}, {}, name)
+            prompt = self._prompts.get(name) if self._prompts is not None else None
+            row = prompt.selected(raw) if isinstance(prompt, QuerysetChoiceInput) else None
+            if row is not None:
+                # Fetched by the prompt: check it as field.clean() would, without querying it again.
+                field.validate(row)
+                field.run_validators(row)
+                return row
+            if self.validation_cache is not None and name in self.cached_fields:
+                return self.validation_cache.clean(self.form_class, name, raw, field.clean)
+            return field.clean(raw)
+        finally:
+            self.trace(trace.CLEAN_END, field=name)
+
+    def session_prompt(self, field_plan: FieldPlan) -> interact.Prompt:
+        """The prompt for a field, in this session.
+
+        Plans are shared across sessions; queryset prompts hold the rows they fetched,
+        so each session gets its own copy of them.
+        """
+        if isinstance(field_plan.prompt, QuerysetChoiceInput):
+            return dataclasses.replace(field_plan.prompt)
+        return field_plan.prompt
+
+    def _ask(self, field_plan: FieldPlan) -> T.Generator[interact.Output, interact.Input, T.Any]:
+        if self.state is not None:
+            self.state.current = field_plan.name
+            self.state.prompted = True
+        self.trace(trace.PROMPT, field=field_plan.name)
+        prompt = self.session_prompt(field_plan)
+        if self._prompts is not None:
+            self._prompts[field_plan.name] = prompt
+        value = yield prompt
+        self.trace(trace.REPLY, field=field_plan.name)
+        return value
+
+    def _field_errors(
+            self, field_plan: FieldPlan, error: forms.ValidationError,
+            labelled: bool = False) -> T.Iterator[interact.Error]:
+        for message in walk_errors(error):
+            self.trace(trace.ERROR, field=field_plan.name, message=message)
+            yield interact.Error(message=message, field=field_plan.label if labelled else None)
+
+    def _get_field(self, field_plan: FieldPlan) -> FieldLoop:
         while True:
-            value = yield self._input_for_field(label, field)
+            value = yield from self._ask(field_plan)
             try:
-                field.clean(value)
+                cleaned = self._clean_field(field_plan, value)
             except forms.ValidationError as e:
-                for error in walk_errors(e):
-                    yield interact.Error(message=error)
+                yield from self._field_errors(field_plan, e)
             else:
-                return value
+                return self._answered(field_plan.name, FieldValue(raw=value, cleaned=cleaned))
 
-    def interact(self) -> interact.InteractLoop:
-        base_form = self.form_class()
-        values = {}
-        for field_name, field in base_form.fields.items():
-            values[field_name] = yield from self._get_field(field_name, field)
+    def _get_fields(
+            self, plan: PromptPlan,
+            names: T.Sequence[T.Text]) -> T.Generator[interact.Output, interact.Input, T.Dict[T.Text, FieldValue]]:
+        answers: T.Dict[T.Text, FieldValue] = {}
+        if not self.background_validation:
+            for name in names:
+                answers[name] = yield from self._get_field(plan.fields[name])
+            return answers
+
+        executor = self.validation_executor or default_validation_executor()
+        pending: T.Dict[T.Text, T.Tuple[T.Any, 'futures.Future[T.Any]']] = {}
+        queue = collections.deque(names)
+        while queue or pending:
+            # Report failed validations as soon as they are known, and ask those fields again.
+            failed = []
+            for name in [name for name in names if name in pending and pending[name][1].done()]:
+                value, future = pending.pop(name)
+                try:
+                    answers[name] = self._answered(name, FieldValue(raw=value, cleaned=future.result()))
+                except forms.ValidationError as e:
+                    yield from self._field_errors(plan.fields[name], e, labelled=True)
+                    failed.append(name)
+            queue.extendleft(reversed(failed))
+
+            if not queue:
+                if pending:
+                    futures.wait([future for _value, future in pending.values()], return_when=futures.FIRST_COMPLETED)
+                continue
 
-        form = self.form_class(values)
-        form.is_valid()
+            name = queue.popleft()
+            field_plan = plan.fields[name]
+            if name in self.sync_fields:
+                answers[name] = yield from self._get_field(field_plan)
+            else:
+                value = yield from self._ask(field_plan)
+                pending[name] = (value, executor.submit(self._clean_field, field_plan, value))
+        return answers
+
+    def _form_errors(self, form: forms.BaseForm) -> T.Iterator[interact.Error]:
+        for name, errors in form.errors.as_data().items():
+            field_plan = self._plan.fields.get(name) if self._plan else None
+            for error in walk_errors(forms.ValidationError(errors)):
+                self.trace(trace.ERROR, field=name, message=error)
+                yield interact.Error(message=error, field=field_plan.label if field_plan else None)
+
+    def form_version(self) -> T.Text:
+        """A hash of the form's fields and prompts."""
+        plan = self._plan if self._plan is not None else self.get_plan()
+        if plan.version is None:
+            plan.version = spec.spec_from_plan(type(self), plan).version
+        return plan.version
+
+    def restore(self, state: cliform_session.SessionState) -> None:
+        """Resume the session of state on the next interact(): its answers are neither asked nor validated again.
+
+        Answers recorded for another version of the form are validated again.
+        """
+        self._restored = state
+
+    def _resume(self) -> cliform_session.SessionState:
+        """The state of a new session: fresh, unless restore() was just called."""
+        state, self._restored = self._restored, None
+        if state is None:
+            return cliform_session.SessionState()
+        if state.version != self.form_version():
+            state = cliform_session.SessionState(
+                version=self.form_version(),
+                unchecked=dict(state.unchecked, **{name: raw for name, (raw, _cleaned) in state.answers.items()}),
+                current=state.current,
+                prompted=state.prompted,
+            )
+        return state
+
+    def dump_state(self, key: T.Optional[T.Text] = None) -> T.Text:
+        """The session state, signed and serialized for restore(); see SessionState.dumps()."""
+        assert self.state is not None
+        if self.state.version is None:
+            self.state.version = self.form_version()
+        return self.state.dumps(key=key)
+
+    def _answered(self, name: T.Text, value: FieldValue) -> FieldValue:
+        if self.state is not None:
+            self.state.answers[name] = tuple(value)
+            self.state.unchecked.pop(name, None)
+        return value
+
+    def _get_prefilled(
+            self, plan: PromptPlan) -> T.Generator[interact.Output, interact.Input, T.Dict[T.Text, FieldValue]]:
+        """Restore answers from the session state, and validate prefilled values; report those which are invalid."""
+        restored = self.state.answers if self.state else {}
+        unchecked = self.state.unchecked if self.state else {}
+        answers: T.Dict[T.Text, FieldValue] = {}
+        for name, field_plan in plan.fields.items():
+            if field_plan.field.disabled:
+                continue
+            if name in restored:
+                answers[name] = FieldValue(*restored[name])
+                continue
+            elif name in unchecked:
+                value = unchecked[name]
+            elif name in self.prefilled:
+                value = self.prefilled[name]
+            else:
+                continue
+            try:
+                cleaned = self._clean_field(field_plan, value)
+            except forms.ValidationError as e:
+                yield from self._field_errors(field_plan, e, labelled=True)
+            else:
+                answers[name] = self._answered(name, FieldValue(raw=value, cleaned=cleaned))
+        return answers
+
+    def _clean_answers(
+            self, plan: PromptPlan,
+            answers: T.Dict[T.Text, FieldValue],
+    ) -> T.Generator[interact.Output, interact.Input, T.Tuple[forms.BaseForm, bool]]:
+        """Validate the whole form; until it is valid, ask again for the faulty fields.
+
+        Returns the valid form, and whether some fields were asked again; ``answers`` holds the new replies.
+        """
+        asked = False
+        while True:
+            form = self.form_class({name: answer.raw for name, answer in answers.items()})
+            if clean_form(form, {name: answer.cleaned for name, answer in answers.items()}):
+                return form, asked
+            # Form-wide validation failed: ask again for the faulty fields, or all of them.
+            yield from self._form_errors(form)
+            names = [name for name in form.errors if name in plan.fields] or [
+                name for name, field_plan in plan.fields.items() if not field_plan.field.disabled
+            ]
+            answers.update((yield from self._get_fields(plan, names)))
+            asked = True
+
+    def _finish(self, answers: T.Dict[T.Text, FieldValue], confirm: bool = True) -> interact.InteractLoop:
+        """Validate the whole form, then confirm and submit it."""
+        if self._plan is None:
+            self._plan = self.get_plan()
+        plan = self._plan
+        form, asked = yield from self._clean_answers(plan, answers)
+        confirm = confirm or asked
 
         summary = collections.OrderedDict()
-        for name, field in form.fields.items():
-            label = self._make_label(name, field.label)
-            summary[label] = form.cleaned_data[name]
+        for name, field_plan in plan.fields.items():
+            summary[field_plan.label] = form.cleaned_data[name]
 
         yield interact.Info("")
+        start = time.perf_counter()
         yield interact.Summary(summary)
+        self.trace(trace.SUMMARY, duration=time.perf_counter() - start)
 
-        reply = yield interact.BoolInput(title="Confirm", default=True)
+        reply = (yield plan.confirm) if confirm else True
 
         if reply:
             result = form.cleaned_data
+            start = time.perf_counter()
             self.on_submit(result)
+            self.trace(trace.SUBMIT, duration=time.perf_counter() - start)
             yield interact.Info('')
             yield interact.Info("`%s` has been submitted:" % self.form_class.__name__)
             yield interact.Info("  {!r}".format(result))
@@ -94,5 +697,17 @@ class FormPrompter(interact.Prompter):
         else:
             yield interact.Error("Aborting")
 
+    def interact(self) -> interact.InteractLoop:
+        plan = self._plan = self.get_plan()
+        state = self.state = self._resume()
+        self._prompts = {}
+        answers = yield from self._get_prefilled(plan)
+        names = [
+            name for name, field_plan in plan.fields.items()
+            if not field_plan.field.disabled and name not in answers
+        ]
+        answers.update((yield from self._get_fields(plan, names)))
+        yield from self._finish(answers, confirm=self.confirm_prefilled or state.prompted)
+
     def on_submit(self, data: T.Mapping[T.Text, T.Any]) -> None:
         raise NotImplementedError()
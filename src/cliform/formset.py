@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Prompt for, or batch-load, the rows of a formset; any number of them.
+
+Rows are validated as they come, then handed to ``on_submit_rows()`` by chunks:
+neither the rows nor their forms are kept until the end.
+"""
+
+import time
+import typing as T
+
+from django import forms
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.forms import formsets
+from django.forms import models as model_forms
+from django.forms.utils import ErrorDict
+from django.utils.translation import ngettext
+
+from . import django as cliform_django
+from . import interact, trace
+
+Record = T.Mapping[T.Text, T.Any]
+
+
+def _hashable(value: T.Any) -> T.Any:
+    """Reduce model instances to their primary key, as BaseModelFormSet.validate_unique() does."""
+    if hasattr(value, '_get_pk_val'):
+        return value._get_pk_val()
+    elif isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+class FormsetCleaner:
+    """Formset-wide validation, run one row at a time.
+
+    - ``max_num`` (with ``validate_max``) and ``min_num`` (with ``validate_min``) are checked
+      on the running count of rows; ``absolute_max``, a guard against oversized requests, doesn't apply;
+    - For model formsets, the unique checks across rows are run against the keys of accepted rows:
+      only those keys are kept, not the rows;
+    - A custom ``clean()`` can only see the rows passed to chunk(), i.e a chunk of ``flush_size`` rows.
+    """
+
+    def __init__(self, formset_class: T.Type[formsets.BaseFormSet]):
+        self.formset_class = formset_class
+        self.count = 0
+        # An unbound formset, for its settings and error messages
+        self.formset = formset_class()
+        self.custom_clean = formset_class.clean not in (formsets.BaseFormSet.clean, model_forms.BaseModelFormSet.clean)
+
+        self.unique_checks: T.List[T.Tuple[T.Text, ...]] = []
+        self.date_checks: T.List[T.Tuple[T.Text, T.Text, T.Text]] = []
+        if issubclass(formset_class, model_forms.BaseModelFormSet):
+            form = formset_class.form()
+            # As ModelForm._get_validation_exclusions(), minus the checks on a bound form's values
+            exclude = [
+                model_field.name for model_field in form._meta.model._meta.fields
+                if model_field.name not in form.fields
+                or (form._meta.fields and model_field.name not in form._meta.fields)
+                or (form._meta.exclude and model_field.name in form._meta.exclude)
+            ]
+            unique_checks, date_checks = form.instance._get_unique_checks(exclude=exclude)
+            self.unique_checks = [unique_check for _model, unique_check in unique_checks]
+            self.date_checks = [
+                (lookup, field, unique_for) for _model, lookup, field, unique_for in date_checks
+            ]
+        self._seen: T.Dict[T.Tuple[T.Any, ...], T.Set[T.Tuple[T.Any, ...]]] = {}
+        # Rows of the current chunk, until it passes chunk(); see hold()
+        self._held = 0
+        self._held_keys: T.Dict[T.Tuple[T.Any, ...], T.Set[T.Tuple[T.Any, ...]]] = {}
+
+    @property
+    def full(self) -> bool:
+        """Whether no more rows are accepted."""
+        return bool(self.formset.validate_max and self.count + self._held >= self.formset.max_num)
+
+    def _keys(self, data: Record) -> T.Iterator[T.Tuple[T.Tuple[T.Any, ...], T.Tuple[T.Any, ...], T.Text]]:
+        """Yield (check, key, error message) for each unique check applying to a row."""
+        for unique_check in self.unique_checks:
+            key = tuple(_hashable(data[name]) for name in unique_check if name in data)
+            if key and None not in key:
+                yield unique_check, key, self.formset.get_unique_error_message(unique_check)
+        for lookup, name, unique_for in self.date_checks:
+            if data.get(name) is None or data.get(unique_for) is None:
+                continue
+            date = data[unique_for]
+            if lookup == 'date':
+                parts: T.Tuple[T.Any, ...] = (date.year, date.month, date.day)
+            else:
+                parts = (getattr(date, lookup),)
+            check = (lookup, name, unique_for)
+            yield check, (data[name],) + parts, self.formset.get_date_error_message((None,) + check)
+
+    def row(self, data: Record) -> T.List[T.Text]:
+        """The formset-wide errors caused by adding a valid row, after the accepted and held ones."""
+        if self.full:
+            return [ngettext(
+                "Please submit at most %d form.",
+                "Please submit at most %d forms.", self.formset.max_num) % self.formset.max_num]
+        return [
+            message for check, key, message in self._keys(data)
+            if key in self._seen.get(check, ()) or key in self._held_keys.get(check, ())
+        ]
+
+    def hold(self, data: Record) -> None:
+        """Count a row in, once it passed row(), until its chunk is accepted or rejected."""
+        self._held += 1
+        for check, key, _message in self._keys(data):
+            self._held_keys.setdefault(check, set()).add(key)
+
+    def accept(self) -> None:
+        """Keep the held rows, once their chunk passed chunk()."""
+        self.count += self._held
+        for check, keys in self._held_keys.items():
+            self._seen.setdefault(check, set()).update(keys)
+        self.reject()
+
+    def reject(self) -> None:
+        """Forget the held rows."""
+        self._held = 0
+        self._held_keys = {}
+
+    def chunk(self, rows: T.Sequence[Record]) -> T.List[T.Text]:
+        """The errors of the formset's custom clean() on a chunk of valid rows."""
+        if not rows or not self.custom_clean:
+            return []
+        prefix = self.formset_class.get_default_prefix()
+        formset = self.formset_class(prefix=prefix, data={
+            '%s-%s' % (prefix, formsets.TOTAL_FORM_COUNT): len(rows),
+            '%s-%s' % (prefix, formsets.INITIAL_FORM_COUNT): 0,
+        })
+        # The rows are already cleaned: only the formset's clean() remains.
+        for form, data in zip(formset.forms, rows):
+            form.cleaned_data = dict(data)
+            form._errors = ErrorDict()
+        formset._errors = [form._errors for form in formset.forms]
+        formset._non_form_errors = formset.error_class()
+        try:
+            formset.clean()
+        except forms.ValidationError as e:
+            return list(cliform_django.walk_errors(e))
+        return []
+
+    def finish(self) -> T.List[T.Text]:
+        """The formset-wide errors once all rows are in."""
+        if self.formset.validate_min and self.count < self.formset.min_num:
+            return [ngettext(
+                "Please submit at least %d form.",
+                "Please submit at least %d forms.", self.formset.min_num) % self.formset.min_num]
+        return []
+
+
+class FormsetPrompter(cliform_django.FormPrompter):
+    """Prompt for the rows of a formset, one after the other.
+
+    Each row is validated by the formset's form as soon as it is entered, then against
+    the previous rows (see FormsetCleaner); rows are passed to on_submit_rows()
+    by chunks of ``flush_size``, without confirmation.
+    Deletion and ordering fields (``can_delete``, ``can_order``) are not prompted.
+    """
+    formset_class: T.Type[formsets.BaseFormSet]
+
+    flush_size: int = 100
+
+    more = interact.BoolInput(title="Add another row", default=True)
+
+    def __init_subclass__(cls, **kwargs: T.Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if 'formset_class' in cls.__dict__:
+            cls.form_class = cls.formset_class.form
+
+    def submit_rows(self, rows: T.List[Record]) -> None:
+        """Submit a chunk of valid rows through on_submit_rows()."""
+        start = time.perf_counter()
+        self.on_submit_rows(rows)
+        self.trace(trace.SUBMIT, duration=time.perf_counter() - start)
+
+    def _row_errors(self, messages: T.Iterable[T.Text]) -> T.Iterator[interact.Error]:
+        for message in messages:
+            self.trace(trace.ERROR, field=NON_FIELD_ERRORS, message=message)
+            yield interact.Error(message=message)
+
+    def interact(self) -> interact.InteractLoop:
+        plan = self._plan = self.get_plan()
+        self._prompts = {}
+        names = [name for name, field_plan in plan.fields.items() if not field_plan.field.disabled]
+        cleaner = FormsetCleaner(self.formset_class)
+        pending: T.List[Record] = []
+        submitted = 0
+        while True:
+            yield interact.Info("Row %d" % (cleaner.count + 1))
+            answers = yield from self._get_fields(plan, names)
+            form, _asked = yield from self._clean_answers(plan, answers)
+            errors = cleaner.row(form.cleaned_data) or cleaner.chunk(pending + [form.cleaned_data])
+            if errors:
+                yield from self._row_errors(errors)
+            else:
+                cleaner.hold(form.cleaned_data)
+                cleaner.accept()
+                pending.append(form.cleaned_data)
+                if len(pending) >= self.flush_size:
+                    self.submit_rows(pending)
+                    submitted += len(pending)
+                    pending = []
+
+            if cleaner.full:
+                break
+            elif not (yield self.more):
+                errors = cleaner.finish()
+                if not errors:
+                    break
+                yield from self._row_errors(errors)
+
+        if pending:
+            self.submit_rows(pending)
+            submitted += len(pending)
+        yield interact.Info("")
+        yield interact.Info("%d rows of `%s` have been submitted." % (submitted, self.form_class.__name__))
+
+    def on_submit_rows(self, rows: T.List[Record]) -> None:
+        raise NotImplementedError()
@@ -3,10 +3,16 @@
 # This code is distributed under the two-clause BSD License.
 
 
+import bisect
 import collections
+import dataclasses
+import sys
+import time
 import typing as T
 from dataclasses import dataclass
 
+from . import trace
+
 # General interaction
 # ===================
 
@@ -16,6 +22,11 @@ class Display(T.Text):
     pass
 
 
+class DisplayBlock(T.Tuple[T.Text, ...]):
+    """Display several lines at once; no reply expected."""
+    pass
+
+
 class Query:
     """Expect some input."""
 
@@ -24,8 +35,8 @@ class Input(T.Text):
     """Raw user-provided text."""
 
 
-BaseOutput = T.Union[Display, Query]
-BaseLoop = T.Generator[T.Union[Display, Query], T.Optional[Input], None]
+BaseOutput = T.Union[Display, DisplayBlock, Query]
+BaseLoop = T.Generator[BaseOutput, T.Optional[Input], None]
 
 
 # Semantic interactions
@@ -130,8 +141,8 @@ class ChoiceInput(Prompt):
                     shortcuts.add(char)
                     break
             else:
-                orphans.append(option)
-        for rank, orphan in enumerate(orphans):
+                orphans.append((key, option))
+        for rank, (key, orphan) in enumerate(orphans):
             choices.append((key, OptionShortcut(str(rank)), orphan))
         return cls.from_shortcuts(
             title=title,
@@ -144,16 +155,193 @@ class ChoiceInput(Prompt):
         if shortcut in self.choices:
             return self.choices[shortcut].key.value
         elif self.default_first and not reply:
-            return list(self.choices.values())[0].key.value
+            return next(iter(self.choices.values())).key.value
         else:
             return reply
 
 
+class ChoiceIndex:
+    """Case-insensitive lookups among a (possibly very large) list of options.
+
+    - Prefix and exact lookups bisect a sorted copy of the labels: O(log n);
+    - Substring lookups scan a single joined string, with str.find.
+    """
+
+    SEPARATOR = '\n'
+
+    def __init__(self, options: T.Iterable[T.Tuple[OptionKey, T.Text]]):
+        self.keys: T.List[OptionKey] = []
+        self.labels: T.List[T.Text] = []
+        for key, label in options:
+            self.keys.append(key)
+            self.labels.append(label)
+        folded = [label.lower() for label in self.labels]
+
+        order = sorted(range(len(folded)), key=folded.__getitem__)
+        self._sorted_labels = [folded[rank] for rank in order]
+        self._sorted_ranks = order
+
+        self._offsets: T.List[int] = []
+        position = 0
+        for label in folded:
+            self._offsets.append(position)
+            position += len(label) + len(self.SEPARATOR)
+        self._folded = self.SEPARATOR.join(folded)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def exact(self, text: T.Text) -> T.Optional[int]:
+        """Find the rank of the option labelled text, if unique."""
+        needle = text.lower()
+        position = bisect.bisect_left(self._sorted_labels, needle)
+        if position >= len(self._sorted_labels) or self._sorted_labels[position] != needle:
+            return None
+        if position + 1 < len(self._sorted_labels) and self._sorted_labels[position + 1] == needle:
+            return None
+        return self._sorted_ranks[position]
+
+    def prefix(self, text: T.Text) -> T.List[int]:
+        """Ranks of all options whose label starts with text, in option order."""
+        needle = text.lower()
+        start = bisect.bisect_left(self._sorted_labels, needle)
+        end = start
+        while end < len(self._sorted_labels) and self._sorted_labels[end].startswith(needle):
+            end += 1
+        return sorted(self._sorted_ranks[start:end])
+
+    def search(self, text: T.Text) -> T.List[int]:
+        """Ranks of all options whose label contains text, in option order."""
+        needle = text.lower()
+        if not needle or self.SEPARATOR in needle:
+            return []
+        ranks = []
+        position = self._folded.find(needle)
+        while position != -1:
+            rank = bisect.bisect_right(self._offsets, position) - 1
+            ranks.append(rank)
+            if rank + 1 >= len(self._offsets):
+                break
+            position = self._folded.find(needle, self._offsets[rank + 1])
+        return ranks
+
+
+@dataclass
+class PagedChoiceInput(Prompt):
+    """A choice among options too many to be displayed at once."""
+
+    def page_items(self) -> T.List[T.Tuple[int, T.Text]]:
+        """The (1-based position, label) of options on the current page."""
+        raise NotImplementedError()
+
+    def header(self) -> T.List[T.Text]:
+        """Details on the current page, for the prompt line."""
+        raise NotImplementedError()
+
+    def position_width(self) -> int:
+        """The width of the positions column; by default, that of the last position on the page."""
+        items = self.page_items()
+        return len(str(items[-1][0])) if items else 0
+
+
+@dataclass
+class IndexedChoiceInput(PagedChoiceInput):
+    """A choice among many options, displayed one page at a time.
+
+    Replies:
+    - A number selects the matching option on the displayed list;
+    - ``>`` / ``<`` move to the next / previous page;
+    - ``/text`` lists options containing ``text``;
+    - Any other text selects the option with that label, or lists options starting with it.
+
+    Navigation replies convert to a new IndexedChoiceInput, to be prompted instead.
+    """
+    index: ChoiceIndex
+    candidates: T.Sequence[int] = ()
+    default_first: bool = False
+    page: int = 0
+    page_size: int = 20
+    query: T.Text = ''
+    notice: T.Text = ''
+
+    @classmethod
+    def from_texts(
+            cls, title: T.Text, options: T.Iterable[T.Tuple[OptionKey, T.Text]],
+            default_first: bool = False, page_size: int = 20) -> 'IndexedChoiceInput':
+        index = ChoiceIndex(options)
+        return cls(
+            title=title,
+            index=index,
+            candidates=range(len(index)),
+            default_first=default_first,
+            page_size=page_size,
+        )
+
+    @property
+    def page_count(self) -> int:
+        return max(1, (len(self.candidates) + self.page_size - 1) // self.page_size)
+
+    def page_items(self) -> T.List[T.Tuple[int, T.Text]]:
+        start = self.page * self.page_size
+        return [
+            (position + 1, self.index.labels[self.candidates[position]])
+            for position in range(start, min(start + self.page_size, len(self.candidates)))
+        ]
+
+    def position_width(self) -> int:
+        # Columns don't shift between pages
+        return len(str(len(self.candidates)))
+
+    def header(self) -> T.List[T.Text]:
+        total = len(self.candidates)
+        start = self.page * self.page_size
+        parts = ["{}-{} of {}".format(min(start + 1, total), min(start + self.page_size, total), total)]
+        if self.query:
+            parts.append("matching {!r}".format(self.query))
+        if self.default_first and len(self.index):
+            parts.append("default: {}".format(self.index.labels[0]))
+        if self.page + 1 < self.page_count:
+            parts.append("'>' for more")
+        return parts
+
+    def _select(self, rank: int) -> T.Any:
+        return self.index.keys[rank].value
+
+    def convert(self, reply: T.Text) -> T.Any:
+        reply = reply.strip()
+        if not reply:
+            if self.default_first and len(self.index):
+                return self._select(0)
+            return reply
+        elif reply in ('<', '>'):
+            page = self.page + (1 if reply == '>' else -1)
+            return dataclasses.replace(self, page=min(max(page, 0), self.page_count - 1), notice='')
+        elif reply.isdigit() and 0 < int(reply) <= len(self.candidates):
+            return self._select(self.candidates[int(reply) - 1])
+
+        if reply.startswith('/'):
+            ranks = self.index.search(reply[1:])
+        else:
+            rank = self.index.exact(reply)
+            if rank is not None:
+                return self._select(rank)
+            ranks = self.index.prefix(reply)
+
+        if len(ranks) == 1:
+            return self._select(ranks[0])
+        elif not ranks:
+            return dataclasses.replace(self, notice="No option matches %r" % reply)
+        return dataclasses.replace(self, candidates=ranks, page=0, query=reply, notice='')
+
+
+BOOL_OPTIONS = [
+    (OptionKey(True), "Yes"),
+    (OptionKey(False), "No"),
+]
+
+
 def BoolInput(title: T.Text, default: T.Optional[bool]) -> ChoiceInput:
-    options = [
-        (OptionKey(True), "Yes"),
-        (OptionKey(False), "No"),
-    ]
+    options = list(BOOL_OPTIONS)
     if default is False:
         options.reverse()
     return ChoiceInput.from_texts(
@@ -175,9 +363,25 @@ class Prompter:
     INPUT_PREFIX = '>>>'
     SUMMARY_HEADER = '=== Summary ==='
 
+    # Receives timestamped events; see cliform.trace.
+    tracer: T.Optional[trace.Tracer] = None
+
     def interact(self) -> InteractLoop:
         raise NotImplementedError()
 
+    def trace(
+            self, kind: T.Text, field: T.Optional[T.Text] = None,
+            duration: T.Optional[float] = None, message: T.Optional[T.Text] = None) -> None:
+        if self.tracer is not None:
+            self.tracer.emit(trace.Event(
+                kind=kind,
+                timestamp=time.perf_counter(),
+                session=id(self),
+                field=field,
+                duration=duration,
+                message=message,
+            ))
+
     def expand(self, output: Output) -> T.Iterable[T.Text]:
         if isinstance(output, Info):
             yield output.message
@@ -196,6 +400,14 @@ class Prompter:
         # Inputs
         elif isinstance(output, TextInput):
             yield "{} {}?".format(self.INPUT_PREFIX, output.title)
+        elif isinstance(output, PagedChoiceInput):
+            notice = getattr(output, 'notice', '')
+            if notice:
+                yield "{} {}".format(self.ERROR_PREFIX, notice)
+            yield "{} {}? ({})".format(self.INPUT_PREFIX, output.title, ', '.join(output.header()))
+            width = output.position_width()
+            for position, label in output.page_items():
+                yield "  {:>{}}. {}".format(position, width, label)
         else:
             assert isinstance(output, ChoiceInput)
             yield "{} {}? ({})".format(
@@ -207,19 +419,38 @@ class Prompter:
                 ),
             )
 
-    def loop(self) -> BaseLoop:
+    def loop(self, blocks: bool = False) -> BaseLoop:
+        """Run the interaction, one line of output or query at a time.
+
+        With ``blocks=True``, all lines of an output are sent as a single DisplayBlock.
+        """
         interact_loop = self.interact()
         reply = None
         while True:
-            value = interact_loop.send(reply)
-            for line in self.expand(value):
-                reply = yield Display(line)
-                assert reply is None
-
-            if isinstance(value, Prompt):
+            try:
+                value = interact_loop.send(reply)
+            except StopIteration:
+                return
+            while True:
+                if blocks:
+                    block = DisplayBlock(self.expand(value))
+                    if block:
+                        reply = yield block
+                        assert reply is None
+                else:
+                    for line in self.expand(value):
+                        reply = yield Display(line)
+                        assert reply is None
+
+                if not isinstance(value, Prompt):
+                    break
                 reply = yield Query()
                 assert reply is not None
                 reply = value.convert(reply)
+                if not isinstance(reply, Prompt):
+                    break
+                # The prompt was refined (e.g a search among choices): ask again.
+                value = reply
 
 
 class BaseInteracter:
@@ -229,15 +460,32 @@ class BaseInteracter:
     def get_input(self) -> T.Text:
         raise NotImplementedError()
 
+    def display_block(self, lines: T.Sequence[T.Text]) -> None:
+        for line in lines:
+            self.display(line)
+
+    def flush(self) -> None:
+        """Called before waiting for input, and at the end of the session."""
+
     def run(self, prompter: Prompter) -> None:
-        loop = prompter.loop()
+        loop = prompter.loop(blocks=True)
         reply = None
-        while True:
-            value = loop.send(reply)
-            if isinstance(value, Display):
-                self.display(value)
-            elif isinstance(value, Query):
-                reply = Input(self.get_input())
+        try:
+            while True:
+                try:
+                    value = loop.send(reply)
+                except StopIteration:
+                    return
+                reply = None
+                if isinstance(value, DisplayBlock):
+                    self.display_block(value)
+                elif isinstance(value, Display):
+                    self.display(value)
+                elif isinstance(value, Query):
+                    self.flush()
+                    reply = Input(self.get_input())
+        finally:
+            self.flush()
 
 
 class StdioInteracter(BaseInteracter):
@@ -249,5 +497,40 @@ class StdioInteracter(BaseInteracter):
     def display(self, message):
         self.stdout.write(message + '\n')
 
+    def display_block(self, lines):
+        self.stdout.write(''.join(line + '\n' for line in lines))
+
+    def _readline(self) -> T.Text:
+        line = self.stdin.readline()
+        if not line:
+            raise EOFError()
+        return line.rstrip('\r\n')
+
+    def get_input(self):
+        if self.stdin is sys.stdin:
+            # Keep line edition features of input()
+            return input()
+        return self._readline()
+
+
+class BufferedStdioInteracter(StdioInteracter):
+    """Interact with stdin/stdout; output is written in a single call per prompt."""
+    def __init__(self, stdin: T.TextIO, stdout: T.TextIO):
+        super().__init__(stdin=stdin, stdout=stdout)
+        self._buffer: T.List[T.Text] = []
+
+    def display(self, message):
+        self._buffer.append(message)
+
+    def display_block(self, lines):
+        self._buffer.extend(lines)
+
+    def flush(self):
+        if self._buffer:
+            self._buffer.append('')
+            self.stdout.write('\n'.join(self._buffer))
+            self._buffer.clear()
+        self.stdout.flush()
+
     def get_input(self):
-        return input()
+        return self._readline()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Answer the database lookups of many ModelForm validations with a few bulk queries.
+
+For each window of records, a LookupIndex:
+- Fetches the options of ModelChoiceField fields, with a single ``__in`` query per field;
+- Skips the model's own existence check on foreign keys answered from those options;
+- Defers unique checks until every form of the window is cleaned, then runs them
+  against the existing keys, fetched with a single query per unique constraint.
+
+Per-record results are the same as with form.is_valid(), with one caveat:
+values are compared in Python, so database collations folding case or accents
+are not replicated.
+"""
+
+import collections
+import functools
+import typing as T
+
+from django import forms
+from django.core import exceptions
+from django.db import connection
+from django.db.models import ForeignKey, Model
+
+Record = T.Mapping[T.Text, T.Any]
+UniqueCheck = T.Tuple[T.Type[Model], T.Tuple[T.Text, ...]]
+
+# Errors raised by a lookup value which the database would reject before any query.
+LOOKUP_ERRORS = (ValueError, TypeError, exceptions.ValidationError)
+
+
+def unique_values(instance: Model, unique_check: T.Tuple[T.Text, ...]) -> T.Optional[T.Tuple[T.Any, ...]]:
+    """The values looked up by Model._perform_unique_checks() for unique_check; None if skipped."""
+    values = []
+    for field_name in unique_check:
+        field = instance._meta.get_field(field_name)
+        value = getattr(instance, field.attname)
+        if value is None or (value == '' and connection.features.interprets_empty_strings_as_nulls):
+            return None
+        if field.primary_key and not instance._state.adding:
+            return None
+        values.append(value)
+    return tuple(values)
+
+
+class LookupIndex:
+    """Prefetched lookups for validating a window of records against form_class.
+
+    Usage:
+        index = LookupIndex(form_class)
+        index.prefetch(records)
+        for form in forms:
+            index.defer_unique(form)
+            clean_form(form, index.clean_choices(form))
+        index.validate_unique()
+
+    Querysets are read from an unbound form: forms whose querysets depend on their data
+    must not be validated through a LookupIndex.
+    """
+
+    def __init__(self, form_class: T.Type[forms.BaseForm]):
+        self.form_class = form_class
+        self._probe = form_class()
+        self.choice_fields: T.Dict[T.Text, forms.ModelChoiceField] = {
+            name: field for name, field in self._probe.fields.items()
+            if isinstance(field, forms.ModelChoiceField)
+            and not isinstance(field, forms.ModelMultipleChoiceField)
+            and not field.disabled
+        }
+        # Field name => lookup key => model instance
+        self.choices: T.Dict[T.Text, T.Dict[T.Any, Model]] = {}
+        # Unique check => looked up values => primary keys of matching rows
+        self.existing: T.Dict[UniqueCheck, T.Dict[T.Tuple[T.Any, ...], T.Set[T.Any]]] = {}
+        self._deferred: T.List[forms.BaseModelForm] = []
+        self._patched: T.List[Model] = []
+
+    @staticmethod
+    def _choice_key(field: forms.ModelChoiceField, value: T.Any) -> T.Any:
+        """The value matched by ModelChoiceField.to_python() against the database, as prepared for it."""
+        model = field.queryset.model
+        key = field.to_field_name or 'pk'
+        if isinstance(value, model):
+            value = getattr(value, key)
+        target = model._meta.pk if key == 'pk' else model._meta.get_field(key)
+        return target.get_prep_value(value)
+
+    def _raw(self, form: forms.BaseForm, name: T.Text, field: forms.Field, data: Record) -> T.Any:
+        return field.widget.value_from_datadict(data, {}, form.add_prefix(name))
+
+    def prefetch(self, records: T.Iterable[Record]) -> None:
+        """Fetch the options referenced by records, in a single query per ModelChoiceField."""
+        records = list(records)
+        for name, field in self.choice_fields.items():
+            keys = set()
+            for record in records:
+                raw = self._raw(self._probe, name, field, record)
+                if raw in field.empty_values:
+                    continue
+                try:
+                    keys.add(self._choice_key(field, raw))
+                except LOOKUP_ERRORS:
+                    continue
+            key = field.to_field_name or 'pk'
+            self.choices[name] = {
+                getattr(option, key): option
+                for option in (field.queryset.filter(**{'%s__in' % key: keys}) if keys else ())
+            }
+
+    def clean_choices(self, form: forms.BaseForm) -> T.Dict[T.Text, T.Any]:
+        """Clean the form's ModelChoiceField values from the prefetched options.
+
+        Returns field name => cleaned value, or the ValidationError raised, as for clean_form().
+        Values that field.clean() handles without a query (empty or malformed) are left out.
+        """
+        cleaned: T.Dict[T.Text, T.Any] = {}
+        for name in self.choice_fields:
+            field = form.fields[name]
+            raw = self._raw(form, name, field, form.data)
+            if raw in field.empty_values:
+                continue
+            try:
+                option = self.choices[name].get(self._choice_key(field, raw))
+            except LOOKUP_ERRORS:
+                continue
+            try:
+                if option is None:
+                    raise forms.ValidationError(field.error_messages['invalid_choice'], code='invalid_choice')
+                field.validate(option)
+                field.run_validators(option)
+            except forms.ValidationError as e:
+                cleaned[name] = e
+            else:
+                cleaned[name] = option
+        if isinstance(form, forms.BaseModelForm):
+            self._skip_fk_checks(form, [name for name, value in cleaned.items() if isinstance(value, Model)])
+        return cleaned
+
+    def _skip_fk_checks(self, form: forms.BaseModelForm, names: T.List[T.Text]) -> None:
+        """Don't check again, in Model.full_clean(), that the prefetched options exist."""
+        checked = []
+        for name in names:
+            try:
+                model_field = form.instance._meta.get_field(name)
+            except exceptions.FieldDoesNotExist:
+                continue
+            if isinstance(model_field, ForeignKey) and not model_field.validators:
+                checked.append(name)
+        if checked:
+            form.instance.full_clean = functools.partial(self._full_clean, form.instance, checked)
+            self._patched.append(form.instance)
+
+    @staticmethod
+    def _full_clean(
+            instance: Model, checked: T.List[T.Text],
+            exclude: T.Optional[T.Iterable[T.Text]] = None, validate_unique: bool = True) -> None:
+        Model.full_clean(instance, exclude=list(exclude or ()) + checked, validate_unique=validate_unique)
+
+    def defer_unique(self, form: forms.BaseForm) -> None:
+        """Skip unique checks while cleaning form, until validate_unique()."""
+        if isinstance(form, forms.BaseModelForm):
+            form.validate_unique = functools.partial(self._deferred.append, form)
+
+    def validate_unique(self) -> None:
+        """Run the deferred unique checks, with a single query per unique constraint; release the forms."""
+        for instance in self._patched:
+            del instance.full_clean
+        self._patched = []
+        deferred, self._deferred = self._deferred, []
+        lookups: T.Dict[UniqueCheck, T.Set[T.Tuple[T.Any, ...]]] = collections.defaultdict(set)
+        for form in deferred:
+            del form.validate_unique
+            unique_checks, _date_checks = form.instance._get_unique_checks(exclude=form._get_validation_exclusions())
+            for model_class, unique_check in unique_checks:
+                key = unique_values(form.instance, unique_check)
+                if key is not None:
+                    lookups[(model_class, unique_check)].add(key)
+
+        for (model_class, unique_check), values in lookups.items():
+            # Narrow on the first field; rows are then matched on all fields in Python.
+            rows = model_class._default_manager.filter(**{
+                '%s__in' % unique_check[0]: {value[0] for value in values},
+            }).order_by().values_list('pk', *unique_check)
+            existing = self.existing.setdefault((model_class, unique_check), collections.defaultdict(set))
+            for pk, *row in rows:
+                existing[tuple(row)].add(pk)
+
+        for form in deferred:
+            form.instance._perform_unique_checks = functools.partial(self._unique_errors, form.instance)
+            try:
+                form.validate_unique()
+            finally:
+                del form.instance._perform_unique_checks
+
+    def _unique_errors(
+            self, instance: Model, unique_checks: T.Iterable[UniqueCheck]) -> T.Dict[T.Text, T.List[T.Any]]:
+        """Replacement for Model._perform_unique_checks(), from the prefetched keys."""
+        errors: T.Dict[T.Text, T.List[T.Any]] = {}
+        for model_class, unique_check in unique_checks:
+            values = unique_values(instance, unique_check)
+            if values is None:
+                continue
+            pks = self.existing.get((model_class, unique_check), {}).get(values, set())
+            model_class_pk = instance._get_pk_val(model_class._meta)
+            if not instance._state.adding and model_class_pk is not None:
+                pks = pks - {model_class_pk}
+            if pks:
+                key = unique_check[0] if len(unique_check) == 1 else exceptions.NON_FIELD_ERRORS
+                errors.setdefault(key, []).append(instance.unique_error_message(model_class, unique_check))
+        return errors
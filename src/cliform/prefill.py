@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Prefill form fields from command-line flags, environment variables and files.
+
+Usage:
+    prompter = UserPrompter()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--config', action='append', default=[])
+    cliform.prefill.add_arguments(parser, prompter)
+    args = parser.parse_args()
+    prompter.prefilled = cliform.prefill.collect(prompter, args, env_prefix='USER_', files=args.config)
+    StdioInteracter(stdin=sys.stdin, stdout=sys.stdout).run(prompter)
+
+Sources, from lowest to highest precedence: files (later files win), environment, command line.
+Text values are read as replies to the fields' prompts:
+``yes`` / ``no`` for booleans, option labels or shortcuts for choices.
+"""
+
+import argparse
+import json
+import os
+import typing as T
+
+from django import forms
+
+from . import django as cliform_django
+from . import tabular
+
+Values = T.Dict[T.Text, T.Any]
+
+
+def _flag(name: T.Text) -> T.Text:
+    return '--' + name.replace('_', '-')
+
+
+def _is_multiple(field: forms.Field) -> bool:
+    return isinstance(field, (forms.MultipleChoiceField, forms.ModelMultipleChoiceField))
+
+
+def add_arguments(parser: argparse.ArgumentParser, prompter: cliform_django.FormPrompter) -> None:
+    """Add a ``--field-name`` option for each enabled field of the prompter's form.
+
+    Booleans get ``--field-name`` / ``--no-field-name``; fields with multiple values may be repeated.
+    Options not given are left out of the parsed namespace.
+    """
+    group = parser.add_argument_group("form fields")
+    for name, field_plan in prompter.get_plan().fields.items():
+        field = field_plan.field
+        if field.disabled:
+            continue
+        help_text = str(field.help_text or field_plan.label)
+        if isinstance(field, forms.BooleanField):
+            group.add_argument(
+                _flag(name), dest=name, action='store_const', const='yes', default=argparse.SUPPRESS, help=help_text,
+            )
+            group.add_argument(
+                _flag('no_' + name), dest=name, action='store_const', const='no', default=argparse.SUPPRESS,
+            )
+        elif _is_multiple(field):
+            group.add_argument(_flag(name), dest=name, action='append', default=argparse.SUPPRESS, help=help_text)
+        else:
+            group.add_argument(_flag(name), dest=name, default=argparse.SUPPRESS, help=help_text)
+
+
+def _coerce(prompter: cliform_django.FormPrompter, values: T.Mapping[T.Text, T.Any]) -> Values:
+    """Read text values as replies to the fields' prompts."""
+    plan = prompter.get_plan()
+    coerced = {}
+    for name, value in values.items():
+        field_plan = plan.fields.get(name)
+        if field_plan is None:
+            continue
+        coerce = tabular.choice_coercer(field_plan)
+        if isinstance(value, list):
+            coerced[name] = [coerce(item) if isinstance(item, str) else item for item in value]
+        else:
+            coerced[name] = coerce(value) if isinstance(value, str) else value
+    return coerced
+
+
+def from_namespace(prompter: cliform_django.FormPrompter, namespace: argparse.Namespace) -> Values:
+    """Values given through the options of add_arguments()."""
+    return _coerce(prompter, {
+        name: getattr(namespace, name) for name in prompter.get_plan().fields if hasattr(namespace, name)
+    })
+
+
+def from_environ(
+        prompter: cliform_django.FormPrompter, prefix: T.Text,
+        environ: T.Optional[T.Mapping[T.Text, T.Text]] = None) -> Values:
+    """Values of ``<PREFIX><FIELD_NAME>`` variables; multiple values are comma-separated."""
+    environ = os.environ if environ is None else environ
+    values: Values = {}
+    for name, field_plan in prompter.get_plan().fields.items():
+        variable = (prefix + name).upper()
+        if variable not in environ:
+            continue
+        value = environ[variable]
+        if _is_multiple(field_plan.field):
+            values[name] = [item.strip() for item in value.split(',') if item.strip()]
+        else:
+            values[name] = value
+    return _coerce(prompter, values)
+
+
+def load_file(path: T.Text) -> Values:
+    """Read values from a JSON or TOML file, holding a single table of field name => value."""
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("Reading TOML files requires Python 3.11+, or the tomli package")
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("%s: expected an object, got %s" % (path, type(data).__name__))
+    return data
+
+
+def collect(
+        prompter: cliform_django.FormPrompter, namespace: T.Optional[argparse.Namespace] = None,
+        env_prefix: T.Optional[T.Text] = None, files: T.Iterable[T.Text] = (),
+        environ: T.Optional[T.Mapping[T.Text, T.Text]] = None) -> Values:
+    """Merge the values of all sources; see the module docstring for precedence."""
+    values: Values = {}
+    for path in files:
+        values.update(_coerce(prompter, load_file(path)))
+    if env_prefix is not None:
+        values.update(from_environ(prompter, env_prefix, environ))
+    if namespace is not None:
+        values.update(from_namespace(prompter, namespace))
+    return values
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Aggregated error reports, for batches with too many errors to read them one by one.
+
+Errors are grouped by (field, error code, message template): a systematic problem
+shows up as a single line, with its count and the first few records it affected.
+"""
+
+import dataclasses
+import json
+import time
+import typing as T
+from dataclasses import dataclass
+
+from . import django as cliform_django
+
+ErrorKey = T.Tuple[T.Optional[T.Text], T.Optional[T.Text], T.Text]
+
+
+@dataclass
+class ErrorGroup:
+    """All errors sharing a field, code and message template."""
+    field: T.Optional[T.Text]
+    code: T.Optional[T.Text]
+    template: T.Text
+    # The first message, as an example
+    message: T.Text
+    count: int = 0
+    # The line numbers of the first records with this error
+    lines: T.List[int] = dataclasses.field(default_factory=list)
+    # Whether earlier errors of this group may have been dropped; the count is then a lower bound
+    partial: bool = False
+
+    def as_text(self) -> T.Text:
+        count = ">=%d" % self.count if self.partial else "%d" % self.count
+        where = "%s: " % self.field if self.field else ""
+        code = " [%s]" % self.code if self.code else ""
+        return "%8s  %s%s%s (lines %s)" % (
+            count, where, self.message, code, ", ".join(str(line) for line in self.lines),
+        )
+
+
+class ErrorReport:
+    """Aggregate the errors of a stream of batch results, in bounded memory.
+
+    At most ``max_groups`` groups are tracked, each with the line numbers of its first
+    ``examples`` records. When a new kind of error comes beyond that, the least frequent
+    half of the groups is dropped, and their errors are counted as "other errors".
+
+    With a ``stream``, the ``top`` most frequent groups are written there every
+    ``interval`` seconds, then once all results are in; with a ``sidecar``, each
+    invalid record is written there as a line of JSON, with all its errors in detail.
+    """
+
+    def __init__(
+            self, stream: T.Optional[T.TextIO] = None, sidecar: T.Optional[T.TextIO] = None,
+            top: int = 10, examples: int = 5, max_groups: int = 1000, interval: float = 5.0,
+            clock: T.Callable[[], float] = time.monotonic):
+        self.stream = stream
+        self.sidecar = sidecar
+        self.top = top
+        self.examples = examples
+        self.max_groups = max_groups
+        self.interval = interval
+        self.clock = clock
+
+        self.records = 0
+        self.failures = 0
+        self.errors = 0
+        self.groups: T.Dict[ErrorKey, ErrorGroup] = {}
+        self._dropped = False
+        self._last_summary = clock()
+
+    def _drop(self) -> None:
+        """Drop the least frequent half of the groups."""
+        groups = sorted(self.groups.items(), key=lambda item: item[1].count, reverse=True)
+        self.groups = dict(groups[:self.max_groups // 2])
+        self._dropped = True
+
+    def add(self, line: int, details: T.Sequence[cliform_django.ErrorDetail]) -> None:
+        """Count in a record, and its errors; see batch.Result.error_details()."""
+        self.records += 1
+        if details:
+            self.failures += 1
+            for detail in details:
+                key = (detail.field, detail.code, detail.template)
+                group = self.groups.get(key)
+                if group is None:
+                    if len(self.groups) >= self.max_groups:
+                        self._drop()
+                    group = self.groups[key] = ErrorGroup(
+                        field=detail.field, code=detail.code, template=detail.template, message=detail.message,
+                        partial=self._dropped,
+                    )
+                group.count += 1
+                if len(group.lines) < self.examples and group.lines[-1:] != [line]:
+                    group.lines.append(line)
+                self.errors += 1
+            if self.sidecar is not None:
+                self.sidecar.write(json.dumps({
+                    'line': line,
+                    'errors': [
+                        {'field': detail.field, 'code': detail.code, 'message': detail.message} for detail in details
+                    ],
+                }) + '\n')
+
+        if self.stream is not None and self.clock() - self._last_summary >= self.interval:
+            self.write_summary()
+
+    def top_groups(self, count: T.Optional[int] = None) -> T.List[ErrorGroup]:
+        """The most frequent groups, most frequent first."""
+        groups = sorted(self.groups.values(), key=lambda group: group.count, reverse=True)
+        return groups[:self.top if count is None else count]
+
+    def summary(self) -> T.List[T.Text]:
+        lines = ["=== %d errors in %d of %d records ===" % (self.errors, self.failures, self.records)]
+        top = self.top_groups()
+        lines.extend(group.as_text() for group in top)
+        remaining = self.errors - sum(group.count for group in top)
+        if remaining:
+            lines.append("%8d  other errors" % remaining)
+        return lines
+
+    def write_summary(self) -> None:
+        assert self.stream is not None
+        self.stream.write(''.join(line + '\n' for line in self.summary()))
+        self.stream.flush()
+        self._last_summary = self.clock()
+
+    def finish(self) -> None:
+        """Write the final summary, once all results are in."""
+        if self.stream is not None:
+            self.write_summary()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Serve prompter sessions to many clients, over TCP or Unix sockets.
+
+Each connection gets its own prompter, driven by a StreamInteracter;
+all sessions share a single process and event loop.
+"""
+
+import asyncio
+import typing as T
+
+from . import aio, interact
+
+PrompterFactory = T.Callable[[], interact.Prompter]
+
+
+class FormServer:
+    """Host prompter sessions.
+
+    - ``prompter_factory`` builds the prompter for each new connection;
+    - At most ``max_sessions`` run at once; extra connections are turned away;
+    - Sessions are closed after waiting ``idle_timeout`` seconds for a reply;
+    - ``advance_in_thread`` is required for prompters that block, e.g FormPrompter
+      subclasses whose validation hits the database.
+    """
+    BUSY_MESSAGE = "Too many sessions, please try again later"
+    TIMEOUT_MESSAGE = "Session timed out"
+
+    def __init__(
+            self, prompter_factory: PrompterFactory, max_sessions: int = 100,
+            idle_timeout: T.Optional[float] = 300.0, advance_in_thread: bool = False,
+            encoding: T.Text = 'utf-8'):
+        self.prompter_factory = prompter_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.advance_in_thread = advance_in_thread
+        self.encoding = encoding
+        self.sessions: T.Set['asyncio.Task[None]'] = set()
+        self.draining = False
+        self._server: T.Optional[asyncio.Server] = None
+
+    async def start_tcp(self, host: T.Optional[T.Text] = 'localhost', port: int = 0) -> asyncio.Server:
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server
+
+    async def start_unix(self, path: T.Text) -> asyncio.Server:
+        self._server = await asyncio.start_unix_server(self.handle, path)
+        return self._server
+
+    async def _error(self, writer: asyncio.StreamWriter, message: T.Text) -> None:
+        writer.write(("{} {}\n".format(interact.Prompter.ERROR_PREFIX, message)).encode(self.encoding))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        try:
+            if self.draining or len(self.sessions) >= self.max_sessions:
+                await self._error(writer, self.BUSY_MESSAGE)
+                return
+
+            self.sessions.add(task)
+            interacter = aio.StreamInteracter(reader, writer, encoding=self.encoding, idle_timeout=self.idle_timeout)
+            interacter.advance_in_thread = self.advance_in_thread
+            try:
+                await interacter.run(self.prompter_factory())
+            except asyncio.TimeoutError:
+                await self._error(writer, self.TIMEOUT_MESSAGE)
+            except EOFError:
+                pass
+            except asyncio.CancelledError:
+                # Cancelled by drain(): end the session quietly.
+                if not self.draining:
+                    raise
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(task)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def drain(self, timeout: T.Optional[float] = None) -> None:
+        """Stop accepting connections; wait up to timeout seconds for running sessions, then cancel them."""
+        assert self._server is not None
+        self.draining = True
+        self._server.close()
+        if self.sessions:
+            _done, pending = await asyncio.wait(set(self.sessions), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self._server.wait_closed()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Serializable state of a FormPrompter session, for stateless workers.
+
+A FormPrompter keeps its SessionState up to date while prompting: the answers
+given so far, with their cleaned values, and the field being asked.
+A fresh FormPrompter, in any process, can resume from that state: answered fields
+are neither asked, nor validated again.
+
+States are serialized as signed, compressed strings, with django.core.signing:
+cleaned values are pickled, and only unpickled once the signature is checked.
+"""
+
+import base64
+import pickle
+import typing as T
+from dataclasses import dataclass, field
+
+from django.core import signing
+
+from . import interact
+
+SALT = 'cliform.session'
+
+
+@dataclass
+class SessionState:
+    # See FormPrompter.form_version(); answers of another version are validated again.
+    # Only computed once the state is saved, see FormPrompter.dump_state().
+    version: T.Optional[T.Text] = None
+    # Field name => (raw reply, cleaned value)
+    answers: T.Dict[T.Text, T.Tuple[T.Any, T.Any]] = field(default_factory=dict)
+    # Field name => raw reply, whose cleaned value couldn't be serialized; validated again on resume.
+    unchecked: T.Dict[T.Text, T.Any] = field(default_factory=dict)
+    # The field being prompted, if any
+    current: T.Optional[T.Text] = None
+    # Whether a field was prompted: the final confirmation is then asked, even if all answers are restored.
+    prompted: bool = False
+
+    def dumps(self, key: T.Optional[T.Text] = None) -> T.Text:
+        answers = {}
+        unchecked = dict(self.unchecked)
+        for name, (raw, cleaned) in self.answers.items():
+            try:
+                answers[name] = base64.b64encode(pickle.dumps((raw, cleaned), pickle.HIGHEST_PROTOCOL)).decode('ascii')
+            except (pickle.PicklingError, TypeError, AttributeError):
+                unchecked[name] = raw
+        return signing.dumps(
+            {'v': self.version, 'a': answers, 'u': unchecked, 'c': self.current, 'p': self.prompted},
+            key=key, salt=SALT, compress=True,
+        )
+
+    @classmethod
+    def loads(cls, text: T.Text, key: T.Optional[T.Text] = None, max_age: T.Optional[float] = None) -> 'SessionState':
+        """Load a state from dumps(); raise signing.BadSignature if it was tampered with."""
+        data = signing.loads(text, key=key, salt=SALT, max_age=max_age)
+        return cls(
+            version=data['v'],
+            answers={name: pickle.loads(base64.b64decode(value)) for name, value in data['a'].items()},
+            unchecked=data['u'],
+            current=data['c'],
+            prompted=data.get('p', False),
+        )
+
+
+def step(
+        prompter: T.Any, state: T.Optional[T.Text], reply: T.Optional[T.Text] = None,
+        key: T.Optional[T.Text] = None) -> T.Tuple[T.List[T.Text], T.Optional[T.Text]]:
+    """Run a step of a session with a fresh FormPrompter; for stateless workers.
+
+    - state is None for a new session, or the state returned by the previous step;
+    - reply is the reply to the prompt ending the previous step.
+
+    Returns the lines to display, up to the next prompt, and the new state;
+    or None as the state once the session is over.
+    Navigation within paginated choices restarts from the first page at each step.
+    """
+    if state is not None:
+        prompter.restore(SessionState.loads(state, key=key))
+    loop = prompter.loop()
+    lines: T.List[T.Text] = []
+    try:
+        output = next(loop)
+        if reply is not None:
+            # Skip the prompt already shown by the previous step.
+            while not isinstance(output, interact.Query):
+                output = next(loop)
+            output = loop.send(interact.Input(reply))
+        while not isinstance(output, interact.Query):
+            lines.append(output)
+            output = next(loop)
+    except StopIteration:
+        return lines, None
+    finally:
+        loop.close()
+    return lines, prompter.dump_state(key=key)
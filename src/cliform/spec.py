@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Prompt from a precompiled form spec, before Django is even imported.
+
+A spec holds the prompts compiled by a FormPrompter, as JSON. SpecPrompter shows them
+right away, while Django is set up in a background thread; replies are validated by
+the actual FormPrompter as soon as it is available.
+
+Usage:
+    python -m cliform.spec export myapp.prompts:UserPrompter user.spec.json
+    python -m cliform.spec run user.spec.json
+
+This module must not import Django, nor cliform.django, at load time.
+"""
+
+import argparse
+import collections
+import hashlib
+import importlib
+import json
+import sys
+import threading
+import typing as T
+from dataclasses import dataclass, field
+
+from . import interact
+
+SPEC_FORMAT = 1
+
+
+def import_path(path: T.Text) -> T.Any:
+    """Import an object from a ``module:qualified.name`` path."""
+    module_name, _sep, qualname = path.partition(':')
+    value = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        value = getattr(value, attr)
+    return value
+
+
+def path_of(obj: T.Any) -> T.Text:
+    return '%s:%s' % (obj.__module__, obj.__qualname__)
+
+
+def prompt_to_spec(prompt: interact.Prompt) -> T.Optional[T.Dict[T.Text, T.Any]]:
+    """A JSON-compatible description of prompt, or None if it can't be precompiled."""
+    if isinstance(prompt, interact.TextInput):
+        return {'type': 'text'}
+    elif isinstance(prompt, interact.ChoiceInput):
+        options = [[option.key.value, option.shortcut, option.prefix, option.suffix]
+                   for option in prompt.choices.values()]
+        spec = {'type': 'choice', 'options': options, 'default_first': prompt.default_first}
+    elif isinstance(prompt, interact.IndexedChoiceInput):
+        options = [[key.value, str(label)] for key, label in zip(prompt.index.keys, prompt.index.labels)]
+        spec = {
+            'type': 'indexed', 'options': options,
+            'default_first': prompt.default_first, 'page_size': prompt.page_size,
+        }
+    else:
+        return None
+
+    try:
+        json.dumps(spec)
+    except (TypeError, ValueError):
+        # Option keys that JSON can't represent
+        return None
+    return spec
+
+
+def prompt_from_spec(title: T.Text, spec: T.Optional[T.Mapping[T.Text, T.Any]]) -> T.Optional[interact.Prompt]:
+    if spec is None:
+        return None
+    elif spec['type'] == 'text':
+        return interact.TextInput(title)
+    elif spec['type'] == 'choice':
+        choices = collections.OrderedDict(
+            (interact.OptionShortcut(shortcut), interact.Option(
+                key=interact.OptionKey(key),
+                shortcut=interact.OptionShortcut(shortcut),
+                prefix=prefix,
+                suffix=suffix,
+            ))
+            for key, shortcut, prefix, suffix in spec['options']
+        )
+        return interact.ChoiceInput(title=title, choices=choices, default_first=spec['default_first'])
+    else:
+        assert spec['type'] == 'indexed'
+        return interact.IndexedChoiceInput.from_texts(
+            title=title,
+            options=[(interact.OptionKey(key), label) for key, label in spec['options']],
+            default_first=spec['default_first'],
+            page_size=spec['page_size'],
+        )
+
+
+@dataclass
+class FieldSpec:
+    name: T.Text
+    label: T.Text
+    disabled: bool = False
+    # See prompt_to_spec(); None for prompts built at runtime (e.g from a queryset).
+    prompt: T.Optional[T.Dict[T.Text, T.Any]] = None
+
+
+@dataclass
+class FormSpec:
+    # Path to the FormPrompter class, see import_path()
+    prompter: T.Text
+    fields: T.List[FieldSpec] = field(default_factory=list)
+
+    def as_dict(self) -> T.Dict[T.Text, T.Any]:
+        return {
+            'format': SPEC_FORMAT,
+            'prompter': self.prompter,
+            'fields': [field.__dict__ for field in self.fields],
+        }
+
+    @property
+    def version(self) -> T.Text:
+        """A hash of the spec; changes whenever the prompts change."""
+        return hashlib.sha1(json.dumps(self.as_dict(), sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def dumps(self) -> T.Text:
+        return json.dumps(self.as_dict(), separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, text: T.Text) -> 'FormSpec':
+        data = json.loads(text)
+        if data.get('format') != SPEC_FORMAT:
+            raise ValueError("Unsupported spec format %r" % data.get('format'))
+        return cls(prompter=data['prompter'], fields=[FieldSpec(**field) for field in data['fields']])
+
+    def save(self, path: T.Text) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path: T.Text) -> 'FormSpec':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.loads(f.read())
+
+
+def export_spec(prompter_class: type) -> FormSpec:
+    """Compile the spec of a FormPrompter subclass; Django must be set up."""
+    return spec_from_plan(prompter_class, prompter_class().compile_plan())
+
+
+def spec_from_plan(prompter_class: type, plan: T.Any) -> FormSpec:
+    """The spec of a FormPrompter's compiled PromptPlan."""
+    return FormSpec(
+        prompter=path_of(prompter_class),
+        fields=[
+            FieldSpec(
+                name=name,
+                label=str(field_plan.label),
+                disabled=field_plan.field.disabled,
+                prompt=prompt_to_spec(field_plan.prompt),
+            )
+            for name, field_plan in plan.fields.items()
+        ],
+    )
+
+
+class SpecPrompter(interact.Prompter):
+    """Prompt from a FormSpec; validate through the actual FormPrompter once it is loaded.
+
+    With ``warm=True``, Django is set up in a background thread as soon as the prompter
+    is created; otherwise, when the first prompt is shown.
+    Replies given before the FormPrompter is ready are validated as soon as it is.
+
+    If the spec is stale (its version differs from the form's), the remaining fields
+    are prompted by the FormPrompter, and replies to fields it doesn't know are dropped.
+    """
+
+    def __init__(self, spec: FormSpec, warm: bool = True):
+        self.spec = spec
+        self._prompter: T.Any = None
+        self._error: T.Optional[BaseException] = None
+        self._ready = threading.Event()
+        self._loader: T.Optional[threading.Thread] = None
+        if warm:
+            self._start()
+
+    def _start(self) -> None:
+        if self._loader is None:
+            self._loader = threading.Thread(target=self._load, name='cliform-warmup', daemon=True)
+            self._loader.start()
+
+    def _load(self) -> None:
+        try:
+            import django
+            from django.apps import apps
+            if not apps.ready:
+                django.setup()
+            self._prompter = import_path(self.spec.prompter)()
+            self._prompter._plan = self._prompter.get_plan()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def prompter(self) -> T.Any:
+        """The actual FormPrompter; waits for it to be loaded."""
+        self._start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self._prompter
+
+    def _validate(
+            self, pending: 'collections.OrderedDict[T.Text, T.Any]',
+            answers: T.Dict[T.Text, T.Any]) -> T.Iterator[interact.Output]:
+        """Validate pending replies; those which fail are left in pending, with None as their value."""
+        from django.core.exceptions import ValidationError
+
+        from .django import FieldValue
+
+        prompter = self.prompter
+        for name, value in list(pending.items()):
+            field_plan = prompter._plan.fields.get(name)
+            if field_plan is None:
+                # A field removed since the spec was exported
+                del pending[name]
+                continue
+            try:
+                cleaned = prompter._clean_field(field_plan, value)
+            except ValidationError as e:
+                yield from prompter._field_errors(field_plan, e, labelled=True)
+                pending[name] = None
+            else:
+                answers[name] = FieldValue(raw=value, cleaned=cleaned)
+                del pending[name]
+
+    def _live_fields(self) -> T.Optional[T.List[FieldSpec]]:
+        """The fields of the FormPrompter, prompted at runtime; None if the spec is up to date."""
+        prompter = self.prompter
+        if prompter.form_version() == self.spec.version:
+            return None
+        return [
+            FieldSpec(name=name, label=str(field_plan.label), disabled=field_plan.field.disabled)
+            for name, field_plan in prompter._plan.fields.items()
+        ]
+
+    def interact(self) -> interact.InteractLoop:
+        answers: T.Dict[T.Text, T.Any] = {}
+        pending: 'collections.OrderedDict[T.Text, T.Any]' = collections.OrderedDict()
+        fields = self.spec.fields
+        checked = False
+        queue = collections.deque(field_spec for field_spec in fields if not field_spec.disabled)
+        while True:
+            if not checked and (self.ready or not queue):
+                # Before any reply is validated: check that the spec is still up to date.
+                checked = True
+                live_fields = self._live_fields()
+                if live_fields is not None:
+                    fields = live_fields
+                    queue = collections.deque(
+                        field_spec for field_spec in fields
+                        if not field_spec.disabled and field_spec.name not in pending
+                    )
+            if not (queue or pending):
+                break
+            if pending and (self.ready or not queue):
+                yield from self._validate(pending, answers)
+                # Ask again for the failed fields
+                failed = [name for name, value in pending.items() if value is None]
+                for name in failed:
+                    del pending[name]
+                queue.extendleft(reversed([
+                    field_spec for field_spec in fields if field_spec.name in failed
+                ]))
+            if not queue:
+                continue
+
+            field_spec = queue.popleft()
+            prompt = prompt_from_spec(field_spec.label, field_spec.prompt)
+            if prompt is None:
+                prompt = self.prompter.session_prompt(self.prompter._plan.fields[field_spec.name])
+            self._start()
+            pending[field_spec.name] = yield prompt
+
+        yield from self.prompter._finish(answers)
+
+
+def main(argv: T.Optional[T.Sequence[T.Text]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export or run precompiled form specs.")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+    export_parser = subparsers.add_parser('export', help="Compile the spec of a FormPrompter")
+    export_parser.add_argument('prompter', help="Path to the FormPrompter, as module:ClassName")
+    export_parser.add_argument('path', help="Spec file to write")
+    run_parser = subparsers.add_parser('run', help="Prompt from a spec")
+    run_parser.add_argument('path', help="Spec file")
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        import django
+        django.setup()
+        export_spec(import_path(args.prompter)).save(args.path)
+    else:
+        prompter = SpecPrompter(FormSpec.load(args.path))
+        interact.BufferedStdioInteracter(stdin=sys.stdin, stdout=sys.stdout).run(prompter)
+
+
+if __name__ == '__main__':
+    main()
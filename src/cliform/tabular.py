@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Read batch records from CSV or TSV files.
+
+Columns are mapped to form fields by their header, or explicitly; cells are read
+as replies to the fields' prompts would be: "Yes" / "No" for booleans, option labels
+or shortcuts for choices.
+
+Usage:
+    reader = TabularReader(UserPrompter(), dialect='excel-tab')
+    with open('users.tsv', newline='', encoding='utf-8') as f:
+        for result in BatchRunner(UserPrompter()).process(reader.records(f)):
+            ...
+"""
+
+import csv
+import typing as T
+
+from django import forms
+
+from . import django as cliform_django
+from . import interact
+
+Record = T.Dict[T.Text, T.Any]
+Coercer = T.Callable[[T.Text], T.Any]
+
+
+def _identity(cell: T.Text) -> T.Any:
+    return cell
+
+
+def choice_coercer(field_plan: cliform_django.FieldPlan) -> Coercer:
+    """Read cells as replies to a field's prompt: option keys, labels, or shortcuts; others are left as is.
+
+    Rows of a queryset are only looked up by the field itself, by key.
+    """
+    field = field_plan.field
+    prompt = field_plan.prompt
+    options: T.List[T.Tuple[interact.OptionKey, T.Text]]
+    if isinstance(prompt, cliform_django.QuerysetChoiceInput):
+        return _identity
+    elif isinstance(field, forms.ChoiceField):
+        options = cliform_django.choice_options(field)
+    elif isinstance(field, forms.BooleanField):
+        options = interact.BOOL_OPTIONS
+    else:
+        return _identity
+
+    shortcuts: T.Dict[T.Text, T.Any] = {}
+    if isinstance(prompt, interact.ChoiceInput):
+        shortcuts = {shortcut: option.key.value for shortcut, option in prompt.choices.items()}
+    keys = {str(key.value) for key, _label in options}
+    labels: T.Dict[T.Text, T.Any] = {}
+    for key, label in options:
+        labels.setdefault(str(label).lower(), key.value)
+
+    def coerce(cell: T.Text) -> T.Any:
+        if cell in keys:
+            return cell
+        folded = cell.lower()
+        if folded in labels:
+            return labels[folded]
+        return shortcuts.get(folded, cell)
+    return coerce
+
+
+class TabularReader:
+    """Stream records out of CSV / TSV input, for a FormPrompter's form.
+
+    - ``mapping`` maps columns (header names, or 0-based positions) to field names;
+      columns mapped to None are ignored;
+    - Without ``mapping``, header names are matched to field names or labels, case-insensitively;
+    - With ``header=False``, the first row holds data; ``mapping`` must then be given.
+
+    Empty cells are left out of records, as missing values.
+    """
+
+    def __init__(
+            self, prompter: cliform_django.FormPrompter,
+            mapping: T.Optional[T.Mapping[T.Union[T.Text, int], T.Optional[T.Text]]] = None,
+            header: bool = True, dialect: T.Union[T.Text, T.Type[csv.Dialect]] = 'excel', **fmtparams: T.Any):
+        if not header and mapping is None:
+            raise ValueError("A mapping is required for input without a header")
+        self.plan = prompter.get_plan()
+        self.mapping = mapping
+        self.header = header
+        self.dialect = dialect
+        self.fmtparams = fmtparams
+        self.coercers: T.Dict[T.Text, Coercer] = {
+            name: choice_coercer(field_plan) for name, field_plan in self.plan.fields.items()
+        }
+
+    def columns(self, header: T.Optional[T.Sequence[T.Text]]) -> T.List[T.Tuple[int, T.Text]]:
+        """The (position, field name) of mapped columns."""
+        if self.mapping is not None:
+            positions = {name.strip(): rank for rank, name in enumerate(header or ())}
+            columns = []
+            for column, name in self.mapping.items():
+                if name is None:
+                    continue
+                if name not in self.plan.fields:
+                    raise ValueError("Unknown field %r" % name)
+                if isinstance(column, int):
+                    columns.append((column, name))
+                elif column in positions:
+                    columns.append((positions[column], name))
+                else:
+                    raise ValueError("Missing column %r" % column)
+            return columns
+
+        assert header is not None
+        fields = {}
+        for name, field_plan in self.plan.fields.items():
+            fields[name.lower()] = name
+            fields.setdefault(str(field_plan.label).lower(), name)
+        columns = []
+        unknown = []
+        for rank, column in enumerate(header):
+            name = fields.get(column.strip().lower())
+            if name is None:
+                unknown.append(column)
+            else:
+                columns.append((rank, name))
+        if unknown:
+            raise ValueError("Unknown columns: %s" % ', '.join(repr(column) for column in unknown))
+        return columns
+
+    def records(self, stream: T.Iterable[T.Text]) -> T.Iterator[T.Tuple[int, Record]]:
+        """Yield (line number, record) for each non-blank row, one row at a time.
+
+        Line numbers are those of the row's first line, starting at 1.
+        Open files with ``newline=''``, as required by the csv module.
+        """
+        reader = csv.reader(stream, self.dialect, **self.fmtparams)
+        header = next(reader, None) if self.header else None
+        columns = self.columns(header)
+        start = reader.line_num + 1
+        for row in reader:
+            lineno, start = start, reader.line_num + 1
+            if not any(cell.strip() for cell in row):
+                continue
+            record = {}
+            for rank, name in columns:
+                cell = row[rank].strip() if rank < len(row) else ''
+                if cell:
+                    record[name] = self.coercers[name](cell)
+            yield lineno, record
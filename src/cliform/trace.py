@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Timestamped events from prompter sessions.
+
+Set ``Prompter.tracer`` to receive events; without a tracer, the only cost is
+a single attribute check per event.
+"""
+
+import collections
+import typing as T
+from dataclasses import dataclass
+
+# Event kinds
+PROMPT = 'prompt'            # A field's prompt was shown
+REPLY = 'reply'              # The user replied to a field's prompt
+CLEAN_START = 'clean_start'  # field.clean() started
+CLEAN_END = 'clean_end'      # field.clean() ended
+ERROR = 'error'              # A validation error was reported
+SUMMARY = 'summary'          # The summary was rendered (with duration)
+SUBMIT = 'submit'            # on_submit() ran (with duration)
+
+
+@dataclass
+class Event:
+    kind: T.Text
+    # time.perf_counter() value
+    timestamp: float
+    # Identifies the session (prompter) emitting the event
+    session: int
+    field: T.Optional[T.Text] = None
+    duration: T.Optional[float] = None
+    message: T.Optional[T.Text] = None
+
+
+class Tracer:
+    def emit(self, event: Event) -> None:
+        raise NotImplementedError()
+
+
+class RecordingTracer(Tracer):
+    """Keep all events, in order."""
+
+    def __init__(self) -> None:
+        self.events: T.List[Event] = []
+
+    def emit(self, event: Event) -> None:
+        self.events.append(event)
+
+
+def percentile(values: T.Sequence[float], ratio: float) -> float:
+    """Nearest-rank percentile of a sorted sequence."""
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+class Aggregator(Tracer):
+    """Compute per-field think time (prompt to reply) and validation time.
+
+    Events from concurrent sessions may be interleaved.
+    """
+    PERCENTILES = (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))
+
+    THINK = 'think'
+    VALIDATION = 'validation'
+
+    def __init__(self) -> None:
+        self.samples: T.Dict[T.Text, T.Dict[T.Text, T.List[float]]] = collections.defaultdict(
+            lambda: collections.defaultdict(list),
+        )
+        self.errors: T.Dict[T.Text, int] = collections.Counter()
+        self._started: T.Dict[T.Tuple[T.Text, int, T.Optional[T.Text]], float] = {}
+
+    def emit(self, event: Event) -> None:
+        if event.kind in (PROMPT, CLEAN_START):
+            self._started[(event.kind, event.session, event.field)] = event.timestamp
+        elif event.kind in (REPLY, CLEAN_END):
+            start_kind, metric = (PROMPT, self.THINK) if event.kind == REPLY else (CLEAN_START, self.VALIDATION)
+            start = self._started.pop((start_kind, event.session, event.field), None)
+            if start is not None and event.field is not None:
+                self.samples[event.field][metric].append(event.timestamp - start)
+        elif event.kind == ERROR and event.field is not None:
+            self.errors[event.field] += 1
+        elif event.duration is not None:
+            self.samples['<%s>' % event.kind][event.kind].append(event.duration)
+
+    def report(self) -> T.Dict[T.Text, T.Dict[T.Text, T.Dict[T.Text, float]]]:
+        """For each field and metric: sample count, and percentiles in seconds."""
+        report: T.Dict[T.Text, T.Dict[T.Text, T.Dict[T.Text, float]]] = {}
+        for field, metrics in self.samples.items():
+            report[field] = {}
+            for metric, samples in metrics.items():
+                ordered = sorted(samples)
+                stats = {'count': float(len(ordered))}
+                for name, ratio in self.PERCENTILES:
+                    stats[name] = percentile(ordered, ratio)
+                report[field][metric] = stats
+        return report
+
+    def format(self) -> T.Iterator[T.Text]:
+        yield "{:<24}{:<12}{:>8}{:>10}{:>10}{:>10}".format("Field", "Metric", "Count", "p50 ms", "p95 ms", "p99 ms")
+        for field, metrics in self.report().items():
+            for metric, stats in metrics.items():
+                yield "{:<24}{:<12}{:>8}{:>10.1f}{:>10.1f}{:>10.1f}".format(
+                    field, metric, int(stats['count']),
+                    stats['p50'] * 1000, stats['p95'] * 1000, stats['p99'] * 1000,
+                )
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+"""Record sessions from any interacter, and replay them against a prompter.
+
+Transcripts are stored as JSON Lines, one session per line::
+
+    {"steps": [["o", ">>> Name?"], ["i", "John Doe", 1.52], ["o", ">>> Email?"], ...]}
+
+- ``["o", text]``: all lines displayed before the next reply, joined with newlines;
+- ``["i", reply, think_time]``: the user's reply, and the seconds it took.
+"""
+
+import collections
+import itertools
+import json
+import time
+import typing as T
+from concurrent import futures
+from dataclasses import dataclass, field
+
+from . import batch, interact, trace
+
+OUTPUT = 'o'
+INPUT = 'i'
+
+Step = T.List[T.Any]
+PrompterFactory = T.Callable[[], interact.Prompter]
+
+
+@dataclass
+class Transcript:
+    steps: T.List[Step] = field(default_factory=list)
+
+    def add_output(self, lines: T.Iterable[T.Text]) -> None:
+        text = '\n'.join(lines)
+        if self.steps and self.steps[-1][0] == OUTPUT:
+            self.steps[-1][1] += '\n' + text
+        else:
+            self.steps.append([OUTPUT, text])
+
+    def add_input(self, reply: T.Text, think_time: float) -> None:
+        self.steps.append([INPUT, reply, round(think_time, 3)])
+
+    def dumps(self) -> T.Text:
+        return json.dumps({'steps': self.steps}, separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, text: T.Text) -> 'Transcript':
+        return cls(steps=json.loads(text)['steps'])
+
+
+def read_transcripts(stream: T.Iterable[T.Text]) -> T.Iterator[Transcript]:
+    for line in stream:
+        if line.strip():
+            yield Transcript.loads(line)
+
+
+class RecordingInteracter(interact.BaseInteracter):
+    """Wrap an interacter, and append a transcript of each session it runs to ``output``."""
+
+    def __init__(self, interacter: interact.BaseInteracter, output: T.TextIO):
+        self.interacter = interacter
+        self.output = output
+        self.transcript = Transcript()
+        self._last_output = time.perf_counter()
+
+    def display(self, message: T.Text) -> None:
+        self.transcript.add_output([message])
+        self.interacter.display(message)
+
+    def display_block(self, lines: T.Sequence[T.Text]) -> None:
+        self.transcript.add_output(lines)
+        self.interacter.display_block(lines)
+
+    def flush(self) -> None:
+        self.interacter.flush()
+        self._last_output = time.perf_counter()
+
+    def get_input(self) -> T.Text:
+        reply = self.interacter.get_input()
+        self.transcript.add_input(reply, time.perf_counter() - self._last_output)
+        return reply
+
+    def run(self, prompter: interact.Prompter) -> None:
+        self.transcript = Transcript()
+        try:
+            super().run(prompter)
+        finally:
+            self.output.write(self.transcript.dumps() + '\n')
+            self.output.flush()
+
+
+@dataclass
+class ReplayResult:
+    index: int
+    duration: float
+    divergence: T.Optional[T.Text] = None
+
+
+def replay(prompter: interact.Prompter, transcript: Transcript, index: int = 0) -> ReplayResult:
+    """Replay a transcript as fast as possible; report the first divergence, if any."""
+    start = time.perf_counter()
+    loop = prompter.loop(blocks=True)
+    displayed: T.List[T.Text] = []
+    steps = iter(transcript.steps)
+    reply: T.Optional[interact.Input] = None
+
+    def diverge(message: T.Text) -> ReplayResult:
+        loop.close()
+        return ReplayResult(index=index, duration=time.perf_counter() - start, divergence=message)
+
+    for rank in itertools.count():
+        try:
+            value = loop.send(reply)
+        except StopIteration:
+            value = None
+        reply = None
+        if isinstance(value, interact.DisplayBlock):
+            displayed.extend(value)
+            continue
+
+        # Compare everything displayed since the last reply
+        if displayed:
+            step = next(steps, None)
+            got = '\n'.join(displayed)
+            if step is None or step[0] != OUTPUT:
+                return diverge("Step %d: unexpected output %r" % (rank, got))
+            elif step[1] != got:
+                return diverge("Step %d: expected output %r, got %r" % (rank, step[1], got))
+            displayed = []
+
+        if value is None:
+            break
+        step = next(steps, None)
+        if step is None or step[0] != INPUT:
+            return diverge("Step %d: unexpected query" % rank)
+        reply = interact.Input(step[1])
+
+    if next(steps, None) is not None:
+        return diverge("Session ended before the end of the transcript")
+    return ReplayResult(index=index, duration=time.perf_counter() - start)
+
+
+def replay_chunk(prompter_factory: PrompterFactory, chunk: T.List[T.Tuple[int, Transcript]]) -> T.List[ReplayResult]:
+    return [replay(prompter_factory(), transcript, index) for index, transcript in chunk]
+
+
+@dataclass
+class ReplayReport:
+    sessions: int = 0
+    duration: float = 0.0
+    divergences: T.List[ReplayResult] = field(default_factory=list)
+    durations: T.List[float] = field(default_factory=list)
+
+    def add(self, results: T.Iterable[ReplayResult]) -> None:
+        for result in results:
+            self.sessions += 1
+            self.durations.append(result.duration)
+            if result.divergence is not None:
+                self.divergences.append(result)
+
+    @property
+    def sessions_per_second(self) -> float:
+        return self.sessions / self.duration if self.duration else 0.0
+
+    def format(self) -> T.Iterator[T.Text]:
+        yield "Sessions: {} ({:.0f}/s), divergences: {}".format(
+            self.sessions, self.sessions_per_second, len(self.divergences),
+        )
+        if self.durations:
+            ordered = sorted(self.durations)
+            yield "Session replay time: p50 {:.2f}ms, p99 {:.2f}ms".format(
+                trace.percentile(ordered, 0.50) * 1000, trace.percentile(ordered, 0.99) * 1000,
+            )
+        for result in self.divergences:
+            yield "Session #{}: {}".format(result.index, result.divergence)
+
+
+def replay_all(
+        prompter_factory: PrompterFactory, transcripts: T.Iterable[Transcript],
+        jobs: int = 1, chunk_size: int = 100) -> ReplayReport:
+    """Replay many transcripts, each against a fresh prompter.
+
+    With ``jobs > 1``, sessions are spread over a process pool; prompter_factory must then
+    be picklable, e.g a module-level class. Database connections are closed before
+    the workers start; see batch.close_connections().
+    """
+    report = ReplayReport()
+    start = time.perf_counter()
+    indexed = enumerate(transcripts)
+    if jobs > 1:
+        pending: T.Deque['futures.Future[T.List[ReplayResult]]'] = collections.deque()
+        batch.close_connections()
+        with futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            for chunk in iter(lambda: list(itertools.islice(indexed, chunk_size)), []):
+                pending.append(executor.submit(replay_chunk, prompter_factory, chunk))
+                if len(pending) >= 2 * jobs:
+                    report.add(pending.popleft().result())
+            while pending:
+                report.add(pending.popleft().result())
+    else:
+        report.add(replay(prompter_factory(), transcript, index) for index, transcript in indexed)
+    report.duration = time.perf_counter() - start
+    return report
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import asyncio
+import socket
+import typing as T
+import unittest
+
+import cliform
+import cliform.aio
+import cliform.interact
+
+
+class NaivePrompter(cliform.Prompter):
+    def interact(self) -> cliform.interact.InteractLoop:
+        yield cliform.interact.Info("Hello")
+        reply = yield cliform.interact.TextInput("Enter your name")
+        yield cliform.interact.Info("Welcome, %s" % reply)
+
+
+class ListInteracter(cliform.aio.AsyncBaseInteracter):
+    def __init__(self, replies: T.Iterable[T.Text]) -> None:
+        self.replies = list(replies)
+        self.lines: T.List[T.Text] = []
+
+    async def display(self, message: T.Text) -> None:
+        self.lines.append(message)
+
+    async def get_input(self) -> T.Text:
+        await asyncio.sleep(0)
+        return self.replies.pop(0)
+
+
+class AsyncInteracterTests(unittest.TestCase):
+    def test_run(self) -> None:
+        interacter = ListInteracter(["John Doe"])
+        asyncio.run(interacter.run(NaivePrompter()))
+        self.assertEqual(["Hello", ">>> Enter your name?", "Welcome, John Doe"], interacter.lines)
+
+    def test_in_thread(self) -> None:
+        interacter = ListInteracter(["John Doe"])
+        interacter.advance_in_thread = True
+        asyncio.run(interacter.run(NaivePrompter()))
+        self.assertEqual("Welcome, John Doe", interacter.lines[-1])
+
+    def test_concurrent(self) -> None:
+        interacters = [ListInteracter(["User %d" % i]) for i in range(1000)]
+
+        async def run_all() -> None:
+            await asyncio.gather(*[interacter.run(NaivePrompter()) for interacter in interacters])
+
+        asyncio.run(run_all())
+        self.assertEqual("Welcome, User 999", interacters[999].lines[-1])
+
+    def test_stream(self) -> None:
+        server_sock, client_sock = socket.socketpair()
+
+        async def session() -> None:
+            reader, writer = await asyncio.open_connection(sock=server_sock)
+            await cliform.aio.StreamInteracter(reader, writer).run(NaivePrompter())
+            await writer.drain()
+            writer.close()
+
+        client_sock.sendall(b"John Doe\r\n")
+        asyncio.run(session())
+        output = b''
+        while True:
+            chunk = client_sock.recv(4096)
+            if not chunk:
+                break
+            output += chunk
+        client_sock.close()
+        self.assertEqual(b"Hello\n>>> Enter your name?\nWelcome, John Doe\n", output)
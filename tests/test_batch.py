@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import io
+import json
+import typing as T
+import unittest
+
+from django import forms
+from django import test as django_test
+from django.contrib.auth import models as auth_models
+from django.core import exceptions
+from django.db import connection
+
+import cliform.batch
+import cliform.django
+
+from .test_django import ComplexForm, SimpleForm
+
+
+class SimpleFormPrompter(cliform.django.FormPrompter):
+    form_class = SimpleForm
+
+    def __init__(self) -> None:
+        self.submitted: T.List[T.Mapping[T.Text, T.Any]] = []
+
+    def on_submit(self, data: T.Mapping[T.Text, T.Any]) -> None:
+        self.submitted.append(data)
+
+
+class UserForm(forms.ModelForm):
+    class Meta:
+        model = auth_models.User
+        fields = ['username', 'email']
+
+
+class UserFormPrompter(SimpleFormPrompter):
+    form_class = UserForm
+
+
+class BatchRunnerTests(unittest.TestCase):
+    def run_batch(
+            self, lines: T.Iterable[T.Text], **kwargs: T.Any) -> T.Tuple[SimpleFormPrompter, int, T.List[T.Any]]:
+        prompter = SimpleFormPrompter()
+        runner = cliform.batch.BatchRunner(prompter, **kwargs)
+        stdout = io.StringIO()
+        failures = runner.run(io.StringIO(''.join(line + '\n' for line in lines)), stdout)
+        return prompter, failures, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_nominal(self) -> None:
+        prompter, failures, results = self.run_batch([
+            '{"name": "John Doe", "email": "john.doe@example.com"}',
+            '',
+            '{"name": "Jane Doe", "email": "jane"}',
+        ])
+        self.assertEqual(1, failures)
+        self.assertEqual([
+            {'line': 1, 'data': {'name': "John Doe", 'email': "john.doe@example.com"}},
+            {'line': 3, 'errors': ["email: Enter a valid email address."]},
+        ], results)
+        self.assertEqual([], prompter.submitted)
+
+    def test_submit(self) -> None:
+        prompter, failures, results = self.run_batch([
+            '{"name": "John Doe", "email": "john.doe@example.com"}',
+            '{"name": "Jane Doe"}',
+        ], submit=True)
+        self.assertEqual(1, failures)
+        self.assertEqual([{'name': "John Doe", 'email': "john.doe@example.com"}], prompter.submitted)
+        self.assertEqual(["email: This field is required."], results[1]['errors'])
+
+    def test_bad_json(self) -> None:
+        _prompter, failures, results = self.run_batch(['{"name":', '["John Doe"]'])
+        self.assertEqual(2, failures)
+        self.assertTrue(results[0]['errors'][0].startswith("Invalid JSON: "))
+        self.assertEqual(["Expected a JSON object, got list"], results[1]['errors'])
+
+    def test_streaming(self) -> None:
+        def lines() -> T.Iterator[T.Text]:
+            yield '{"name": "John Doe", "email": "john.doe@example.com"}\n'
+            raise AssertionError("Input consumed ahead of output")
+
+        runner = cliform.batch.BatchRunner(SimpleFormPrompter())
+        results = runner.results(lines())
+        self.assertTrue(next(results).valid)
+
+    def test_parallel(self) -> None:
+        lines = [
+            '{"name": "User %d", "email": "%s"}' % (i, 'user%d@example.com' % i if i % 3 else 'invalid')
+            for i in range(20)
+        ] + ['{"name":']
+        _prompter, failures, results = self.run_batch(lines, submit=True)
+        prompter, parallel_failures, parallel_results = self.run_batch(lines, submit=True, jobs=3, chunk_size=2)
+        self.assertEqual(failures, parallel_failures)
+        self.assertEqual(results, parallel_results)
+        self.assertEqual(['User 1', 'User 2', 'User 4'], [data['name'] for data in prompter.submitted[:3]])
+
+    def test_choices(self) -> None:
+        result = cliform.batch.validate_line(
+            ComplexForm, 1,
+            '{"name": "John", "email": "john@example.com", "is_staff": true, "profile": "intern"}',
+        )
+        self.assertEqual([], result.errors)
+        assert result.data is not None
+        self.assertEqual('intern', result.data['profile'])
+        self.assertFalse(result.data['is_superuser'])
+
+
+class BulkSaveTests(django_test.TestCase):
+    def run_batch(self, lines: T.Iterable[T.Text], **kwargs: T.Any) -> T.Tuple[int, T.List[T.Any]]:
+        runner = cliform.batch.BatchRunner(UserFormPrompter(), submit=True, **kwargs)
+        stdout = io.StringIO()
+        failures = runner.run(io.StringIO(''.join(line + '\n' for line in lines)), stdout)
+        return failures, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_close_connections(self) -> None:
+        # Tests run in a transaction: it is kept.
+        connection.ensure_connection()
+        cliform.batch.close_connections()
+        self.assertIsNotNone(connection.connection)
+        self.assertTrue(auth_models.User.objects.create(username="kept"))
+
+    def test_bulk(self) -> None:
+        lines = ['{"username": "user%d", "email": "user%d@example.com"}' % (i, i) for i in range(10)]
+        # One query per record for the unique username check,
+        # then a single insert per batch, within a transaction (a savepoint, in tests).
+        with self.assertNumQueries(10 + 3 * 3):
+            failures, results = self.run_batch(lines, bulk_size=4)
+        self.assertEqual(0, failures)
+        self.assertEqual(list(range(1, 11)), [result['line'] for result in results])
+        self.assertEqual(
+            ['user%d' % i for i in range(10)],
+            list(auth_models.User.objects.order_by('username').values_list('username', flat=True)),
+        )
+
+    def test_fallback(self) -> None:
+        failures, results = self.run_batch([
+            '{"username": "john", "email": "john@example.com"}',
+            '{"username": "jane", "email": "nope"}',
+            '{"username": "john", "email": "john.doe@example.com"}',
+            '{"username": "jim", "email": "jim@example.com"}',
+            '{"username": "joe", "email": "joe@example.com"}',
+        ], bulk_size=3)
+        self.assertEqual(2, failures)
+        self.assertEqual(["email: Enter a valid email address."], results[1]['errors'])
+        # Duplicates within a batch are only caught by the database
+        self.assertEqual(1, len(results[2]['errors']))
+        self.assertTrue(results[2]['errors'][0].startswith("Could not save: "))
+        self.assertEqual([1, 2, 3, 4, 5], [result['line'] for result in results])
+        self.assertEqual(
+            ['jim', 'joe', 'john'],
+            list(auth_models.User.objects.order_by('username').values_list('username', flat=True)),
+        )
+
+    def test_invalid_streaming(self) -> None:
+        def lines() -> T.Iterator[T.Text]:
+            for i in range(3):
+                yield '{"username": "user%d", "email": "invalid"}\n' % i
+            raise AssertionError("Input consumed ahead of output")
+
+        runner = cliform.batch.BatchRunner(UserFormPrompter(), submit=True, bulk_size=3)
+        results = runner.results(lines())
+        # Invalid results aren't held back until bulk_size valid ones come
+        self.assertEqual([1, 2, 3], [next(results).line for _i in range(3)])
+
+    def test_not_model_form(self) -> None:
+        with self.assertRaises(exceptions.ImproperlyConfigured):
+            cliform.batch.BulkSaver(SimpleForm)
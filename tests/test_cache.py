@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import io
+import json
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+from django import forms
+from django.core import validators
+
+import cliform.batch
+import cliform.cache
+import cliform.django
+import cliform.interact
+
+from .test_django import SimpleForm
+
+
+class CountingEmailField(forms.EmailField):
+    calls = 0
+
+    def clean(self, value):
+        type(self).calls += 1
+        return super().clean(value)
+
+
+class ContactForm(forms.Form):
+    name = forms.CharField()
+    email = CountingEmailField()
+
+
+class ValidationCacheTests(unittest.TestCase):
+    def setUp(self):
+        CountingEmailField.calls = 0
+        self.field = CountingEmailField()
+
+    def test_memory(self) -> None:
+        cache = cliform.cache.ValidationCache(maxsize=2)
+        for _i in range(3):
+            self.assertEqual("a@example.com", cache.clean(ContactForm, 'email', "a@example.com", self.field.clean))
+            with self.assertRaises(forms.ValidationError) as cm:
+                cache.clean(ContactForm, 'email', "nope", self.field.clean)
+            self.assertEqual(["Enter a valid email address."], cm.exception.messages)
+        self.assertEqual((2, 4, 2), (CountingEmailField.calls, cache.hits, cache.misses))
+
+        # LRU eviction
+        cache.clean(ContactForm, 'email', "b@example.com", self.field.clean)
+        cache.clean(ContactForm, 'email', "a@example.com", self.field.clean)
+        self.assertEqual(4, CountingEmailField.calls)
+
+    def test_ttl(self) -> None:
+        cache = cliform.cache.ValidationCache(ttl=0.01)
+        cache.clean(ContactForm, 'email', "a@example.com", self.field.clean)
+        time.sleep(0.02)
+        cache.clean(ContactForm, 'email', "a@example.com", self.field.clean)
+        self.assertEqual(2, CountingEmailField.calls)
+
+    def test_disk(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'cache.sqlite')
+            cache = cliform.cache.ValidationCache(path=path, max_disk_entries=5)
+            cache.EVICTION_INTERVAL = 10
+            for rank in range(10):
+                cache.clean(ContactForm, 'email', "user%d@example.com" % rank, self.field.clean)
+
+            # A new process shares the database, not the memory.
+            other = pickle.loads(pickle.dumps(cache))
+            self.assertEqual(
+                "user9@example.com", other.clean(ContactForm, 'email', "user9@example.com", CountingEmailField().clean))
+            self.assertEqual(1, other.hits)
+            self.assertEqual(10, CountingEmailField.calls)
+            # Size-based eviction dropped the oldest entries
+            other.clean(ContactForm, 'email', "user0@example.com", self.field.clean)
+            self.assertEqual(11, CountingEmailField.calls)
+
+    def test_changed_field(self) -> None:
+        cache = cliform.cache.ValidationCache()
+        cache.clean(ContactForm, 'email', "a@example.com", self.field.clean)
+        cache.clean(ContactForm, 'email', "a@example.com", CountingEmailField().clean)
+        self.assertEqual((1, 1), (CountingEmailField.calls, cache.hits))
+
+        # Same form and field name, stricter field
+        field = CountingEmailField(validators=[
+            validators.RegexValidator(r'@example\.org$', message="Not from example.org"),
+        ])
+        with self.assertRaises(forms.ValidationError) as cm:
+            cache.clean(ContactForm, 'email', "a@example.com", field.clean)
+        self.assertEqual(["Not from example.org"], cm.exception.messages)
+        self.assertEqual(2, CountingEmailField.calls)
+
+    def test_changed_choices(self) -> None:
+        cache = cliform.cache.ValidationCache()
+        field = forms.ChoiceField(choices=[('a', "A"), ('b', "B")])
+        self.assertEqual('b', cache.clean(ContactForm, 'kind', 'b', field.clean))
+        field = forms.ChoiceField(choices=[('a', "A")])
+        with self.assertRaises(forms.ValidationError):
+            cache.clean(ContactForm, 'kind', 'b', field.clean)
+        self.assertEqual(0, cache.hits)
+
+
+class CachedFormTests(unittest.TestCase):
+    def setUp(self):
+        CountingEmailField.calls = 0
+
+    def test_clean_form_cached(self) -> None:
+        cache = cliform.cache.ValidationCache()
+        for name in ["John", "Jane", ""]:
+            form = ContactForm({'name': name, 'email': "doe@example.com"})
+            expected = ContactForm({'name': name, 'email': "doe@example.com"})
+            self.assertEqual(expected.is_valid(), cliform.django.clean_form_cached(form, cache, ['email']))
+            self.assertEqual(expected.cleaned_data, form.cleaned_data)
+            self.assertEqual(expected.errors, form.errors)
+        # 3 calls for the reference forms, a single one through the cache
+        self.assertEqual(4, CountingEmailField.calls)
+
+    def test_batch(self) -> None:
+        class ContactPrompter(cliform.django.FormPrompter):
+            form_class = ContactForm
+            validation_cache = cliform.cache.ValidationCache()
+            cached_fields = ['email']
+
+        lines = ''.join(
+            json.dumps({'name': "User %d" % rank, 'email': "team@example.com" if rank % 2 else "bad"}) + '\n'
+            for rank in range(10)
+        )
+        stdout = io.StringIO()
+        failures = cliform.batch.BatchRunner(ContactPrompter()).run(io.StringIO(lines), stdout)
+        self.assertEqual(5, failures)
+        self.assertEqual(2, CountingEmailField.calls)
+        self.assertEqual(
+            {'line': 1, 'errors': ["email: Enter a valid email address."]},
+            json.loads(stdout.getvalue().splitlines()[0]),
+        )
+
+    def test_prompter(self) -> None:
+        class SimplePrompter(cliform.django.FormPrompter):
+            form_class = SimpleForm
+            validation_cache = cliform.cache.ValidationCache()
+            cached_fields = ['email']
+
+        for _i in range(2):
+            loop = SimplePrompter().loop()
+            next(loop), next(loop)
+            loop.send(cliform.interact.Input("John"))
+            next(loop)
+            self.assertEqual("!! Enter a valid email address.", loop.send(cliform.interact.Input("john")))
+            loop.close()
+        self.assertEqual(1, SimplePrompter.validation_cache.hits)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import os
+import shutil
+import tempfile
+import typing as T
+import unittest
+
+import cliform.batch
+import cliform.checkpoint
+import cliform.django
+
+from .test_batch import SimpleFormPrompter
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingRunner(cliform.batch.BatchRunner):
+    """Stop after a given number of results."""
+
+    def __init__(
+            self, prompter: cliform.django.FormPrompter, crash_after: T.Optional[int], **kwargs: T.Any) -> None:
+        super().__init__(prompter, **kwargs)
+        self.crash_after = crash_after
+        self.lines: T.List[int] = []
+
+    def process(self, lines: T.Iterable[cliform.batch.Line]) -> T.Iterator[cliform.batch.Result]:
+        for result in super().process(lines):
+            self.lines.append(result.line)
+            if self.crash_after is not None and len(self.lines) > self.crash_after:
+                raise Crash()
+            yield result
+
+
+class LineIndexTests(unittest.TestCase):
+    def test_scan(self) -> None:
+        self.assertEqual([0, 2, 3], list(cliform.checkpoint.LineIndex.scan(b'a\n\nbc')))
+        self.assertEqual([0, 2], list(cliform.checkpoint.LineIndex.scan(b'a\nb\n')))
+        self.assertEqual([], list(cliform.checkpoint.LineIndex.scan(b'')))
+
+    def test_reuse(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'input.jsonl')
+            with open(path, 'wb') as f:
+                f.write(b'{}\n\n{"a": 1}\n')
+            built = cliform.checkpoint.LineIndex.open(path, path + '.index')
+            mapped = cliform.checkpoint.LineIndex.open(path, path + '.index')
+            self.assertEqual([0, 3, 4], [mapped.offset(line) for line in range(1, len(mapped) + 1)])
+            self.assertEqual(built.offset(4), mapped.offset(4))
+            self.assertEqual([(1, '{}'), (3, '{"a": 1}')], list(mapped.read(path)))
+
+
+class CheckpointedRunTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.input_path = os.path.join(self.tmpdir, 'input.jsonl')
+        with open(self.input_path, 'w', encoding='utf-8') as f:
+            for rank in range(25):
+                if rank == 10:
+                    f.write('\n')
+                f.write('{"name": "Jöhn %d", "email": "%s"}\n' % (rank, 'invalid' if rank % 4 == 0 else 'a@b.org'))
+
+    def run_batch(
+            self, output_name: T.Text, crash_after: T.Optional[int] = None) -> T.Tuple[CrashingRunner, int]:
+        runner = CrashingRunner(SimpleFormPrompter(), crash_after)
+        run = cliform.checkpoint.CheckpointedRun(
+            runner, self.input_path, os.path.join(self.tmpdir, output_name), interval=4,
+        )
+        return runner, run.run()
+
+    def read(self, output_name: T.Text) -> T.Text:
+        with open(os.path.join(self.tmpdir, output_name), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_resume(self) -> None:
+        _runner, failures = self.run_batch('reference.jsonl')
+        self.assertEqual(7, failures)
+        self.assertEqual(25, len(self.read('reference.jsonl').splitlines()))
+
+        with self.assertRaises(Crash):
+            self.run_batch('output.jsonl', crash_after=10)
+        # Results past the last checkpoint were written, yet will be dropped.
+        self.assertEqual(10, len(self.read('output.jsonl').splitlines()))
+
+        runner, failures = self.run_batch('output.jsonl')
+        self.assertEqual(7, failures)
+        self.assertEqual(self.read('reference.jsonl'), self.read('output.jsonl'))
+        # Resumed after the 8 records of the second checkpoint; line 11 is blank.
+        self.assertEqual(list(range(9, 11)) + list(range(12, 27)), runner.lines)
+
+        # Complete: nothing more to do.
+        runner, failures = self.run_batch('output.jsonl')
+        self.assertEqual(7, failures)
+        self.assertEqual([], runner.lines)
+
+    def test_input_changed(self) -> None:
+        with self.assertRaises(Crash):
+            self.run_batch('output.jsonl', crash_after=5)
+        with open(self.input_path, 'a', encoding='utf-8') as f:
+            f.write('{}\n')
+        with self.assertRaises(ValueError):
+            self.run_batch('output.jsonl')
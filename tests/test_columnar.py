@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import json
+import types
+import typing as T
+import unittest
+
+from django import forms
+from django.core import validators
+
+import cliform.batch
+import cliform.columnar
+
+from .test_django import CountingCharField, PasswordForm
+
+
+class ImportForm(forms.Form):
+    name = forms.CharField(max_length=10, min_length=2)
+    email = forms.EmailField(required=False)
+    code = forms.RegexField(regex=r'^[A-Z]{3}$', required=False)
+    quantity = forms.IntegerField(min_value=0, max_value=100, required=False)
+    profile = forms.ChoiceField(choices=[
+        ('intern', "Intern"),
+        ("Staff", [('fulltime', "Full-Time"), (1, "Part-Time")]),
+    ], required=False)
+    rank = forms.TypedChoiceField(choices=[('1', "One"), ('2', "Two")], coerce=int, required=False)
+    birthday = forms.DateField(required=False)
+    tags = forms.MultipleChoiceField(choices=[('a', "A"), ('b', "B")], required=False)
+    active = forms.BooleanField(required=False)
+
+
+RECORDS: T.List[T.Dict[T.Text, T.Any]] = [
+    {'name': "John", 'email': "john@example.com", 'code': "ABC", 'quantity': 3, 'profile': 'intern'},
+    {'name': "John", 'email': "john@example.com", 'code': "ABC", 'quantity': "3", 'profile': 'fulltime'},
+    {'name': " John ", 'email': " JOHN@example.com", 'code': "abc", 'quantity': "3.0", 'profile': 1},
+    {'name': "J", 'email': "john@", 'code': "ABCD", 'quantity': 101, 'profile': 'other'},
+    {'name': "Johnathan Doe", 'email': "john@localhost", 'quantity': -1, 'profile': '1'},
+    {'name': "", 'email': "john@[127.0.0.1]", 'quantity': " 7 ", 'rank': "2"},
+    {'name': None, 'email': "jöhn@exämple.com", 'quantity': True, 'rank': "3"},
+    {'name': 42, 'email': "x" * 320 + "@example.com", 'quantity': "abc", 'birthday': "2020-02-30"},
+    {'name': "Jo\x00hn", 'email': 42, 'quantity': 1.5, 'birthday': "2020-02-03", 'tags': ['a']},
+    {'name': ["John"], 'quantity': "٣", 'tags': ['a', 'c'], 'active': 'on'},
+    {'name': "Jane", 'birthday': "2020-02-03", 'tags': ['a'], 'active': False},
+]
+
+
+def lines(records: T.Iterable[T.Mapping[T.Text, T.Any]]) -> T.List[T.Tuple[int, T.Text]]:
+    return [(lineno, json.dumps(record)) for lineno, record in enumerate(records, start=1)]
+
+
+class ColumnarTests(unittest.TestCase):
+    def compare(
+            self, form_class: T.Type[forms.BaseForm],
+            records: T.Sequence[T.Mapping[T.Text, T.Any]]) -> T.List[cliform.batch.Result]:
+        expected = cliform.batch.Validator(form_class).chunk(lines(records))
+        results = cliform.batch.Validator(form_class, columnar=True).chunk(lines(records))
+        self.assertEqual([result.as_dict() for result in expected], [result.as_dict() for result in results])
+        self.assertEqual([result.data for result in expected], [result.data for result in results])
+        return results
+
+    def test_same_results(self) -> None:
+        self.assertTrue(cliform.columnar.ColumnCleaner(ImportForm).standalone)
+        results = self.compare(ImportForm, RECORDS * 3)
+        self.assertEqual(
+            [True, True, False, False, False, False, False, False, False, False, True] * 3,
+            [result.valid for result in results],
+        )
+
+    def test_form_clean(self) -> None:
+        self.assertFalse(cliform.columnar.ColumnCleaner(PasswordForm).standalone)
+        CountingCharField.calls = 0
+        self.compare(PasswordForm, [
+            {'username': "John", 'password': "secret", 'confirm': "secret"},
+            {'username': "root", 'password': "secret", 'confirm': "secret"},
+            {'username': "John", 'password': "secret", 'confirm': "typo"},
+            {'username': "", 'password': "secret"},
+        ] * 5)
+        # 20 records for the reference, then 3 distinct values
+        self.assertEqual(20 + 3, CountingCharField.calls)
+
+    def test_fast_path(self) -> None:
+        slow = cliform.columnar.SLOW
+        email = cliform.columnar.fast_path(forms.EmailField(max_length=30))
+        assert email is not None
+        self.assertEqual("john@example.com", email(" john@example.com "))
+        self.assertIs(slow, email("john@[127.0.0.1]"))
+        self.assertIs(slow, email("x" * 30 + "@example.com"))
+        integer = cliform.columnar.fast_path(forms.IntegerField(max_value=10))
+        assert integer is not None
+        self.assertEqual(7, integer("7"))
+        self.assertIs(slow, integer(True))
+        self.assertIs(slow, integer(11))
+        self.assertIsNone(cliform.columnar.fast_path(forms.URLField()))
+        self.assertIsNone(cliform.columnar.fast_path(CountingCharField()))
+
+    def test_email_whitelist(self) -> None:
+        # Before Django 3.2, the allowlist was named domain_whitelist
+        validator = types.SimpleNamespace(
+            user_regex=validators.EmailValidator.user_regex,
+            domain_regex=validators.EmailValidator.domain_regex,
+            domain_whitelist=['localhost'],
+        )
+        check = cliform.columnar._email_check(validator)
+        assert check is not None
+        self.assertTrue(check("john@localhost"))
+        self.assertFalse(check("john@"))
+        self.assertIsNone(cliform.columnar._email_check(types.SimpleNamespace()))
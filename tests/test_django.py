@@ -2,10 +2,16 @@
 # Copyright (c) The cliform project
 # This code is distributed under the two-clause BSD License.
 
+import threading
+import typing as T
+import unittest
+from concurrent import futures
+
 from django import forms
 
 import cliform
 import cliform.django
+import cliform.interact
 
 from . import utils
 
@@ -155,3 +161,247 @@ class ComplexFormTests(utils.InteractionTestCase):
             'is_superuser': False,
             'profile': 'fulltime',
         }, self.prompter.data)
+
+
+class PromptPlanTests(utils.InteractionTestCase):
+    def setUp(self):
+        calls = self.calls = []
+
+        class FormPrompter(cliform.django.FormPrompter):
+            form_class = ComplexForm
+
+            def _input_for_field(self, label, field):
+                calls.append(label)
+                return super()._input_for_field(label, field)
+
+            def on_submit(self, data):
+                pass
+
+        self.prompter_class = FormPrompter
+
+    def test_compiled_once(self) -> None:
+        for _i in range(2):
+            self.assertSequence(
+                self.prompter_class(),
+                [
+                    utils.ExpectMsg(">>> Name?"),
+                    utils.ExpectQuery(reply="John Doe"),
+                    utils.ExpectMsg(">>> Email?"),
+                    utils.ExpectQuery(reply="john"),
+                    utils.ExpectMsg("!! Enter a valid email address."),
+                    utils.ExpectMsg(">>> Email?"),
+                    utils.ExpectQuery(reply="john.doe@example.com"),
+                    utils.ExpectMsg(">>> Is Staff? ([Y]es/[N]o)"),
+                    utils.ExpectQuery(reply=""),
+                    utils.ExpectMsg(">>> Is superuser? ([Y]es/[N]o)"),
+                    utils.ExpectQuery(reply=""),
+                    utils.ExpectMsg(">>> Profile? ([I]ntern/[F]ull-Time/[C]ontractor)"),
+                    utils.ExpectQuery(reply='f'),
+                    utils.ExpectMsg(""),
+                ],
+            )
+        self.assertEqual(["Name", "Email", "Is Staff", "Is superuser", "Profile"], self.calls)
+
+    def test_invalidate(self) -> None:
+        prompter = self.prompter_class()
+        plan = prompter.get_plan()
+        self.assertIs(plan, prompter.get_plan())
+        self.prompter_class.invalidate_plan()
+        self.assertIsNot(plan, prompter.get_plan())
+
+    def test_no_cache(self) -> None:
+        prompter = self.prompter_class()
+        prompter.cache_plan = False
+        self.assertIsNot(prompter.get_plan(), prompter.get_plan())
+
+    def test_lru(self) -> None:
+        cache = cliform.django.PlanCache(maxsize=2)
+        prompter = self.prompter_class()
+        plans = [prompter.compile_plan() for _i in range(3)]
+        cache.set((self.prompter_class, SimpleForm), plans[0])
+        cache.set((self.prompter_class, ComplexForm), plans[1])
+        cache.get((self.prompter_class, SimpleForm))
+        cache.set((type(prompter), forms.Form), plans[2])
+        self.assertIs(plans[0], cache.get((self.prompter_class, SimpleForm)))
+        self.assertIsNone(cache.get((self.prompter_class, ComplexForm)))
+
+
+class CountingCharField(forms.CharField):
+    calls = 0
+
+    def clean(self, value):
+        type(self).calls += 1
+        return super().clean(value)
+
+
+class PasswordForm(forms.Form):
+    username = CountingCharField()
+    password = forms.CharField()
+    confirm = forms.CharField(required=False)
+    team = forms.CharField(disabled=True, initial="ops")
+
+    def clean_username(self):
+        return self.cleaned_data['username'].lower()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('password') != cleaned_data.get('confirm'):
+            self.add_error('confirm', "Passwords don't match.")
+        if cleaned_data.get('username') == 'root':
+            raise forms.ValidationError("Reserved username.")
+        return cleaned_data
+
+
+class CleanFormTests(unittest.TestCase):
+    def test_same_as_full_clean(self) -> None:
+        for data in [
+            {'username': "John", 'password': "secret", 'confirm': "secret"},
+            {'username': "John", 'password': "secret", 'confirm': "typo"},
+            {'username': "Root", 'password': "secret", 'confirm': "secret"},
+            {'username': "", 'password': "secret"},
+        ]:
+            with self.subTest(data=data):
+                expected = PasswordForm(data)
+                expected.is_valid()
+                form = PasswordForm(data)
+                cleaned = {}
+                for name in ['username', 'confirm']:
+                    try:
+                        cleaned[name] = form.fields[name].clean(data.get(name))
+                    except forms.ValidationError:
+                        pass
+                self.assertEqual(expected.is_valid(), cliform.django.clean_form(form, cleaned))
+                self.assertEqual(expected.cleaned_data, form.cleaned_data)
+                self.assertEqual(expected.errors, form.errors)
+
+    def test_unbound(self) -> None:
+        self.assertFalse(cliform.django.clean_form(PasswordForm(), {}))
+
+
+class PasswordFormTests(utils.InteractionTestCase):
+    def setUp(self):
+        class FormPrompter(cliform.django.FormPrompter):
+            form_class = PasswordForm
+            data = None
+
+            def on_submit(self, data):
+                self.data = data
+
+        self.prompter = FormPrompter()
+        CountingCharField.calls = 0
+
+    def test_form_errors(self) -> None:
+        self.assertSequence(
+            self.prompter,
+            [
+                utils.ExpectMsg(">>> Username?"),
+                utils.ExpectQuery(reply="John"),
+                utils.ExpectMsg(">>> Password?"),
+                utils.ExpectQuery(reply="secret"),
+                utils.ExpectMsg(">>> Confirm?"),
+                utils.ExpectQuery(reply="typo"),
+                utils.ExpectMsg("!! Confirm: Passwords don't match."),
+                utils.ExpectMsg(">>> Confirm?"),
+                utils.ExpectQuery(reply="secret"),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("=== Summary ==="),
+                utils.ExpectMsg("Username:   john"),
+                utils.ExpectMsg("Password:   secret"),
+                utils.ExpectMsg("Confirm:    secret"),
+                utils.ExpectMsg("Team:       ops"),
+                utils.ExpectMsg(">>> Confirm? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=''),
+                utils.ExpectMsg(""),
+            ],
+        )
+        # Cleaned once when prompted; form-wide validation reused the result.
+        self.assertEqual(1, CountingCharField.calls)
+
+    def test_non_field_errors(self) -> None:
+        self.assertSequence(
+            self.prompter,
+            [
+                utils.ExpectMsg(">>> Username?"),
+                utils.ExpectQuery(reply="root"),
+                utils.ExpectMsg(">>> Password?"),
+                utils.ExpectQuery(reply="secret"),
+                utils.ExpectMsg(">>> Confirm?"),
+                utils.ExpectQuery(reply="secret"),
+                utils.ExpectMsg("!! Reserved username."),
+                utils.ExpectMsg(">>> Username?"),
+            ],
+        )
+
+
+class ImmediateExecutor(futures.Executor):
+    """Run submitted functions at once, for predictable tests."""
+    def submit(self, __fn: T.Callable[..., T.Any], *args: T.Any, **kwargs: T.Any) -> 'futures.Future[T.Any]':
+        future: 'futures.Future[T.Any]' = futures.Future()
+        try:
+            future.set_result(__fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class BackgroundValidationTests(utils.InteractionTestCase):
+    def make_prompter(self, form_class: T.Type[forms.BaseForm], **attrs: T.Any) -> cliform.django.FormPrompter:
+        attrs.update(form_class=form_class, on_submit=lambda self, data: None)
+        return type('FormPrompter', (cliform.django.FormPrompter,), attrs)()
+
+    def test_rewind(self) -> None:
+        prompter = self.make_prompter(SimpleForm, background_validation=True, validation_executor=ImmediateExecutor())
+        self.assertSequence(
+            prompter,
+            [
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="John Doe"),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john"),
+                utils.ExpectMsg("!! Email: Enter a valid email address."),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john.doe@example.com"),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("=== Summary ==="),
+                utils.ExpectMsg("Name:   John Doe"),
+                utils.ExpectMsg("Email:  john.doe@example.com"),
+            ],
+        )
+
+    def test_next_prompt_first(self) -> None:
+        released = threading.Event()
+
+        class SlowForm(forms.Form):
+            name = forms.CharField(validators=[lambda value: released.wait(5)])
+            email = forms.EmailField()
+
+        prompter = self.make_prompter(SlowForm, background_validation=True)
+        loop = prompter.loop()
+        self.assertEqual(">>> Name?", next(loop))
+        next(loop)
+        # The next prompt is shown while the name is still being validated.
+        self.assertEqual(">>> Email?", loop.send(cliform.interact.Input("John Doe")))
+        released.set()
+        next(loop)
+        self.assertEqual("", loop.send(cliform.interact.Input("john.doe@example.com")))
+        self.assertEqual("=== Summary ===", next(loop))
+        loop.close()
+
+    def test_sync_fields(self) -> None:
+        prompter = self.make_prompter(
+            SimpleForm, background_validation=True, sync_fields=['email'],
+            validation_executor=futures.ThreadPoolExecutor(max_workers=1),
+        )
+        self.assertSequence(
+            prompter,
+            [
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="John Doe"),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john"),
+                utils.ExpectMsg("!! Enter a valid email address."),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john.doe@example.com"),
+                utils.ExpectMsg(""),
+            ],
+        )
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import io
+import json
+import typing as T
+import unittest
+
+from django import forms
+from django import test as django_test
+from django.contrib.auth import models as auth_models
+
+import cliform.batch
+import cliform.formset
+
+from . import utils
+
+
+class ItemForm(forms.Form):
+    name = forms.CharField(label="Name")
+    quantity = forms.IntegerField(label="Quantity")
+
+
+class BaseItemFormSet(forms.BaseFormSet):
+    def clean(self):
+        names = [form.cleaned_data['name'] for form in self.forms]
+        if len(names) != len(set(names)):
+            raise forms.ValidationError("Duplicate item.")
+
+
+ItemFormSet = forms.formset_factory(
+    ItemForm, formset=BaseItemFormSet, min_num=2, validate_min=True, max_num=3, validate_max=True,
+)
+
+
+class ItemsPrompter(cliform.formset.FormsetPrompter):
+    formset_class = ItemFormSet
+    flush_size = 2
+
+    def __init__(self) -> None:
+        self.submitted: T.List[T.List[T.Text]] = []
+
+    def on_submit_rows(self, rows: T.List[cliform.formset.Record]) -> None:
+        self.submitted.append([row['name'] for row in rows])
+
+
+UserFormSet = forms.modelformset_factory(auth_models.User, fields=['username', 'email'], min_num=4, validate_min=True)
+
+
+class UsersPrompter(ItemsPrompter):
+    formset_class = UserFormSet
+
+    def on_submit_rows(self, rows: T.List[cliform.formset.Record]) -> None:
+        self.submitted.append([row['username'] for row in rows])
+
+
+class FormsetPrompterTests(utils.InteractionTestCase):
+    def test_rows(self) -> None:
+        prompter = ItemsPrompter()
+        self.assertSequence(
+            prompter,
+            [
+                utils.ExpectMsg("Row 1"),
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="Pen"),
+                utils.ExpectMsg(">>> Quantity?"),
+                utils.ExpectQuery(reply="2"),
+                utils.ExpectMsg(">>> Add another row? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply="n"),
+                utils.ExpectMsg("!! Please submit at least 2 forms."),
+                utils.ExpectMsg("Row 2"),
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="Pen"),
+                utils.ExpectMsg(">>> Quantity?"),
+                utils.ExpectQuery(reply="many"),
+                utils.ExpectMsg("!! Enter a whole number."),
+                utils.ExpectMsg(">>> Quantity?"),
+                utils.ExpectQuery(reply="1"),
+                # The formset's clean() rejects the row
+                utils.ExpectMsg("!! Duplicate item."),
+                utils.ExpectMsg(">>> Add another row? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=""),
+                utils.ExpectMsg("Row 2"),
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="Ink"),
+                utils.ExpectMsg(">>> Quantity?"),
+                utils.ExpectQuery(reply="3"),
+                utils.ExpectMsg(">>> Add another row? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=""),
+                utils.ExpectMsg("Row 3"),
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="Pad"),
+                utils.ExpectMsg(">>> Quantity?"),
+                utils.ExpectQuery(reply="1"),
+                # max_num reached
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("3 rows of `ItemForm` have been submitted."),
+            ],
+        )
+        self.assertEqual([['Pen', 'Ink'], ['Pad']], prompter.submitted)
+
+
+def run_batch(
+        prompter: cliform.formset.FormsetPrompter, lines: T.Iterable[T.Text],
+        **kwargs: T.Any) -> T.Tuple[int, T.List[T.Any]]:
+    runner = cliform.batch.BatchRunner(prompter, **kwargs)
+    stdout = io.StringIO()
+    failures = runner.run(io.StringIO(''.join(line + '\n' for line in lines)), stdout)
+    return failures, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+class FormsetBatchTests(unittest.TestCase):
+    def test_chunks(self) -> None:
+        prompter = ItemsPrompter()
+        failures, results = run_batch(prompter, [
+            '{"name": "Pen", "quantity": 1}',
+            '{"name": "Pen", "quantity": 2}',
+            '{"name": "Ink", "quantity": 3}',
+            '{"name": "Pad", "quantity": 4}',
+        ], submit=True)
+        self.assertEqual(2, failures)
+        # clean() runs on each chunk of rows
+        self.assertEqual(["Duplicate item."], results[0]['errors'])
+        self.assertEqual(["Duplicate item."], results[1]['errors'])
+        self.assertEqual({'name': "Ink", 'quantity': 3}, results[2]['data'])
+        self.assertEqual([['Ink', 'Pad']], prompter.submitted)
+
+    def test_rejected_chunk(self) -> None:
+        class BaseCheckedFormSet(forms.BaseFormSet):
+            def clean(self):
+                if any(form.cleaned_data['name'] == "bad" for form in self.forms):
+                    raise forms.ValidationError("Bad chunk.")
+
+        class CheckedPrompter(ItemsPrompter):
+            formset_class = forms.formset_factory(
+                ItemForm, formset=BaseCheckedFormSet, max_num=2, validate_max=True,
+            )
+
+        prompter = CheckedPrompter()
+        failures, results = run_batch(prompter, [
+            '{"name": "%s", "quantity": 1}' % name for name in ["x", "bad", "y", "z"]
+        ], submit=True)
+        # Rows of a rejected chunk don't count towards max_num
+        self.assertEqual(2, failures)
+        self.assertEqual(["Bad chunk."], results[0]['errors'])
+        self.assertEqual([['y', 'z']], prompter.submitted)
+
+
+class ModelFormsetBatchTests(django_test.TestCase):
+    def test_unique(self) -> None:
+        prompter = UsersPrompter()
+        failures, results = run_batch(prompter, [
+            '{"username": "john", "email": "john@example.com"}',
+            '{"username": "jane", "email": "jane@example.com"}',
+            '{"username": "john", "email": "john.doe@example.com"}',
+        ], submit=True)
+        self.assertEqual(2, failures)
+        # Duplicates are found across chunks, while only their keys are kept
+        self.assertEqual(["Please correct the duplicate data for username."], results[2]['errors'])
+        self.assertEqual({'line': 0, 'errors': ["Please submit at least 4 forms."]}, results[3])
+        self.assertEqual([['john', 'jane']], prompter.submitted)
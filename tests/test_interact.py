@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import io
+import typing as T
+import unittest
+
+import cliform
+import cliform.interact
+
+from . import utils
+
+
+def make_options(count: int) -> T.List[T.Tuple[cliform.interact.OptionKey, T.Text]]:
+    return [(cliform.interact.OptionKey(i), "Option %05d" % i) for i in range(count)]
+
+
+class ChoiceInputTests(unittest.TestCase):
+    def test_orphans(self) -> None:
+        prompt = cliform.interact.ChoiceInput.from_texts(
+            title="Pick",
+            options=[
+                (cliform.interact.OptionKey(1), "ab"),
+                (cliform.interact.OptionKey(2), "ba"),
+                (cliform.interact.OptionKey(3), "a"),
+                (cliform.interact.OptionKey(4), "b"),
+            ],
+            default_first=True,
+        )
+        self.assertEqual(3, prompt.convert('0'))
+        self.assertEqual(4, prompt.convert('1'))
+        self.assertEqual(1, prompt.convert(''))
+
+
+class ChoiceIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = cliform.interact.ChoiceIndex([
+            (cliform.interact.OptionKey('fr'), "France"),
+            (cliform.interact.OptionKey('fi'), "Finland"),
+            (cliform.interact.OptionKey('gf'), "French Guiana"),
+            (cliform.interact.OptionKey('ie'), "Ireland"),
+        ])
+
+    def test_exact(self) -> None:
+        self.assertEqual(0, self.index.exact("france"))
+        self.assertIsNone(self.index.exact("fran"))
+
+    def test_prefix(self) -> None:
+        self.assertEqual([0, 1, 2], self.index.prefix("F"))
+        self.assertEqual([0, 2], self.index.prefix("fr"))
+        self.assertEqual([], self.index.prefix("z"))
+
+    def test_search(self) -> None:
+        self.assertEqual([1, 3], self.index.search("LAND"))
+        self.assertEqual([0, 2], self.index.search("nc"))
+        self.assertEqual([], self.index.search("d\nf"))
+
+
+class IndexedChoiceInputTests(unittest.TestCase):
+    def setUp(self):
+        self.prompt = cliform.interact.IndexedChoiceInput.from_texts(
+            title="Option", options=make_options(100), default_first=True, page_size=10,
+        )
+        self.prompter = cliform.Prompter()
+
+    def test_default(self) -> None:
+        self.assertEqual(0, self.prompt.convert(''))
+
+    def test_select(self) -> None:
+        self.assertEqual(12, self.prompt.convert('13'))
+        self.assertEqual(42, self.prompt.convert('option 00042'))
+
+    def test_render(self) -> None:
+        self.assertEqual([
+            ">>> Option? (1-10 of 100, default: Option 00000, '>' for more)",
+            "    1. Option 00000",
+            "    2. Option 00001",
+        ], list(self.prompter.expand(self.prompt))[:3])
+
+    def test_pages(self) -> None:
+        last = self.prompt
+        for _i in range(12):
+            last = last.convert('>')
+        self.assertEqual(9, last.page)
+        self.assertEqual([(100, "Option 00099")], list(last.page_items())[-1:])
+        self.assertEqual(8, last.convert('<').page)
+
+    def test_narrow(self) -> None:
+        narrowed = self.prompt.convert('option 0004')
+        self.assertEqual(
+            ">>> Option? (1-10 of 10, matching 'option 0004', default: Option 00000)",
+            next(iter(self.prompter.expand(narrowed))),
+        )
+        self.assertEqual(41, narrowed.convert('2'))
+        self.assertEqual(77, self.prompt.convert('/77'))
+
+    def test_no_match(self) -> None:
+        narrowed = self.prompt.convert('nope')
+        self.assertEqual(100, len(narrowed.candidates))
+        self.assertEqual("!! No option matches 'nope'", next(iter(self.prompter.expand(narrowed))))
+
+    def test_large(self) -> None:
+        prompt = cliform.interact.IndexedChoiceInput.from_texts(title="Option", options=make_options(100000))
+        self.assertEqual(54321, prompt.convert("Option 54321"))
+        self.assertEqual(10, len(prompt.convert("Option 5432").candidates))
+
+
+class RefinedPromptTests(utils.InteractionTestCase):
+    class NumberPrompter(cliform.Prompter):
+        def interact(self) -> cliform.interact.InteractLoop:
+            reply = yield cliform.interact.IndexedChoiceInput.from_texts(
+                title="Number", options=make_options(30), page_size=2,
+            )
+            yield cliform.interact.Info("Picked %s" % reply)
+
+    def test_refine(self) -> None:
+        self.assertSequence(
+            self.NumberPrompter(),
+            [
+                utils.ExpectMsg(">>> Number? (1-2 of 30, '>' for more)"),
+                utils.ExpectMsg("   1. Option 00000"),
+                utils.ExpectMsg("   2. Option 00001"),
+                utils.ExpectQuery(reply="/2"),
+                utils.ExpectMsg(">>> Number? (1-2 of 12, matching '/2', '>' for more)"),
+                utils.ExpectMsg("   1. Option 00002"),
+                utils.ExpectMsg("   2. Option 00012"),
+                utils.ExpectQuery(reply=">"),
+                utils.ExpectMsg(">>> Number? (3-4 of 12, matching '/2', '>' for more)"),
+                utils.ExpectMsg("   3. Option 00020"),
+                utils.ExpectMsg("   4. Option 00021"),
+                utils.ExpectQuery(reply="4"),
+                utils.ExpectMsg("Picked 21"),
+            ],
+        )
+
+
+class CountingStream(io.StringIO):
+    def __init__(self, *args: T.Any, **kwargs: T.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.writes = 0
+
+    def write(self, s: T.Text) -> int:
+        self.writes += 1
+        return super().write(s)
+
+
+class StdioInteracterTests(unittest.TestCase):
+    class SurveyPrompter(cliform.Prompter):
+        def interact(self) -> cliform.interact.InteractLoop:
+            name = yield cliform.interact.TextInput("Name")
+            yield cliform.interact.Summary({"Field %d" % i: name for i in range(20)})
+            yield cliform.interact.BoolInput("Confirm", default=True)
+
+    EXPECTED = (
+        ">>> Name?\n=== Summary ===\n"
+        + ''.join("{:<12}John\n".format("Field %d:" % i) for i in range(20))
+        + ">>> Confirm? ([Y]es/[N]o)\n"
+    )
+
+    def test_unbuffered(self) -> None:
+        stdout = CountingStream()
+        cliform.StdioInteracter(stdin=io.StringIO("John\n\n"), stdout=stdout).run(self.SurveyPrompter())
+        self.assertEqual(self.EXPECTED, stdout.getvalue())
+        # One write per output block
+        self.assertEqual(3, stdout.writes)
+
+    def test_blocks(self) -> None:
+        loop = self.SurveyPrompter().loop(blocks=True)
+        self.assertEqual(cliform.interact.DisplayBlock([">>> Name?"]), next(loop))
+        self.assertIsInstance(next(loop), cliform.interact.Query)
+        summary = loop.send(cliform.interact.Input("John"))
+        assert isinstance(summary, cliform.interact.DisplayBlock)
+        self.assertEqual(21, len(summary))
+
+    def test_buffered(self) -> None:
+        stdout = CountingStream()
+        interacter = cliform.interact.BufferedStdioInteracter(stdin=io.StringIO("John\r\n\n"), stdout=stdout)
+        interacter.run(self.SurveyPrompter())
+        self.assertEqual(self.EXPECTED, stdout.getvalue())
+        self.assertEqual(2, stdout.writes)
+
+    def test_eof(self) -> None:
+        stdout = CountingStream()
+        interacter = cliform.interact.BufferedStdioInteracter(stdin=io.StringIO(""), stdout=stdout)
+        with self.assertRaises(EOFError):
+            interacter.run(self.SurveyPrompter())
+        self.assertEqual(">>> Name?\n", stdout.getvalue())
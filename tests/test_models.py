@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import typing as T
+
+from django import forms
+from django import test as django_test
+from django.contrib.auth import models as auth_models
+
+import cliform
+import cliform.django
+import cliform.interact
+
+from . import utils
+
+
+class GroupForm(forms.Form):
+    group = forms.ModelChoiceField(queryset=auth_models.Group.objects.all(), to_field_name='name')
+    extra_groups = forms.ModelMultipleChoiceField(queryset=auth_models.Group.objects.all(), required=False)
+
+
+class QuerysetChoiceInputTests(django_test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        auth_models.Group.objects.bulk_create([auth_models.Group(name="Group %03d" % i) for i in range(50)])
+        cls.groups = list(auth_models.Group.objects.order_by('pk'))
+
+    def setUp(self):
+        self.form = GroupForm()
+        self.prompt = cliform.django.QuerysetChoiceInput(
+            title="Group", field=self.form.fields['group'], default_first=True, page_size=20,
+        )
+        self.prompter = cliform.Prompter()
+
+    def test_lazy(self) -> None:
+        with self.assertNumQueries(0):
+            cliform.django.FormPrompter()._input_for_field("Group", self.form.fields['group'])
+        with self.assertNumQueries(1):
+            lines = list(self.prompter.expand(self.prompt))
+        self.assertEqual(">>> Group? (1-20, default: Group 000, '>' for more)", lines[0])
+        self.assertEqual(["   1. Group 000", "  20. Group 019"], [lines[1], lines[-1]])
+
+    def test_pages(self) -> None:
+        last = self.prompt.convert('>').convert('>')
+        self.assertEqual(">>> Group? (41-50)", next(iter(self.prompter.expand(last))))
+        self.assertEqual("Group 045", last.convert('46'))
+        self.assertEqual("No more options", last.convert('>').notice)
+        self.assertEqual([(21, "Group 020")], last.convert('<').page_items()[:1])
+
+    def test_select(self) -> None:
+        self.assertEqual("Group 000", self.prompt.convert(''))
+        self.assertEqual("Group 002", self.prompt.convert('3'))
+        with self.assertNumQueries(1):
+            self.assertEqual("Group 042", self.prompt.convert('Group 042'))
+        self.assertEqual("No option matches 'nope'", self.prompt.convert('nope').notice)
+
+    def test_search(self) -> None:
+        prompt = cliform.django.QuerysetChoiceInput(
+            title="Group", field=self.form.fields['group'], search_lookup='name',
+        )
+        narrowed = prompt.convert('group 01')
+        self.assertEqual(">>> Group? (1-10, matching 'group 01')", next(iter(self.prompter.expand(narrowed))))
+        self.assertEqual("Group 013", narrowed.convert('4'))
+        self.assertEqual("Group 049", prompt.convert('group 049'))
+
+    def test_multiple(self) -> None:
+        prompt = cliform.django.QuerysetChoiceInput(
+            title="Groups", field=self.form.fields['extra_groups'], multiple=True,
+        )
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                [self.groups[1].pk, self.groups[30].pk],
+                prompt.convert('2, =%d' % self.groups[30].pk),
+            )
+        self.assertEqual([], prompt.convert(''))
+
+
+class GroupFormTests(django_test.TestCase, utils.InteractionTestCase):
+    def setUp(self):
+        auth_models.Group.objects.create(name="Admins")
+        auth_models.Group.objects.create(name="Staff")
+
+        class FormPrompter(cliform.django.FormPrompter):
+            form_class = GroupForm
+            data = None
+
+            def on_submit(self, data):
+                self.data = data
+
+        self.prompter = FormPrompter()
+
+    def test_nominal(self) -> None:
+        self.assertSequence(
+            self.prompter,
+            [
+                utils.ExpectMsg(">>> Group? (1-2, default: Admins)"),
+                utils.ExpectMsg("  1. Admins"),
+                utils.ExpectMsg("  2. Staff"),
+                utils.ExpectQuery(reply="2"),
+                utils.ExpectMsg(">>> Extra groups? (1-2)"),
+                utils.ExpectMsg("  1. Admins"),
+                utils.ExpectMsg("  2. Staff"),
+                utils.ExpectQuery(reply="1,2"),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("=== Summary ==="),
+                utils.ExpectMsg("Group:          Staff"),
+                utils.ExpectRe(r"Extra groups:   <QuerySet \[<Group: Admins>, <Group: Staff>\]>"),
+                utils.ExpectMsg(">>> Confirm? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=''),
+                utils.ExpectMsg(""),
+            ],
+        )
+
+    def test_key_reply(self) -> None:
+        loop = self.prompter.loop()
+        self.assertEqual(">>> Group? (1-2, default: Admins)", next(loop))
+        while not isinstance(next(loop), cliform.interact.Query):
+            pass
+        # A single lookup for the key; the row isn't fetched again to clean it.
+        # Then the first page of the next field.
+        with self.assertNumQueries(2):
+            self.assertEqual(">>> Extra groups? (1-2)", loop.send(cliform.interact.Input("=Staff")))
+        loop.close()
+
+    def test_new_rows(self) -> None:
+        first: T.List[utils.Expect] = [
+            utils.ExpectMsg(">>> Group? (1-2, default: Admins)"),
+            utils.ExpectMsg("  1. Admins"),
+            utils.ExpectMsg("  2. Staff"),
+            utils.ExpectQuery(reply="2"),
+            utils.ExpectMsg(">>> Extra groups? (1-2)"),
+        ]
+        self.assertSequence(self.prompter, first)
+        auth_models.Group.objects.create(name="Users")
+        # The plan is shared by both sessions, but not the rows
+        self.assertSequence(type(self.prompter)(), [
+            utils.ExpectMsg(">>> Group? (1-3, default: Admins)"),
+            utils.ExpectMsg("  1. Admins"),
+            utils.ExpectMsg("  2. Staff"),
+            utils.ExpectMsg("  3. Users"),
+            utils.ExpectQuery(reply="2"),
+            utils.ExpectMsg(">>> Extra groups? (1-3)"),
+        ])
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import json
+import typing as T
+
+from django import forms
+from django import test as django_test
+from django.contrib.auth import models as auth_models
+from django.contrib.contenttypes import models as contenttypes_models
+
+import cliform.batch
+
+
+class PermissionForm(forms.ModelForm):
+    class Meta:
+        model = auth_models.Permission
+        fields = ['name', 'content_type', 'codename']
+
+
+class UserForm(forms.ModelForm):
+    group = forms.ModelChoiceField(queryset=auth_models.Group.objects.all(), to_field_name='name', required=False)
+
+    class Meta:
+        model = auth_models.User
+        fields = ['username', 'email']
+
+
+class PrefetchTests(django_test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.content_type = contenttypes_models.ContentType.objects.get_for_model(auth_models.Group)
+        auth_models.Group.objects.create(name="Admins")
+        auth_models.User.objects.create(username="john")
+
+    def compare(
+            self, form_class: T.Type[forms.BaseForm],
+            records: T.Sequence[T.Mapping[T.Text, T.Any]]) -> T.List[cliform.batch.Result]:
+        lines = [(lineno, json.dumps(record)) for lineno, record in enumerate(records, start=1)]
+        expected = cliform.batch.Validator(form_class).chunk(lines)
+        with self.assertNumQueries(2):
+            results = cliform.batch.Validator(form_class, prefetch=True).chunk(lines)
+        self.assertEqual([result.as_dict() for result in expected], [result.as_dict() for result in results])
+        with self.assertNumQueries(2):
+            columnar = cliform.batch.Validator(form_class, prefetch=True, columnar=True).chunk(lines)
+        self.assertEqual([result.as_dict() for result in expected], [result.as_dict() for result in columnar])
+        return results
+
+    def test_foreign_key(self) -> None:
+        results = self.compare(PermissionForm, [
+            {'name': "Can fly", 'content_type': self.content_type.pk, 'codename': 'fly_group'},
+            {'name': "Can swim", 'content_type': str(self.content_type.pk), 'codename': 'swim_group'},
+            {'name': "Can walk", 'content_type': 999999, 'codename': 'walk_group'},
+            {'name': "Can run", 'content_type': 'abc', 'codename': 'run_group'},
+            {'name': "Can sit", 'codename': 'sit_group'},
+            # Conflicts with a built-in permission, on (content_type, codename)
+            {'name': "Can add", 'content_type': self.content_type.pk, 'codename': 'add_group'},
+        ])
+        assert results[1].data is not None
+        self.assertEqual(self.content_type, results[1].data['content_type'])
+        self.assertEqual(
+            ["content_type: Select a valid choice. That choice is not one of the available choices."],
+            results[2].errors,
+        )
+        self.assertEqual(
+            ["__all__: Permission with this Content type and Codename already exists."],
+            results[5].errors,
+        )
+
+    def test_unique(self) -> None:
+        results = self.compare(UserForm, [
+            {'username': "jane", 'group': "Admins"},
+            {'username': "john", 'group': "Staff"},
+            {'username': "jim", 'group': ""},
+            {'username': "", 'email': "nope"},
+        ])
+        self.assertTrue(results[0].valid)
+        self.assertEqual(2, len(results[1].errors))
+        self.assertTrue(results[2].valid)
+
+    def test_runner(self) -> None:
+        lines = ''.join('{"username": "user%d", "group": "Admins"}\n' % i for i in range(10))
+        runner = cliform.batch.BatchRunner(
+            type('Prompter', (cliform.django.FormPrompter,), {'form_class': UserForm})(),
+            prefetch=True, chunk_size=4,
+        )
+        # Two queries per chunk
+        with self.assertNumQueries(2 * 3):
+            results = list(runner.results(lines.splitlines()))
+        self.assertEqual([True] * 10, [result.valid for result in results])
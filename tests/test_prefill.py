@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import argparse
+import json
+import os
+import tempfile
+import typing as T
+import unittest
+
+import cliform.django
+import cliform.prefill
+
+from . import utils
+from .test_django import ComplexForm
+from .test_tabular import SizeFormPrompter
+
+
+class ComplexFormPrompter(cliform.django.FormPrompter):
+    form_class = ComplexForm
+    data: T.Mapping[T.Text, T.Any] = {}
+
+    def on_submit(self, data):
+        self.data = data
+
+
+class PrefillTests(unittest.TestCase):
+    def setUp(self):
+        self.prompter = ComplexFormPrompter()
+        self.parser = argparse.ArgumentParser()
+        cliform.prefill.add_arguments(self.parser, self.prompter)
+
+    def test_arguments(self) -> None:
+        args = self.parser.parse_args(['--name', 'John', '--is-staff', '--no-is-superuser', '--profile', 'Full-Time'])
+        self.assertEqual(
+            {'name': 'John', 'is_staff': True, 'is_superuser': False, 'profile': 'fulltime'},
+            cliform.prefill.from_namespace(self.prompter, args),
+        )
+        self.assertEqual({}, cliform.prefill.from_namespace(self.prompter, self.parser.parse_args([])))
+
+    def test_environ(self) -> None:
+        self.assertEqual(
+            {'email': 'john@example.com', 'profile': 'intern'},
+            cliform.prefill.from_environ(self.prompter, 'app_', {
+                'APP_EMAIL': 'john@example.com', 'APP_PROFILE': 'i', 'EMAIL': 'jane@example.com',
+            }),
+        )
+
+    def test_environ_labels(self) -> None:
+        self.assertEqual(
+            {'size': 'xsmall'}, cliform.prefill.from_environ(SizeFormPrompter(), 'app_', {'APP_SIZE': 'SS'}),
+        )
+
+    def test_precedence(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            json_path = os.path.join(tmpdir, 'user.json')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({'name': "Jane", 'email': "jane@example.com", 'is_staff': True, 'unknown': 1}, f)
+            toml_path = os.path.join(tmpdir, 'user.toml')
+            with open(toml_path, 'w', encoding='utf-8') as f:
+                f.write('email = "john@example.com"\nprofile = "Contractor"\n')
+            values = cliform.prefill.collect(
+                self.prompter, self.parser.parse_args(['--name', 'John']),
+                env_prefix='APP_', environ={'APP_PROFILE': 'intern'}, files=[json_path, toml_path],
+            )
+        self.assertEqual(
+            {'name': "John", 'email': "john@example.com", 'is_staff': True, 'profile': 'intern'},
+            values,
+        )
+
+
+class PrefilledPrompterTests(utils.InteractionTestCase):
+    def test_missing_and_invalid(self) -> None:
+        prompter = ComplexFormPrompter()
+        prompter.prefilled = {'name': "John", 'email': "john", 'is_staff': True, 'profile': 'fulltime'}
+        self.assertSequence(
+            prompter,
+            [
+                utils.ExpectMsg("!! Email: Enter a valid email address."),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john@example.com"),
+                utils.ExpectMsg(">>> Is superuser? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=""),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("=== Summary ==="),
+                utils.ExpectMsg("Name:           John"),
+                utils.ExpectMsg("Email:          john@example.com"),
+                utils.ExpectMsg("Is Staff:       True"),
+                utils.ExpectMsg("Is superuser:   False"),
+                utils.ExpectMsg("Profile:        fulltime"),
+                utils.ExpectMsg(">>> Confirm? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=''),
+                utils.ExpectMsg(""),
+            ],
+        )
+        self.assertEqual("john@example.com", prompter.data['email'])
+
+    def test_no_prompt(self) -> None:
+        prompter = ComplexFormPrompter()
+        prompter.prefilled = {
+            'name': "John", 'email': "john@example.com", 'is_staff': True, 'is_superuser': False, 'profile': '',
+        }
+        prompter.confirm_prefilled = False
+        loop = prompter.loop()
+        lines = list(loop)
+        self.assertNotIn(">>> Confirm? ([Y]es/[N]o)", lines)
+        self.assertEqual("`ComplexForm` has been submitted:", lines[-2])
+        self.assertEqual('', prompter.data['profile'])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import io
+import itertools
+import json
+import unittest
+
+import cliform.batch
+import cliform.django
+import cliform.report
+
+from .test_batch import SimpleFormPrompter
+
+
+class ErrorReportTests(unittest.TestCase):
+    def test_batch(self) -> None:
+        lines = ['{"name": "John Doe", "email": "john.doe@example.com"}'] + [
+            '{"name": "User %d", "email": "user%d"}' % (i, i) for i in range(7)
+        ] + ['{"name":', '{"email": "x@example.com",']
+        stderr = io.StringIO()
+        sidecar = io.StringIO()
+        report = cliform.report.ErrorReport(stream=stderr, sidecar=sidecar, top=2, examples=3)
+        stdout = io.StringIO()
+        failures = cliform.batch.BatchRunner(SimpleFormPrompter()).run(
+            io.StringIO(''.join(line + '\n' for line in lines)), stdout, report=report,
+        )
+        self.assertEqual(9, failures)
+        # Only valid records go to stdout
+        self.assertEqual([1], [json.loads(line)['line'] for line in stdout.getvalue().splitlines()])
+        self.assertEqual([
+            "=== 9 errors in 9 of 10 records ===",
+            "       7  email: Enter a valid email address. [invalid] (lines 2, 3, 4)",
+            # Messages differ, but share their template
+            "       2  Invalid JSON: Expecting value: line 1 column 9 (char 8) [invalid_json] (lines 9, 10)",
+        ], stderr.getvalue().splitlines())
+
+        errors = [json.loads(line) for line in sidecar.getvalue().splitlines()]
+        self.assertEqual(list(range(2, 11)), [error['line'] for error in errors])
+        self.assertEqual(
+            [{'field': 'email', 'code': 'invalid', 'message': "Enter a valid email address."}], errors[0]['errors'],
+        )
+
+    def test_incremental(self) -> None:
+        stderr = io.StringIO()
+        clock = itertools.count()
+        report = cliform.report.ErrorReport(stream=stderr, interval=3, clock=lambda: next(clock))
+        detail = cliform.django.ErrorDetail(field='email', code='invalid', template="Invalid", message="Invalid")
+        for line in range(1, 5):
+            report.add(line, [detail])
+        # Written after 3 seconds, before the end of the batch
+        self.assertEqual([
+            "=== 3 errors in 3 of 3 records ===",
+            "       3  email: Invalid [invalid] (lines 1, 2, 3)",
+        ], stderr.getvalue().splitlines())
+
+    def test_bounded(self) -> None:
+        report = cliform.report.ErrorReport(max_groups=4, top=3)
+        frequent = cliform.django.ErrorDetail(field=None, code=None, template="Frequent", message="Frequent")
+        for line in range(1, 21):
+            rare = cliform.django.ErrorDetail(field=None, code=None, template="Rare %d" % line, message="Rare")
+            report.add(line, [frequent, rare])
+        self.assertLessEqual(len(report.groups), 4)
+        self.assertEqual(40, report.errors)
+        summary = report.summary()
+        self.assertEqual("      20  Frequent (lines 1, 2, 3, 4, 5)", summary[1])
+        self.assertEqual("       1  Rare (lines 1)", summary[2])
+        # Groups created after dropping others may have missed earlier errors
+        self.assertTrue(summary[3].startswith("     >=1  Rare (lines "))
+        self.assertEqual("      18  other errors", summary[-1])
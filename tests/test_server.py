@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import asyncio
+import os
+import tempfile
+import typing as T
+import unittest
+
+import cliform.server
+
+from .test_aio import NaivePrompter
+
+
+class FormServerTests(unittest.TestCase):
+    def run_server(
+            self, scenario: T.Callable[[cliform.server.FormServer, int], T.Awaitable[T.Any]],
+            **kwargs: T.Any) -> T.Any:
+        server = cliform.server.FormServer(NaivePrompter, **kwargs)
+
+        async def main() -> T.Any:
+            tcp_server = await server.start_tcp('127.0.0.1', 0)
+            port = tcp_server.sockets[0].getsockname()[1]
+            try:
+                return await scenario(server, port)
+            finally:
+                await server.drain(timeout=1)
+
+        return asyncio.run(main())
+
+    async def session(self, port: int, replies: T.Iterable[T.Text], wait: float = 0) -> T.Text:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await asyncio.sleep(wait)
+        for reply in replies:
+            writer.write(reply.encode() + b'\n')
+        output = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return output.decode()
+
+    def test_sessions(self) -> None:
+        async def scenario(server, port):
+            return await asyncio.gather(*[self.session(port, ["User %d" % i]) for i in range(50)])
+
+        outputs = self.run_server(scenario)
+        self.assertEqual("Hello\n>>> Enter your name?\nWelcome, User 42\n", outputs[42])
+
+    def test_max_sessions(self) -> None:
+        async def scenario(server, port):
+            first = asyncio.ensure_future(self.session(port, ["Alice"], wait=0.2))
+            await asyncio.sleep(0.05)
+            second = await self.session(port, ["Bob"])
+            return await first, second
+
+        first, second = self.run_server(scenario, max_sessions=1)
+        self.assertEqual("Hello\n>>> Enter your name?\nWelcome, Alice\n", first)
+        self.assertEqual("!! Too many sessions, please try again later\n", second)
+
+    def test_idle_timeout(self) -> None:
+        async def scenario(server, port):
+            return await self.session(port, [], wait=0)
+
+        output = self.run_server(scenario, idle_timeout=0.05)
+        self.assertEqual("Hello\n>>> Enter your name?\n!! Session timed out\n", output)
+
+    def test_drain(self) -> None:
+        async def scenario(server, port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await reader.readline()
+            await server.drain(timeout=0.05)
+            self.assertEqual(set(), server.sessions)
+            writer.close()
+            await writer.wait_closed()
+            return await reader.read()
+
+        self.assertEqual(b">>> Enter your name?\n", self.run_server(scenario))
+
+    @unittest.skipUnless(hasattr(asyncio, 'start_unix_server'), "Unix sockets are not available")
+    def test_unix(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'cliform.sock')
+            server = cliform.server.FormServer(NaivePrompter)
+
+            async def main() -> bytes:
+                await server.start_unix(path)
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.write(b"John Doe\n")
+                output = await reader.read()
+                writer.close()
+                await writer.wait_closed()
+                await server.drain()
+                return output
+
+            self.assertEqual(b"Hello\n>>> Enter your name?\nWelcome, John Doe\n", asyncio.run(main()))
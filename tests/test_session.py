@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import threading
+import typing as T
+import unittest
+
+from django.core import signing
+
+import cliform.django
+import cliform.session
+
+from . import utils
+from .test_django import (ComplexForm, CountingCharField, PasswordForm,
+                          SimpleForm)
+
+
+class PasswordFormPrompter(cliform.django.FormPrompter):
+    form_class = PasswordForm
+    submitted: T.List[T.Mapping[T.Text, T.Any]] = []
+
+    def on_submit(self, data):
+        self.submitted.append(data)
+
+
+class ComplexFormPrompter(PasswordFormPrompter):
+    form_class = ComplexForm
+
+
+class SimpleFormPrompter(PasswordFormPrompter):
+    form_class = SimpleForm
+
+
+class SessionStateTests(unittest.TestCase):
+    def test_roundtrip(self) -> None:
+        state = cliform.session.SessionState(
+            version='abc', answers={'name': ("John", "John"), 'lock': ("x", threading.Lock())},
+            current='email',
+        )
+        loaded = cliform.session.SessionState.loads(state.dumps())
+        self.assertEqual({'name': ("John", "John")}, loaded.answers)
+        # Unpicklable cleaned values are validated again
+        self.assertEqual({'lock': "x"}, loaded.unchecked)
+        self.assertEqual('email', loaded.current)
+
+    def test_tampered(self) -> None:
+        text = cliform.session.SessionState(version='abc').dumps()
+        with self.assertRaises(signing.BadSignature):
+            cliform.session.SessionState.loads(text[:-2] + 'xx')
+
+
+class StepTests(unittest.TestCase):
+    def setUp(self):
+        CountingCharField.calls = 0
+        PasswordFormPrompter.submitted = []
+
+    def test_stateless(self) -> None:
+        lines, state = cliform.session.step(PasswordFormPrompter(), None)
+        self.assertEqual([">>> Username?"], lines)
+        for reply, expected in [
+            ("John", [">>> Password?"]),
+            ("secret", [">>> Confirm?"]),
+            ("typo", ["!! Confirm: Passwords don't match.", ">>> Confirm?"]),
+            ("secret", [
+                "", "=== Summary ===",
+                "Username:   john", "Password:   secret", "Confirm:    secret", "Team:       ops",
+                ">>> Confirm? ([Y]es/[N]o)",
+            ]),
+        ]:
+            # A fresh prompter at each step
+            lines, state = cliform.session.step(PasswordFormPrompter(), state, reply)
+            self.assertEqual(expected, lines)
+            self.assertIsNotNone(state)
+
+        lines, state = cliform.session.step(PasswordFormPrompter(), state, "y")
+        self.assertIsNone(state)
+        self.assertEqual("`PasswordForm` has been submitted:", lines[1])
+        self.assertEqual('john', PasswordFormPrompter.submitted[0]['username'])
+        # The username was validated once, when given.
+        self.assertEqual(1, CountingCharField.calls)
+
+    def test_invalid_reply(self) -> None:
+        _lines, state = cliform.session.step(ComplexFormPrompter(), None)
+        _lines, state = cliform.session.step(ComplexFormPrompter(), state, "John")
+        lines, state = cliform.session.step(ComplexFormPrompter(), state, "john")
+        self.assertEqual(["!! Enter a valid email address.", ">>> Email?"], lines)
+        assert state is not None
+        self.assertEqual('email', cliform.session.SessionState.loads(state).current)
+
+    def test_other_version(self) -> None:
+        _lines, state = cliform.session.step(PasswordFormPrompter(), None)
+        _lines, state = cliform.session.step(PasswordFormPrompter(), state, "John")
+        assert state is not None
+        loaded = cliform.session.SessionState.loads(state)
+        loaded.version = 'outdated'
+        lines, _state = cliform.session.step(PasswordFormPrompter(), loaded.dumps())
+        self.assertEqual([">>> Password?"], lines)
+        # Validated again, as the form may have changed
+        self.assertEqual(2, CountingCharField.calls)
+
+    def test_declined(self) -> None:
+        class QuickPrompter(PasswordFormPrompter):
+            confirm_prefilled = False
+
+        _lines, state = cliform.session.step(QuickPrompter(), None)
+        for reply in ["John", "secret", "secret"]:
+            lines, state = cliform.session.step(QuickPrompter(), state, reply)
+        self.assertEqual(">>> Confirm? ([Y]es/[N]o)", lines[-1])
+        # All answers are restored, yet the user was prompted: the confirmation is asked again.
+        lines, state = cliform.session.step(QuickPrompter(), state, "n")
+        self.assertIsNone(state)
+        self.assertEqual(["!! Aborting"], lines)
+        self.assertEqual([], PasswordFormPrompter.submitted)
+
+    def test_lazy_version(self) -> None:
+        prompter = PasswordFormPrompter()
+        prompter.cache_plan = False
+        loop = prompter.loop()
+        self.assertEqual(">>> Username?", next(loop))
+        loop.close()
+        # The version is only computed when the state is saved
+        assert prompter.state is not None
+        self.assertIsNone(prompter.state.version)
+        state = cliform.session.SessionState.loads(prompter.dump_state())
+        self.assertEqual(prompter.form_version(), state.version)
+
+
+class RerunTests(utils.InteractionTestCase):
+    def test_rerun(self) -> None:
+        PasswordFormPrompter.submitted = []
+        prompter = SimpleFormPrompter()
+        for name in ["alice", "bob"]:
+            # The answers of the previous session aren't reused
+            self.assertSequence(prompter, [
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply=name),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="%s@example.com" % name),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("=== Summary ==="),
+                utils.ExpectMsg("Name:   %s" % name),
+                utils.ExpectMsg("Email:  %s@example.com" % name),
+                utils.ExpectMsg(">>> Confirm? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=''),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("`SimpleForm` has been submitted:"),
+                utils.ExpectRe(r'  {.*}'),
+            ])
+        self.assertEqual(["alice", "bob"], [data['name'] for data in SimpleFormPrompter.submitted])
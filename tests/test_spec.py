@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import os
+import tempfile
+import unittest
+
+from django import forms
+
+import cliform.django
+import cliform.spec
+
+from . import utils
+from .test_django import ComplexForm, SimpleForm
+
+
+class ComplexFormPrompter(cliform.django.FormPrompter):
+    form_class = ComplexForm
+    data = None
+
+    def on_submit(self, data):
+        self.data = data
+
+
+class CountryForm(forms.Form):
+    country = forms.ChoiceField(choices=[('c%02d' % i, "Country %02d" % i) for i in range(40)])
+
+
+class CountryFormPrompter(ComplexFormPrompter):
+    form_class = CountryForm
+
+
+class SimpleFormPrompter(ComplexFormPrompter):
+    form_class = SimpleForm
+
+
+class DeferredSpecPrompter(cliform.spec.SpecPrompter):
+    """Load the FormPrompter only when it can't be avoided: at the end of the session."""
+
+    def _start(self):
+        pass
+
+    @property
+    def prompter(self):
+        if not self.ready:
+            self._load()
+        return super().prompter
+
+
+class FormSpecTests(unittest.TestCase):
+    def test_roundtrip(self) -> None:
+        spec = cliform.spec.export_spec(ComplexFormPrompter)
+        self.assertEqual('tests.test_spec:ComplexFormPrompter', spec.prompter)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'form.spec.json')
+            spec.save(path)
+            loaded = cliform.spec.FormSpec.load(path)
+        self.assertEqual(spec, loaded)
+        self.assertEqual(spec.version, loaded.version)
+
+    def test_version(self) -> None:
+        self.assertNotEqual(
+            cliform.spec.export_spec(ComplexFormPrompter).version,
+            cliform.spec.export_spec(SimpleFormPrompter).version,
+        )
+
+    def test_same_prompts(self) -> None:
+        for prompter_class in [ComplexFormPrompter, CountryFormPrompter]:
+            prompter = prompter_class()
+            plan = prompter.compile_plan()
+            spec = cliform.spec.export_spec(prompter_class)
+            for field_spec in spec.fields:
+                prompt = cliform.spec.prompt_from_spec(field_spec.label, field_spec.prompt)
+                compiled = plan.fields[field_spec.name].prompt
+                assert compiled is not None and prompt is not None
+                self.assertEqual(
+                    list(prompter.expand(compiled)),
+                    list(prompter.expand(prompt)),
+                )
+
+    def test_bad_format(self) -> None:
+        with self.assertRaises(ValueError):
+            cliform.spec.FormSpec.loads('{"format": 0, "prompter": "x:Y", "fields": []}')
+
+
+class SpecPrompterTests(utils.InteractionTestCase):
+    def test_nominal(self) -> None:
+        prompter = cliform.spec.SpecPrompter(cliform.spec.export_spec(ComplexFormPrompter))
+        self.assertSequence(
+            prompter,
+            [
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="John Doe"),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john.doe@example.com"),
+                utils.ExpectMsg(">>> Is Staff? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=""),
+                utils.ExpectMsg(">>> Is superuser? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=""),
+                utils.ExpectMsg(">>> Profile? ([I]ntern/[F]ull-Time/[C]ontractor)"),
+                utils.ExpectQuery(reply='f'),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("=== Summary ==="),
+            ],
+        )
+
+    def test_deferred_validation(self) -> None:
+        prompter = DeferredSpecPrompter(cliform.spec.export_spec(ComplexFormPrompter), warm=False)
+        self.assertSequence(
+            prompter,
+            [
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="John Doe"),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john"),
+                utils.ExpectMsg(">>> Is Staff? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=""),
+                utils.ExpectMsg(">>> Is superuser? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=""),
+                utils.ExpectMsg(">>> Profile? ([I]ntern/[F]ull-Time/[C]ontractor)"),
+                utils.ExpectQuery(reply='f'),
+                utils.ExpectMsg("!! Email: Enter a valid email address."),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john.doe@example.com"),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("=== Summary ==="),
+                utils.ExpectMsg("Name:           John Doe"),
+                utils.ExpectMsg("Email:          john.doe@example.com"),
+                utils.ExpectMsg("Is Staff:       True"),
+                utils.ExpectMsg("Is superuser:   False"),
+                utils.ExpectMsg("Profile:        fulltime"),
+                utils.ExpectMsg(">>> Confirm? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=''),
+                utils.ExpectMsg(""),
+            ],
+        )
+        self.assertEqual('fulltime', prompter.prompter.data['profile'])
+
+    def test_stale_spec(self) -> None:
+        spec = cliform.spec.export_spec(SimpleFormPrompter)
+        # Exported before `email` was added, and `nickname` removed
+        spec.fields = [
+            spec.fields[0], cliform.spec.FieldSpec(name='nickname', label="Nickname", prompt={'type': 'text'}),
+        ]
+        prompter = DeferredSpecPrompter(spec, warm=False)
+        self.assertSequence(
+            prompter,
+            [
+                utils.ExpectMsg(">>> Name?"),
+                utils.ExpectQuery(reply="John Doe"),
+                utils.ExpectMsg(">>> Nickname?"),
+                utils.ExpectQuery(reply="Johnny"),
+                utils.ExpectMsg(">>> Email?"),
+                utils.ExpectQuery(reply="john.doe@example.com"),
+                utils.ExpectMsg(""),
+                utils.ExpectMsg("=== Summary ==="),
+                utils.ExpectMsg("Name:   John Doe"),
+                utils.ExpectMsg("Email:  john.doe@example.com"),
+                utils.ExpectMsg(">>> Confirm? ([Y]es/[N]o)"),
+                utils.ExpectQuery(reply=''),
+                utils.ExpectMsg(""),
+            ],
+        )
+        self.assertEqual({'name': "John Doe", 'email': "john.doe@example.com"}, prompter.prompter.data)
+
+    def test_indexed_choices(self) -> None:
+        prompter = cliform.spec.SpecPrompter(cliform.spec.export_spec(CountryFormPrompter))
+        loop = prompter.loop()
+        lines = [next(loop)]
+        while not isinstance(lines[-1], cliform.interact.Query):
+            lines.append(next(loop))
+        self.assertEqual("   1. Country 00", lines[1])
+        self.assertEqual("", loop.send(cliform.interact.Input("Country 07")))
+        self.assertEqual("=== Summary ===", next(loop))
+        self.assertEqual("Country:c07", next(loop))
+        loop.close()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import io
+import typing as T
+import unittest
+
+from django import forms
+
+import cliform.batch
+import cliform.tabular
+
+from .test_batch import SimpleFormPrompter
+from .test_django import ComplexForm
+
+
+class ComplexFormPrompter(SimpleFormPrompter):
+    form_class = ComplexForm
+
+
+class SizeForm(forms.Form):
+    size = forms.ChoiceField(choices=[('small', "S"), ('xsmall', "SS"), ('medium', "M")])
+
+
+class SizeFormPrompter(SimpleFormPrompter):
+    form_class = SizeForm
+
+
+class TabularReaderTests(unittest.TestCase):
+    def records(self, text: T.Text, **kwargs: T.Any) -> T.List[T.Tuple[int, T.Any]]:
+        reader = cliform.tabular.TabularReader(ComplexFormPrompter(), **kwargs)
+        return list(reader.records(io.StringIO(text, newline='')))
+
+    def test_header(self) -> None:
+        records = self.records(
+            'Name,EMAIL,Is Staff,is_superuser,Profile\r\n'
+            'John,john@example.com,Yes,n,Full-Time\r\n'
+            '\r\n'
+            '"Jane\r\nDoe",jane@example.com,no,True,c\r\n'
+            'Jim,,yes,,intern\r\n'
+        )
+        self.assertEqual([
+            (2, {'name': "John", 'email': "john@example.com", 'is_staff': True, 'is_superuser': False,
+                 'profile': 'fulltime'}),
+            (4, {'name': "Jane\r\nDoe", 'email': "jane@example.com", 'is_staff': False, 'is_superuser': 'True',
+                 'profile': 'contractor'}),
+            (6, {'name': "Jim", 'is_staff': True, 'profile': 'intern'}),
+        ], records)
+
+    def test_mapping(self) -> None:
+        records = self.records(
+            'Full name\tMail\tNotes\n'
+            'John\tjohn@example.com\tnothing\n',
+            mapping={'Full name': 'name', 'Mail': 'email', 'Notes': None}, dialect='excel-tab',
+        )
+        self.assertEqual([(2, {'name': "John", 'email': "john@example.com"})], records)
+
+    def test_no_header(self) -> None:
+        records = self.records('john@example.com;John\n', mapping={0: 'email', 1: 'name'}, header=False, delimiter=';')
+        self.assertEqual([(1, {'name': "John", 'email': "john@example.com"})], records)
+
+    def test_numeric_shortcuts(self) -> None:
+        reader = cliform.tabular.TabularReader(SizeFormPrompter())
+        records = list(reader.records(io.StringIO('Size\nSS\ns\n0\n', newline='')))
+        # "SS" has no letter shortcut left: its option shows as "0S", while its label stays "SS"
+        self.assertEqual(['xsmall', 'small', 'xsmall'], [record['size'] for _lineno, record in records])
+
+    def test_errors(self) -> None:
+        with self.assertRaises(ValueError):
+            self.records('Name,Nickname\n')
+        with self.assertRaises(ValueError):
+            self.records('Name\n', mapping={'Name': 'nickname'})
+        with self.assertRaises(ValueError):
+            self.records('John\n', header=False)
+
+    def test_batch(self) -> None:
+        reader = cliform.tabular.TabularReader(ComplexFormPrompter())
+        stream = io.StringIO('name,email,is staff\nJohn,john@example.com,yes\nJane,jane,no\n', newline='')
+        results = list(cliform.batch.BatchRunner(ComplexFormPrompter()).process(reader.records(stream)))
+        self.assertEqual([2, 3], [result.line for result in results])
+        assert results[0].data is not None
+        self.assertTrue(results[0].data['is_staff'])
+        self.assertEqual(
+            ["email: Enter a valid email address.", "is_staff: This field is required."],
+            results[1].errors,
+        )
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import typing as T
+import unittest
+
+import cliform.django
+import cliform.trace
+
+from . import utils
+from .test_django import SimpleForm
+
+
+class TracedPrompter(cliform.django.FormPrompter):
+    form_class = SimpleForm
+
+    def on_submit(self, data):
+        pass
+
+
+SESSION: T.List[utils.Expect] = [
+    utils.ExpectMsg(">>> Name?"),
+    utils.ExpectQuery(reply="John Doe"),
+    utils.ExpectMsg(">>> Email?"),
+    utils.ExpectQuery(reply="john"),
+    utils.ExpectMsg("!! Enter a valid email address."),
+    utils.ExpectMsg(">>> Email?"),
+    utils.ExpectQuery(reply="john.doe@example.com"),
+    utils.ExpectMsg(""),
+    utils.ExpectMsg("=== Summary ==="),
+    utils.ExpectMsg("Name:   John Doe"),
+    utils.ExpectMsg("Email:  john.doe@example.com"),
+    utils.ExpectMsg(">>> Confirm? ([Y]es/[N]o)"),
+    utils.ExpectQuery(reply=''),
+    utils.ExpectMsg(""),
+    utils.ExpectMsg("`SimpleForm` has been submitted:"),
+    utils.ExpectRe(r'  {.*}'),
+]
+
+
+class TracerTests(utils.InteractionTestCase):
+    def test_events(self) -> None:
+        prompter = TracedPrompter()
+        prompter.tracer = cliform.trace.RecordingTracer()
+        self.assertSequence(prompter, SESSION)
+        events = prompter.tracer.events
+        self.assertEqual([
+            ('prompt', 'name'), ('reply', 'name'), ('clean_start', 'name'), ('clean_end', 'name'),
+            ('prompt', 'email'), ('reply', 'email'), ('clean_start', 'email'), ('clean_end', 'email'),
+            ('error', 'email'),
+            ('prompt', 'email'), ('reply', 'email'), ('clean_start', 'email'), ('clean_end', 'email'),
+            ('summary', None),
+            ('submit', None),
+        ], [(event.kind, event.field) for event in events])
+        self.assertEqual("Enter a valid email address.", events[8].message)
+        self.assertEqual(sorted(event.timestamp for event in events), [event.timestamp for event in events])
+
+    def test_aggregator(self) -> None:
+        aggregator = cliform.trace.Aggregator()
+        for _i in range(3):
+            prompter = TracedPrompter()
+            prompter.tracer = aggregator
+            self.assertSequence(prompter, SESSION)
+        report = aggregator.report()
+        self.assertEqual(6, report['email']['think']['count'])
+        self.assertEqual(3, report['name']['validation']['count'])
+        self.assertEqual(3, report['<submit>']['submit']['count'])
+        self.assertEqual(3, aggregator.errors['email'])
+        self.assertEqual(7, len(list(aggregator.format())))
+
+
+class AggregatorTests(unittest.TestCase):
+    def test_percentiles(self) -> None:
+        aggregator = cliform.trace.Aggregator()
+        for rank in range(100):
+            aggregator.emit(cliform.trace.Event('prompt', timestamp=0, session=rank, field='name'))
+        for rank in range(100):
+            aggregator.emit(cliform.trace.Event('reply', timestamp=rank + 1, session=rank, field='name'))
+        stats = aggregator.report()['name']['think']
+        self.assertEqual((51, 96, 100), (stats['p50'], stats['p95'], stats['p99']))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) The cliform project
+# This code is distributed under the two-clause BSD License.
+
+import io
+import typing as T
+import unittest
+
+from django import forms
+
+import cliform
+import cliform.django
+import cliform.interact
+import cliform.transcript
+
+from .test_django import SimpleForm
+
+
+class SimpleFormPrompter(cliform.django.FormPrompter):
+    form_class = SimpleForm
+
+    def on_submit(self, data):
+        pass
+
+
+class StrictForm(SimpleForm):
+    """A new version of the form, rejecting example.com addresses."""
+    def clean_email(self):
+        if self.cleaned_data['email'].endswith('@example.com'):
+            raise forms.ValidationError("Reserved domain.")
+        return self.cleaned_data['email']
+
+
+class StrictFormPrompter(SimpleFormPrompter):
+    form_class = StrictForm
+
+
+class TranscriptTests(unittest.TestCase):
+    def record(self, *sessions: T.Sequence[T.Text]) -> T.List[cliform.transcript.Transcript]:
+        output = io.StringIO()
+        for replies in sessions:
+            interacter = cliform.interact.BufferedStdioInteracter(
+                stdin=io.StringIO(''.join(reply + '\n' for reply in replies)), stdout=io.StringIO(),
+            )
+            cliform.transcript.RecordingInteracter(interacter, output).run(SimpleFormPrompter())
+        return list(cliform.transcript.read_transcripts(io.StringIO(output.getvalue())))
+
+    def test_record(self) -> None:
+        transcript, = self.record(["John Doe", "john", "john.doe@example.com", ""])
+        self.assertEqual(
+            [
+                'o', 'i',
+                'o', 'i',
+                'o', 'i',
+                'o', 'i',
+                'o',
+            ],
+            [step[0] for step in transcript.steps],
+        )
+        self.assertEqual("!! Enter a valid email address.\n>>> Email?", transcript.steps[4][1])
+        self.assertEqual("john.doe@example.com", transcript.steps[5][1])
+
+    def test_replay(self) -> None:
+        transcripts = self.record(
+            ["John Doe", "john.doe@example.com", ""],
+            ["Jane Doe", "jane.doe@example.org", "n"],
+        )
+        report = cliform.transcript.replay_all(SimpleFormPrompter, transcripts)
+        self.assertEqual((2, []), (report.sessions, report.divergences))
+
+        report = cliform.transcript.replay_all(StrictFormPrompter, transcripts)
+        self.assertEqual([0], [result.index for result in report.divergences])
+        divergence = report.divergences[0].divergence
+        assert divergence is not None
+        self.assertIn("expected output '\\n=== Summary ===", divergence)
+        self.assertEqual(3, len(list(report.format())))
+
+    def test_truncated(self) -> None:
+        transcript, = self.record(["John Doe", "john.doe@example.com", ""])
+        transcript.steps.append(['i', "extra", 0])
+        result = cliform.transcript.replay(SimpleFormPrompter(), transcript)
+        self.assertEqual("Session ended before the end of the transcript", result.divergence)
+
+    def test_parallel(self) -> None:
+        transcripts = self.record(*[["User %d" % i, "user%d@example.com" % i, ""] for i in range(10)])
+        report = cliform.transcript.replay_all(SimpleFormPrompter, transcripts, jobs=2, chunk_size=3)
+        self.assertEqual((10, []), (report.sessions, report.divergences))